@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打包脚本 / 扫描脚本 性能基准
+- 生成可配置的 Blazor 风格合成项目树（文件数、深度、大小分布、敏感信息密度、bin/obj 构建输出）
+- 分别测量 combine_code_files、mask_json_recursive、process_csharp_content、
+  process_config_content、mask_high_entropy、泄漏审计、scan_directory、ScanStore 的吞吐量（文件/秒、MB/秒）和峰值内存
+- 结果写入 JSON，可与上一次结果对比发现性能回退
+"""
+
+import os
+import sys
+import io
+import json
+import math
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import multiprocessing
+from datetime import datetime
+from _script_loader import load_script
+
+packager = load_script("#packager.py", "packager")
+scan_project = load_script("#scan_project.py", "scan_project")
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# ✨合成项目树生成
+FOLDER_LAYOUT = {
+    "Components": ".razor",
+    "Services": ".cs",
+    "Models": ".cs",
+    "Middleware": ".cs",
+    "wwwroot": ".css",
+    "Properties": ".json",
+}
+
+CODE_LINES = {
+    ".cs": [
+        "using System;",
+        "    public int Count {{ get; set; }} = {n};",
+        "    private readonly ILogger<Service{n}> _logger;",
+        "    // 计算第 {n} 节课的空教室",
+        "    var rooms = _schedule.Where(r => r.Week == {n}).ToList();",
+        "    if (rooms.Count == 0) return Array.Empty<string>();",
+    ],
+    ".razor": [
+        "<div class=\"room-card\">@room.Name</div>",
+        "@code {{ private int week = {n}; }}",
+        "<button @onclick=\"Refresh\">刷新 {n}</button>",
+        "    <p>第 {n} 周</p>",
+    ],
+    ".css": [
+        ".room-{n} {{ color: #333; margin: {n}px; }}",
+        "@media (max-width: {n}px) {{ .nav {{ display: none; }} }}",
+        "    padding: 0 {n}px;",
+    ],
+}
+
+TOKEN_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789"
+
+SECRET_LINES = {
+    ".cs": [
+        "    private const string ApiKey = \"sk_live_{n}abcdefghijklmnop\";",
+        "    var password = \"P@ssw0rd{n}!\";",
+        "    Configuration[\"Email:SmtpPassword\"] = \"smtp-secret-{n}\";",
+        # 变量名不含敏感关键词的随机令牌，只有高熵检测能发现
+        "    var mailFrom = \"{token}\";",
+    ],
+    ".razor": ["    var token = \"tok_{n}_abcdefgh\";"],
+    ".css": ["/* secret = \"not-really-{n}\" */"],
+}
+
+def generate_text(ext, target_size, secret_density, rng):
+    """生成指定大小附近的源码文本，按 secret_density 比例插入敏感赋值"""
+    lines = []
+    size = 0
+    while size < target_size:
+        n = rng.randint(1, 9999)
+        if rng.random() < secret_density and ext in SECRET_LINES:
+            token = ''.join(rng.choice(TOKEN_ALPHABET) for _ in range(32))
+            line = rng.choice(SECRET_LINES[ext]).format(n=n, token=token)
+        else:
+            line = rng.choice(CODE_LINES[ext]).format(n=n)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines) + "\n"
+
+def generate_settings(secret_density, rng):
+    """生成 appsettings 风格的 JSON 配置"""
+    settings = {
+        "Logging": {"LogLevel": {"Default": "Information", "Microsoft.AspNetCore": "Warning"}},
+        "AllowedHosts": "*",
+        "Security": {"DDoSThreshold": rng.randint(50, 200), "BanDuration": 30},
+    }
+    if rng.random() < max(secret_density * 10, 0.2):
+        settings["ConnectionStrings"] = {
+            "DefaultConnection": f"Server=db{rng.randint(1, 99)}.internal;Database=rooms;User Id=sa;Password=Secret{rng.randint(1000, 9999)}"
+        }
+        settings["Email"] = {"SmtpServer": "smtp.example.com", "SmtpPassword": f"mail-{rng.randint(1000, 9999)}"}
+    return settings
+
+def generate_project_tree(root, files=500, depth=3, mean_size=4096, size_sigma=1.0,
+                          secret_density=0.02, build_output=True, seed=0):
+    """
+    生成合成项目树，返回生成的源文件数和总字节数
+    - 文件大小服从以 mean_size 为均值的对数正态分布
+    - build_output=True 时在 bin/ obj/ 下生成同等数量的构建产物（打包时应被剪枝）
+    """
+    rng = random.Random(seed)
+    os.makedirs(root, exist_ok=True)
+    folders = list(FOLDER_LAYOUT)
+    total_bytes = 0
+    # 对数正态分布的均值为 e^(σ²/2)，除以该值使平均大小接近 mean_size
+    scale = max(mean_size, 1) / math.exp(size_sigma ** 2 / 2)
+
+    for i in range(files):
+        folder = folders[i % len(folders)]
+        ext = FOLDER_LAYOUT[folder]
+        sub_depth = rng.randint(0, max(depth - 1, 0))
+        sub_dirs = [f"Area{rng.randint(0, 4)}" for _ in range(sub_depth)]
+        dir_path = os.path.join(root, folder, *sub_dirs)
+        os.makedirs(dir_path, exist_ok=True)
+
+        if ext == ".json":
+            text = json.dumps(generate_settings(secret_density, rng), indent=2, ensure_ascii=False)
+            file_name = f"launchSettings{i}.json"
+        else:
+            target = int(rng.lognormvariate(0, size_sigma) * scale)
+            text = generate_text(ext, max(target, 64), secret_density, rng)
+            file_name = f"File{i}{ext}"
+
+        with open(os.path.join(dir_path, file_name), 'w', encoding='utf-8', newline='\n') as f:
+            f.write(text)
+        total_bytes += len(text.encode('utf-8'))
+
+    for name in ("appsettings.json", "appsettings.Development.json"):
+        with open(os.path.join(root, name), 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(generate_settings(secret_density, rng), f, indent=2)
+
+    if build_output:
+        for i in range(files):
+            for build_dir in ("bin/Debug/net8.0", "obj/Debug/net8.0"):
+                dir_path = os.path.join(root, build_dir)
+                os.makedirs(dir_path, exist_ok=True)
+                with open(os.path.join(dir_path, f"Generated{i}.cs"), 'w', encoding='utf-8') as f:
+                    f.write("// <auto-generated />\n" * 8)
+
+    return files, total_bytes
+
+# ✨基准用例
+# 每个用例接收 (tree_dir, work_dir, args)，返回 (运行函数, 文件数, 字节数)；准备工作不计入耗时
+
+def collect_sources(tree_dir, ext):
+    """读取树中指定扩展名的全部源文件内容"""
+    contents = []
+    for dirpath, dirnames, filenames in os.walk(tree_dir):
+        dirnames[:] = [d for d in dirnames if d not in ("bin", "obj")]
+        for name in filenames:
+            if name.endswith(ext):
+                with open(os.path.join(dirpath, name), 'r', encoding='utf-8') as f:
+                    contents.append(f.read())
+    return contents
+
+def case_combine_code_files(tree_dir, work_dir, args):
+    output_file = os.path.join(work_dir, "bench_bundle.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = packager.combine_code_files(tree_dir, output_file, use_cache=False, jobs=args.jobs)
+
+    def run():
+        packager.combine_code_files(tree_dir, output_file, use_cache=False, jobs=args.jobs)
+    return run, summary['files'], summary['input_size']
+
+def case_combine_code_files_entropy(tree_dir, work_dir, args):
+    """启用高熵检测时的完整打包，与 combine_code_files 对比额外开销"""
+    output_file = os.path.join(work_dir, "bench_bundle_entropy.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = packager.combine_code_files(tree_dir, output_file, use_cache=False, jobs=args.jobs, entropy=True)
+
+    def run():
+        packager.combine_code_files(tree_dir, output_file, use_cache=False, jobs=args.jobs, entropy=True)
+    return run, summary['files'], summary['input_size']
+
+def case_combine_code_files_cached(tree_dir, work_dir, args):
+    """缓存命中（无修改）时的重新打包"""
+    output_file = os.path.join(work_dir, "bench_bundle_cached.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        summary = packager.combine_code_files(tree_dir, output_file, use_cache=True, jobs=args.jobs)
+
+    def run():
+        packager.combine_code_files(tree_dir, output_file, use_cache=True, jobs=args.jobs)
+    return run, summary['files'], summary['input_size']
+
+def case_mask_json_recursive(tree_dir, work_dir, args):
+    documents = [json.loads(text) for text in collect_sources(tree_dir, ".json")]
+    size = sum(len(json.dumps(d).encode('utf-8')) for d in documents)
+
+    def run():
+        for document in documents:
+            packager.mask_json_recursive(document)
+    return run, len(documents), size
+
+def case_process_csharp_content(tree_dir, work_dir, args):
+    contents = collect_sources(tree_dir, ".cs")
+
+    def run():
+        for content in contents:
+            packager.process_csharp_content(content)
+    return run, len(contents), sum(len(c.encode('utf-8')) for c in contents)
+
+def case_mask_high_entropy(tree_dir, work_dir, args):
+    contents = collect_sources(tree_dir, ".cs")
+
+    def run():
+        for content in contents:
+            packager.mask_high_entropy(content)
+    return run, len(contents), sum(len(c.encode('utf-8')) for c in contents)
+
+def case_process_config_content(tree_dir, work_dir, args):
+    # 将 JSON 配置展开为 key=value 形式，模拟 .ini / .env / .properties
+    contents = []
+    for text in collect_sources(tree_dir, ".json"):
+        lines = []
+
+        def flatten(prefix, value):
+            if isinstance(value, dict):
+                for k, v in value.items():
+                    flatten(f"{prefix}{k}:" if prefix else f"{k}:", v)
+            else:
+                lines.append(f"{prefix.rstrip(':')}={value}")
+        flatten("", json.loads(text))
+        contents.append("\n".join(lines))
+
+    def run():
+        for content in contents:
+            packager.process_config_content(content)
+    return run, len(contents), sum(len(c.encode('utf-8')) for c in contents)
+
+def case_leak_audit(tree_dir, work_dir, args):
+    """对打包输出做泄漏审计，吞吐量按输出文件大小计算"""
+    output_file = os.path.join(work_dir, "bench_bundle_audit.txt")
+    with contextlib.redirect_stdout(io.StringIO()):
+        packager.combine_code_files(tree_dir, output_file, use_cache=False, jobs=args.jobs)
+    auditor = packager.LeakAuditor(packager.load_known_secrets(tree_dir))
+
+    def run():
+        auditor.audit_text(output_file)
+    return run, 1, os.path.getsize(output_file)
+
+def case_scan_directory(tree_dir, work_dir, args):
+    items = scan_project.scan_directory(tree_dir, max_depth=8)
+    files = sum(1 for item in items if item['info']['is_file'])
+    size = sum(item['info']['size'] for item in items if item['info']['is_file'])
+
+    def run():
+        scan_project.scan_directory(tree_dir, max_depth=8)
+    return run, files, size
+
+def case_scan_directory_parallel(tree_dir, work_dir, args):
+    run, files, size = case_scan_directory(tree_dir, work_dir, args)
+
+    def run_parallel():
+        scan_project.scan_directory_parallel(tree_dir, max_depth=8)
+    return run_parallel, files, size
+
+def case_scan_store(tree_dir, work_dir, args):
+    run, files, size = case_scan_directory(tree_dir, work_dir, args)
+
+    def run_store():
+        store = scan_project.scan_to_store(tree_dir, max_depth=8)
+        store.top_files()
+        store.top_dirs()
+        store.extension_rollups()
+    return run_store, files, size
+
+BENCHMARKS = {
+    "combine_code_files": case_combine_code_files,
+    "combine_code_files_entropy": case_combine_code_files_entropy,
+    "combine_code_files_cached": case_combine_code_files_cached,
+    "mask_json_recursive": case_mask_json_recursive,
+    "process_csharp_content": case_process_csharp_content,
+    "process_config_content": case_process_config_content,
+    "mask_high_entropy": case_mask_high_entropy,
+    "leak_audit": case_leak_audit,
+    "scan_directory": case_scan_directory,
+    "scan_directory_parallel": case_scan_directory_parallel,
+    "scan_store": case_scan_store,
+}
+
+def get_peak_rss_kb():
+    """当前进程的峰值常驻内存（KB），不支持的平台返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def run_benchmark(name, tree_dir, work_dir, args):
+    """在独立子进程中执行单个用例，峰值内存互不影响"""
+    run, files, size = BENCHMARKS[name](tree_dir, work_dir, args)
+    # ru_maxrss 只增不减，且包含解释器和模块导入的基线，只报告用例运行期间的增量
+    baseline_rss = get_peak_rss_kb()
+    timings = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            run()
+            timings.append(time.perf_counter() - start)
+    best = min(timings)
+    peak_rss = get_peak_rss_kb()
+    return {
+        'seconds': round(best, 6),
+        'files': files,
+        'bytes': size,
+        'files_per_s': round(files / best, 1) if best else None,
+        'mb_per_s': round(size / best / (1024 * 1024), 2) if best else None,
+        'peak_rss_delta_kb': peak_rss - baseline_rss if peak_rss is not None else None,
+    }
+
+def compare_results(previous, current, tolerance):
+    """对比两次结果，返回吞吐量下降超过 tolerance 的用例列表"""
+    regressions = []
+    print(f"\n{'用例':<28}{'上次 MB/s':>12}{'本次 MB/s':>12}{'变化':>10}")
+    for name, result in current['results'].items():
+        old = previous.get('results', {}).get(name)
+        if not old or not old.get('mb_per_s') or not result.get('mb_per_s'):
+            print(f"{name:<28}{'-':>12}{result.get('mb_per_s', '-'):>12}{'新增':>10}")
+            continue
+        change = result['mb_per_s'] / old['mb_per_s'] - 1
+        flag = ""
+        if change < -tolerance:
+            regressions.append(name)
+            flag = " ⚠️"
+        print(f"{name:<28}{old['mb_per_s']:>12}{result['mb_per_s']:>12}{change:>+10.1%}{flag}")
+    return regressions
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="打包脚本 / 扫描脚本 性能基准")
+    parser.add_argument('--files', type=int, default=500, help="生成的源文件数")
+    parser.add_argument('--depth', type=int, default=3, help="目标文件夹下的最大目录深度")
+    parser.add_argument('--mean-size', type=int, default=4096, help="源文件平均大小（字节）")
+    parser.add_argument('--size-sigma', type=float, default=1.0, help="文件大小对数正态分布的 σ")
+    parser.add_argument('--secret-density', type=float, default=0.02, help="含敏感赋值的行比例")
+    parser.add_argument('--no-build-output', action='store_true', help="不生成 bin/ obj/ 构建产物")
+    parser.add_argument('--seed', type=int, default=0, help="随机种子")
+    parser.add_argument('--repeat', type=int, default=3, help="每个用例重复次数（取最快一次）")
+    parser.add_argument('--jobs', '-j', type=int, default=1, help="combine_code_files 的并行进程数")
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help="只运行指定用例")
+    parser.add_argument('--output', '-o', default="benchmark_results.json", help="结果 JSON 文件")
+    parser.add_argument('--compare', help="与之前的结果 JSON 对比")
+    parser.add_argument('--tolerance', type=float, default=0.10, help="判定为回退的吞吐量下降比例")
+    parser.add_argument('--keep-tree', action='store_true', help="保留生成的合成项目树")
+    return parser.parse_args()
+
+def main():
+    """主函数"""
+    args = parse_args()
+    work_dir = tempfile.mkdtemp(prefix="vacantroom_bench_")
+    tree_dir = os.path.join(work_dir, "VacantRoomWeb")
+
+    print("生成合成项目树...")
+    files, total_bytes = generate_project_tree(
+        tree_dir, files=args.files, depth=args.depth, mean_size=args.mean_size,
+        size_sigma=args.size_sigma, secret_density=args.secret_density,
+        build_output=not args.no_build_output, seed=args.seed)
+    print(f"项目树: {tree_dir} ({files} 个源文件, {packager.get_file_size_from_bytes(total_bytes)})")
+
+    results = {}
+    context = multiprocessing.get_context("spawn")
+    try:
+        for name in args.only or BENCHMARKS:
+            with context.Pool(1) as pool:
+                results[name] = pool.apply(run_benchmark, (name, tree_dir, work_dir, args))
+            r = results[name]
+            rss = f"+{r['peak_rss_delta_kb'] / 1024:.1f} MB" if r['peak_rss_delta_kb'] is not None else "-"
+            print(f"  {name:<28}{r['seconds'] * 1000:>10.1f} ms{r['files_per_s']:>12} 文件/s"
+                  f"{r['mb_per_s']:>10} MB/s  峰值内存增量 {rss}")
+    finally:
+        if args.keep_tree:
+            print(f"已保留项目树: {tree_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'config': {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'keep_tree')},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"\n结果已写入: {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        regressions = compare_results(previous, report, args.tolerance)
+        if regressions:
+            print(f"\n❌ 性能回退: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ 未发现性能回退")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+打包压缩包读取脚本
+读取 #packager.py --format bundle 生成的压缩包，按索引只解压需要的文件
+
+用法:
+    python "#bundle_reader.py" list  "#VacantRoomWeb_Code.bundle"
+    python "#bundle_reader.py" cat   "#VacantRoomWeb_Code.bundle" Services/RoomService.cs
+    python "#bundle_reader.py" extract "#VacantRoomWeb_Code.bundle" -o out_dir [路径 ...]
+    python "#bundle_reader.py" verify "#VacantRoomWeb_Code.bundle"
+"""
+
+import os
+import sys
+import argparse
+from _script_loader import load_script
+
+packager = load_script("#packager.py", "packager")
+
+def list_bundle(reader):
+    """按文件夹列出压缩包内容"""
+    index = reader.index
+    print(f"生成时间: {index.get('created', '-')}")
+    print(f"项目路径: {index.get('base_dir', '-')}")
+    print(f"压缩格式: {reader.codec}")
+
+    current_folder = None
+    total_size = total_length = 0
+    for entry in index['files']:
+        if entry.get('folder') != current_folder:
+            current_folder = entry.get('folder')
+            print(f"\n### {current_folder} ({index.get('folders', {}).get(current_folder, '?')} 个文件)")
+        if entry.get('error'):
+            print(f"- {entry['path']} [ERROR: {entry['error']}]")
+            continue
+        total_size += entry['size']
+        mark = " 🔒" if entry.get('protected') else ""
+        if entry.get('duplicate_of'):
+            # 重复文件与首个文件共用压缩帧
+            print(f"- {entry['path']} (与 {entry['duplicate_of']} 相同){mark}")
+            continue
+        total_length += entry['length']
+        print(f"- {entry['path']} ({packager.get_file_size_from_bytes(entry['size'])} -> "
+              f"{packager.get_file_size_from_bytes(entry['length'])}){mark}")
+
+    ratio = total_length / total_size * 100 if total_size else 0
+    print(f"\n共 {len(index['files'])} 个文件，{packager.get_file_size_from_bytes(total_size)} "
+          f"压缩为 {packager.get_file_size_from_bytes(total_length)}（{ratio:.1f}%）")
+
+def get_extract_target(output_dir, path):
+    """
+    索引中的路径转换为解压目标，路径不安全时返回 None：
+    绝对路径、盘符、空路径、包含 .. 或反斜杠的路径都可能写到输出目录之外
+    """
+    parts = path.split('/')
+    if not path or path.startswith('/') or '\\' in path or ':' in parts[0]:
+        return None
+    if any(part in ('', '.', '..') for part in parts):
+        return None
+    root = os.path.realpath(output_dir)
+    target = os.path.realpath(os.path.join(root, *parts))
+    if os.path.commonpath([root, target]) != root:
+        return None
+    return target
+
+def extract_bundle(reader, paths, output_dir):
+    for path in paths or list(reader.entries):
+        target = get_extract_target(output_dir, path)
+        if target is None:
+            print(f"❌ {path}: 路径不安全，已跳过")
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            with open(target, 'wb') as f:
+                for chunk in reader.iter_chunks(path):
+                    f.write(chunk)
+            print(f"✅ {path}")
+        except (OSError, ValueError) as e:
+            print(f"❌ {path}: {e}")
+
+def verify_bundle(reader):
+    """解压并校验所有文件的内容哈希"""
+    failed = 0
+    for path, entry in reader.entries.items():
+        if entry.get('error'):
+            continue
+        try:
+            for _ in reader.iter_chunks(path):
+                pass
+        except ValueError as e:
+            failed += 1
+            print(f"❌ {e}")
+    print(f"校验完成: {len(reader.entries) - failed}/{len(reader.entries)} 个文件正常")
+    return failed == 0
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="读取打包生成的压缩包")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_list = sub.add_parser('list', help="列出压缩包中的文件")
+    p_list.add_argument('bundle')
+
+    p_cat = sub.add_parser('cat', help="输出单个文件内容")
+    p_cat.add_argument('bundle')
+    p_cat.add_argument('path', help="文件在项目中的相对路径（/ 分隔）")
+
+    p_extract = sub.add_parser('extract', help="解压文件到目录")
+    p_extract.add_argument('bundle')
+    p_extract.add_argument('paths', nargs='*', help="要解压的文件，不指定时解压全部")
+    p_extract.add_argument('-o', '--output', default='.', help="输出目录（默认当前目录）")
+
+    p_verify = sub.add_parser('verify', help="校验所有文件的内容哈希")
+    p_verify.add_argument('bundle')
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    with packager.BundleReader(args.bundle) as reader:
+        if args.command == 'list':
+            list_bundle(reader)
+        elif args.command == 'cat':
+            if args.path not in reader.entries:
+                print(f"❌ 压缩包中没有该文件: {args.path}")
+                return 1
+            out = sys.stdout.buffer
+            try:
+                for chunk in reader.iter_chunks(args.path):
+                    out.write(chunk)
+            except (OSError, ValueError) as e:
+                # 出错条目、数据不完整、压缩帧损坏或内容校验失败
+                out.flush()
+                print(f"❌ {args.path}: {e}")
+                return 1
+            out.flush()
+        elif args.command == 'extract':
+            extract_bundle(reader, args.paths, args.output)
+        elif args.command == 'verify':
+            return 0 if verify_bundle(reader) else 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
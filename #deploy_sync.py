@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+发布目录增量部署脚本
+- 基于 #scan_project.py 的目录遍历，并行计算发布目录中每个文件的 SHA-256，生成清单
+- 与目标端清单（服务器上生成的清单文件，或代替服务器的本地目录）对比
+- 只打包 / 复制有变化的文件，Logs/ 等排除路径不参与对比，也不会被覆盖或删除
+- 目标端多余的文件只在指定 --delete 时删除：--apply 直接删除，--archive 在增量包中写入删除清单 .deploy-delete.txt
+
+用法:
+    python "#deploy_sync.py" manifest /var/www/vacantroomweb -o server.manifest.json
+    python "#deploy_sync.py" diff bin/Release/net8.0/publish server.manifest.json --archive delta.tar.gz --delete
+    python "#deploy_sync.py" diff bin/Release/net8.0/publish D:/staging/vacantroomweb --apply --delete
+"""
+
+import os
+import io
+import sys
+import json
+import shutil
+import hashlib
+import tarfile
+import argparse
+import tempfile
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from _script_loader import load_script
+
+scan_project = load_script("#scan_project.py", "scan_project")
+path_matcher = load_script("#path_matcher.py", "path_matcher")
+
+MANIFEST_VERSION = 1
+# 使用 SHA-256，服务器上没有 Python 时也可以用 sha256sum 核对
+HASH_ALGORITHM = "sha256"
+HASH_CHUNK_SIZE = 1024 * 1024
+# 排除规则使用 .gitignore 语法（#path_matcher.py），服务器上的 Logs/ 由 nginx 用户写入，部署时既不覆盖也不删除
+DEFAULT_EXCLUDES = ['/Logs/']
+# 增量包中的删除清单（每行一个相对路径），服务器上解压后按清单删除再删掉清单本身
+DELETE_LIST_NAME = ".deploy-delete.txt"
+MAX_DEPTH = 64
+
+# ✨清单生成
+
+def compile_excludes(excludes):
+    """
+    将排除规则编译为 #path_matcher.py 的 PathMatcher，如 /Logs/、*.pdb
+    没有规则时也返回空匹配器，避免目录扫描退回 SCAN_SKIP_RULES 而跳过发布目录中的 bin/ Release/ 等目录
+    """
+    return path_matcher.compile_rules(excludes, 'exclude')
+
+def hash_file(path):
+    """分块计算文件哈希（hashlib 计算大块数据时会释放 GIL，可在线程池中并行）"""
+    h = hashlib.new(HASH_ALGORITHM)
+    with open(path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            h.update(chunk)
+    return h.hexdigest()
+
+def list_files(root_dir, excludes, workers=8):
+    """遍历目录，返回 [(相对路径, 完整路径, 大小, 修改时间ns)]，排除的文件和目录在扫描时跳过，排除的目录不会进入"""
+    root_dir = os.path.abspath(root_dir)
+    files = []
+    for item in scan_project.iter_scan_directory(root_dir, max_depth=MAX_DEPTH, workers=workers,
+                                                 ignore=compile_excludes(excludes)):
+        info = item['info']
+        if info.get('error') or not info['is_file']:
+            continue
+        rel_path = os.path.relpath(item['full_path'], root_dir).replace(os.sep, '/')
+        files.append((rel_path, item['full_path'], info['size'], info.get('mtime_ns', 0)))
+    return files
+
+def build_manifest(root_dir, excludes=DEFAULT_EXCLUDES, jobs=8, previous=None):
+    """
+    生成目录清单 {相对路径: [大小, 修改时间ns, 哈希]}
+    previous 为上一次的清单时，大小和修改时间都未变的文件直接沿用旧哈希
+    """
+    files = list_files(root_dir, excludes, workers=jobs)
+    old_files = previous['files'] if previous and previous.get('algorithm') == HASH_ALGORITHM else {}
+
+    manifest_files = {}
+    to_hash = []
+    for rel_path, full_path, size, mtime_ns in files:
+        old = old_files.get(rel_path)
+        if old and old[0] == size and old[1] == mtime_ns:
+            manifest_files[rel_path] = old
+        else:
+            to_hash.append((rel_path, full_path, size, mtime_ns))
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as pool:
+        digests = pool.map(hash_file, [full_path for _, full_path, _, _ in to_hash])
+        for (rel_path, _, size, mtime_ns), digest in zip(to_hash, digests):
+            manifest_files[rel_path] = [size, mtime_ns, digest]
+
+    return {
+        'version': MANIFEST_VERSION,
+        'algorithm': HASH_ALGORITHM,
+        'root': os.path.abspath(root_dir),
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'excludes': list(excludes),
+        'files': dict(sorted(manifest_files.items())),
+        'hashed': len(to_hash),
+    }
+
+def load_manifest(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise ValueError(f"不支持的清单版本: {path}")
+    if manifest.get('algorithm') != HASH_ALGORITHM:
+        raise ValueError(f"清单哈希算法不一致: {manifest.get('algorithm')}，需要 {HASH_ALGORITHM}")
+    return manifest
+
+def save_manifest(manifest, path):
+    """先写临时文件再替换，避免中断时留下半个清单"""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.manifest-', dir=directory)
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+def load_manifest_if_exists(path):
+    try:
+        return load_manifest(path)
+    except (OSError, ValueError):
+        return None
+
+# ✨差异对比与部署
+
+def diff_manifests(source, target, excludes):
+    """返回 (需上传的文件, 目标端多余的文件)，只按哈希判断，修改时间不同但内容相同的文件不上传"""
+    source_files = source['files']
+    ignore = compile_excludes(excludes)
+    target_files = {path: entry for path, entry in target['files'].items() if not ignore.is_path_ignored(path)}
+    changed = [path for path, entry in source_files.items()
+               if path not in target_files or target_files[path][2] != entry[2]]
+    removed = sorted(path for path in target_files if path not in source_files)
+    return changed, removed
+
+def write_archive(source_dir, changed, archive_path, removed=()):
+    """
+    将需上传的文件打包为 tar.gz，服务器上 tar xzf 解压到部署目录即可
+    removed 不为空时同时写入删除清单 DELETE_LIST_NAME，解压后需按清单删除（见 linux/upload.md）
+    """
+    with tarfile.open(archive_path, 'w:gz') as tar:
+        for rel_path in changed:
+            tar.add(os.path.join(source_dir, *rel_path.split('/')), arcname=rel_path, recursive=False)
+        if removed:
+            data = ''.join(f"{rel_path}\n" for rel_path in removed).encode('utf-8')
+            info = tarfile.TarInfo(DELETE_LIST_NAME)
+            info.size = len(data)
+            info.mtime = int(datetime.now().timestamp())
+            tar.addfile(info, io.BytesIO(data))
+
+def copy_atomic(src, dst):
+    """先复制到同目录临时文件再替换，运行中的服务不会读到写了一半的文件"""
+    os.makedirs(os.path.dirname(dst), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix='.deploy-', dir=os.path.dirname(dst))
+    os.close(fd)
+    try:
+        shutil.copy2(src, tmp_path)
+        os.replace(tmp_path, dst)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+def apply_changes(source_dir, target_dir, changed, removed, delete=False):
+    for rel_path in changed:
+        copy_atomic(os.path.join(source_dir, *rel_path.split('/')),
+                    os.path.join(target_dir, *rel_path.split('/')))
+    if delete:
+        for rel_path in removed:
+            try:
+                os.remove(os.path.join(target_dir, *rel_path.split('/')))
+            except FileNotFoundError:
+                pass
+
+def print_plan(source, changed, removed, delete):
+    files = source['files']
+    upload_size = sum(files[path][0] for path in changed)
+    total_size = sum(entry[0] for entry in files.values())
+
+    print("=" * 80)
+    print("增量部署计划")
+    print("=" * 80)
+    for path in changed:
+        print(f"↑ {path} ({scan_project.format_size(files[path][0])})")
+    for path in removed:
+        print(f"{'✗' if delete else '?'} {path}")
+    print("-" * 80)
+    print(f"需上传: {len(changed)}/{len(files)} 个文件，"
+          f"{scan_project.format_size(upload_size)}（完整上传 {scan_project.format_size(total_size)}）")
+    if removed:
+        print(f"目标端多余文件: {len(removed)} 个{'，将删除' if delete else '（使用 --delete 删除）'}")
+
+# ✨命令行
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="发布目录增量部署")
+    parser.add_argument('--exclude', action='append', default=None,
+                        help=f"排除规则（.gitignore 语法），可多次指定（默认 {' '.join(DEFAULT_EXCLUDES)}）")
+    parser.add_argument('--jobs', '-j', type=int, default=8, help="并行计算哈希的线程数（默认 8）")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p_manifest = sub.add_parser('manifest', help="生成目录清单（可在服务器上运行）")
+    p_manifest.add_argument('root', help="要生成清单的目录")
+    p_manifest.add_argument('-o', '--output', required=True, help="清单输出路径，已存在时沿用未变化文件的哈希")
+
+    p_diff = sub.add_parser('diff', help="对比发布目录与目标端，输出或应用变化的文件")
+    p_diff.add_argument('source', help="发布目录，如 bin/Release/net8.0/publish")
+    p_diff.add_argument('target', help="目标端清单文件（.json）或代替服务器的本地目录")
+    p_diff.add_argument('--source-manifest', help="发布目录清单缓存路径，沿用未变化文件的哈希")
+    p_diff.add_argument('--archive', help="将变化的文件打包为 tar.gz")
+    p_diff.add_argument('--apply', action='store_true', help="将变化的文件复制到目标目录（目标需为目录）")
+    p_diff.add_argument('--delete', action='store_true', help="删除目标端多余的文件：配合 --apply 直接删除，配合 --archive 在增量包中写入删除清单")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    excludes = args.exclude if args.exclude is not None else DEFAULT_EXCLUDES
+
+    if args.command == 'manifest':
+        manifest = build_manifest(args.root, excludes, args.jobs, load_manifest_if_exists(args.output))
+        save_manifest(manifest, args.output)
+        print(f"清单已生成: {args.output}（{len(manifest['files'])} 个文件，重新计算哈希 {manifest['hashed']} 个）")
+        return 0
+
+    previous = load_manifest_if_exists(args.source_manifest) if args.source_manifest else None
+    source = build_manifest(args.source, excludes, args.jobs, previous)
+    if args.source_manifest:
+        save_manifest(source, args.source_manifest)
+
+    target_is_dir = os.path.isdir(args.target)
+    if args.apply and not target_is_dir:
+        print("❌ --apply 需要目标为目录")
+        return 1
+    target = build_manifest(args.target, excludes, args.jobs) if target_is_dir else load_manifest(args.target)
+
+    changed, removed = diff_manifests(source, target, excludes)
+    delete = args.delete and (args.apply or bool(args.archive))
+    print_plan(source, changed, removed, delete)
+
+    if args.archive:
+        write_archive(args.source, changed, args.archive, removed if args.delete else ())
+        note = f"，删除清单 {len(removed)} 个文件" if args.delete and removed else ""
+        print(f"增量包已生成: {args.archive}（{scan_project.format_size(os.path.getsize(args.archive))}{note}）")
+    if args.apply:
+        apply_changes(args.source, args.target, changed, removed, args.delete)
+        print(f"✅ 已同步到 {args.target}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,567 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+访问日志索引与查询脚本
+- EnhancedLoggingService 每天一个 Logs/access-yyyy-MM-dd.log，每条 LogEntry 追加一行：
+  [yyyy-MM-dd HH:mm:ss.fff] IP:... ACTION:... PATH:... DETAILS:... UA:...
+- 基于 #scan_project.py 的目录遍历找到日志文件，为每个文件生成旁路索引（默认在 Logs/.index/ 中）：
+  每 BLOCK_LINES 行一个字节偏移检查点、按分钟的时间桶、每个 ACTION / IP 出现过的块，以及 IP 的 HyperLogLog 草图
+- 索引从上次索引到的偏移继续增量更新，日志被截断或替换时重建
+- 查询通过 mmap 只读取需要的块，不再整个文件逐行读取
+
+用法:
+    python3 "#log_digest.py" index   /var/www/vacantroomweb/Logs
+    python3 "#log_digest.py" tail    /var/www/vacantroomweb/Logs -n 50
+    python3 "#log_digest.py" range   /var/www/vacantroomweb/Logs --from "2025-11-13 10:00" --to "2025-11-13 12:00"
+    python3 "#log_digest.py" action  /var/www/vacantroomweb/Logs SECURITY_LOGIN_FAILED --days 7
+    python3 "#log_digest.py" ip      /var/www/vacantroomweb/Logs 203.0.113.5 --count
+    python3 "#log_digest.py" summary /var/www/vacantroomweb/Logs --days 30
+"""
+
+import os
+import re
+import sys
+import json
+import math
+import mmap
+import time
+import base64
+import hashlib
+import argparse
+import tempfile
+from collections import Counter
+from datetime import datetime
+from _script_loader import load_script
+
+scan_project = load_script("#scan_project.py", "scan_project")
+
+INDEX_VERSION = 1
+INDEX_DIR_NAME = ".index"
+# 每个检查点之间的行数，按 ACTION / IP 查询时以块为单位读取
+BLOCK_LINES = 256
+# 用文件开头的字节判断日志是否被替换（轮转、手动清空后重新写入）
+HEAD_BYTES = 256
+# HyperLogLog 寄存器位数：2^12 个寄存器，4 KB，标准误差约 1.04 / sqrt(4096) ≈ 1.6%
+HLL_PRECISION = 12
+DEFAULT_LIMIT = 200
+
+LOG_FILE_PATTERN = re.compile(r'access-(\d{4}-\d{2}-\d{2})\.log$')
+# File.AppendAllText(..., Encoding.UTF8) 新建文件时会写入 BOM
+_LOG_LINE_PATTERN = rb'(?:\xef\xbb\xbf)?\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\.\d{3}\] IP:(.*?) ACTION:(.*?) PATH:'
+_LOG_LINE = re.compile(_LOG_LINE_PATTERN)
+# 建立索引时在整块内容中匹配每一行的开头
+_LOG_LINE_MULTILINE = re.compile(rb'^' + _LOG_LINE_PATTERN, re.MULTILINE)
+
+# ✨HyperLogLog：按天统计的不同 IP 草图可以直接合并，一个月的不同 IP 数无需读取原始日志
+
+_HLL_POWERS = [2.0 ** -rank for rank in range(65)]
+
+class HyperLogLog:
+    """HyperLogLog 基数估计，合并两个草图只需逐个寄存器取最大值"""
+
+    def __init__(self, precision: int = HLL_PRECISION, registers=None):
+        self.precision = precision
+        self.size = 1 << precision
+        self.registers = bytearray(registers) if registers else bytearray(self.size)
+
+    def add(self, value: bytes):
+        h = int.from_bytes(hashlib.blake2b(value, digest_size=8).digest(), 'big')
+        bits = 64 - self.precision
+        index = h >> bits
+        rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def merge(self, other: 'HyperLogLog'):
+        if other.precision != self.precision:
+            raise ValueError("HyperLogLog 精度不一致，无法合并")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def estimate(self) -> int:
+        m = self.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(map(_HLL_POWERS.__getitem__, self.registers))
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 小基数时使用线性计数修正
+            estimate = m * math.log(m / zeros)
+        return round(estimate)
+
+    def to_text(self) -> str:
+        return base64.b64encode(bytes(self.registers)).decode('ascii')
+
+    @classmethod
+    def from_text(cls, text: str, precision: int = HLL_PRECISION) -> 'HyperLogLog':
+        return cls(precision, base64.b64decode(text))
+
+# ✨单个日志文件的旁路索引
+
+def hash_head(data) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def decode_line(line: bytes) -> str:
+    if line.startswith(b'\xef\xbb\xbf'):
+        line = line[3:]
+    return line.rstrip(b'\r').decode('utf-8', errors='replace')
+
+def iter_lines(mm, start: int, stop: int):
+    """产出 [start, stop) 范围内每一行的 (起始偏移, 结束偏移)，不含换行符"""
+    pos = start
+    while pos < stop:
+        newline = mm.find(b'\n', pos, stop)
+        end = stop if newline < 0 else newline
+        yield pos, end
+        pos = end + 1
+
+class LogIndex:
+    """
+    日志文件的旁路索引
+    - checkpoints[i] 为第 i * BLOCK_LINES 行的字节偏移
+    - minutes 为 {一天中的分钟: [第一行偏移, 最后一行偏移, 行数]}，时间范围查询只读取对应的字节范围
+    - actions / ips 为 {值: [次数, [出现过的块号 ...]]}
+    - offset 之前的内容已经索引，最后一行未写完时不索引，下次从该行开始
+    - IP 的倒排表单独保存在 *.ips.json 中，汇总统计只读取主索引，按 IP 查询或更新索引时才加载
+    """
+
+    def __init__(self, log_path: str, index_path: str):
+        self.log_path = log_path
+        self.index_path = index_path
+        self.reset()
+
+    def reset(self):
+        self.size = 0
+        self.mtime_ns = 0
+        self.head = None
+        self.head_length = 0
+        self.offset = 0
+        self.lines = 0
+        self.parsed = 0
+        self.first = None
+        self.last = None
+        self.checkpoints = []
+        self.minutes = {}
+        self.actions = {}
+        self.distinct_ips = 0
+        self._ips = {}
+        self.hll = HyperLogLog()
+
+    @property
+    def ips_path(self) -> str:
+        return self.index_path[:-len(".idx.json")] + ".ips.json"
+
+    @property
+    def ips(self) -> dict:
+        """IP 倒排表，第一次访问时加载；与主索引的偏移不一致（保存时中断）时返回 None"""
+        if self._ips is None:
+            try:
+                with open(self.ips_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = {}
+            self._ips = data.get('ips') if data.get('offset') == self.offset else None
+        return self._ips
+
+    @classmethod
+    def load(cls, log_path: str, index_path: str) -> 'LogIndex':
+        index = cls(log_path, index_path)
+        try:
+            with open(index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        if data.get('version') != INDEX_VERSION or data.get('block_lines') != BLOCK_LINES:
+            return index
+        index.size = data['size']
+        index.mtime_ns = data['mtime_ns']
+        index.head = data['head']
+        index.head_length = data['head_length']
+        index.offset = data['offset']
+        index.lines = data['lines']
+        index.parsed = data['parsed']
+        index.first = data['first']
+        index.last = data['last']
+        index.checkpoints = data['checkpoints']
+        index.minutes = {minute: bucket for minute, *bucket in data['minutes']}
+        index.actions = data['actions']
+        index.distinct_ips = data['distinct_ips']
+        index._ips = None
+        index.hll = HyperLogLog.from_text(data['hll'])
+        return index
+
+    @staticmethod
+    def _write_json(path: str, data: dict):
+        """先写临时文件再替换，避免中断时留下半个索引"""
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix='.index-', dir=directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            # json.dumps 使用 C 编码器，比 json.dump 逐块写入快得多
+            f.write(json.dumps(data, ensure_ascii=False, separators=(',', ':')))
+        os.replace(tmp_path, path)
+
+    def save(self):
+        """先写 IP 倒排表再写主索引，两者都记录偏移，中途中断时下次重建"""
+        if self._ips is not None:
+            self._write_json(self.ips_path, {'offset': self.offset, 'ips': self._ips})
+        self._write_json(self.index_path, {
+                'version': INDEX_VERSION,
+                'block_lines': BLOCK_LINES,
+                'size': self.size,
+                'mtime_ns': self.mtime_ns,
+                'head': self.head,
+                'head_length': self.head_length,
+                'offset': self.offset,
+                'lines': self.lines,
+                'parsed': self.parsed,
+                'first': self.first,
+                'last': self.last,
+                'checkpoints': self.checkpoints,
+                'minutes': [[minute] + bucket for minute, bucket in sorted(self.minutes.items())],
+                'actions': self.actions,
+                'distinct_ips': self.distinct_ips,
+                'hll': self.hll.to_text(),
+            })
+
+    def is_current(self, size: int, mtime_ns: int) -> bool:
+        return self.head is not None and self.size == size and self.mtime_ns == mtime_ns
+
+    def update(self) -> int:
+        """从上次索引到的偏移继续索引，返回新增的行数；文件变短或开头内容变化时重建"""
+        with open(self.log_path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            if stat.st_size == 0:
+                self.reset()
+                self.head = ''
+                self.mtime_ns = stat.st_mtime_ns
+                return 0
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            size = len(mm)
+            if self.head is not None and (size < self.offset or hash_head(mm[:self.head_length]) != self.head
+                                          or self.ips is None):
+                self.reset()
+            self.head_length = min(size, HEAD_BYTES)
+            self.head = hash_head(mm[:self.head_length])
+            added = self._scan(mm, self.offset, size)
+            self.size = size
+            self.mtime_ns = stat.st_mtime_ns
+            return added
+        finally:
+            mm.close()
+
+    @staticmethod
+    def _post(table: dict, key: str, count: int, block: int) -> bool:
+        """记录 key 在块中出现 count 次，返回是否为第一次出现"""
+        entry = table.get(key)
+        if entry is None:
+            table[key] = [count, [block]]
+            return True
+        entry[0] += count
+        if entry[1][-1] != block:
+            entry[1].append(block)
+        return False
+
+    def _scan(self, mm, start: int, size: int) -> int:
+        """逐块索引：先按换行符切出一个块，再在块内一次性匹配所有日志行"""
+        end = mm.rfind(b'\n', start, size)
+        if end < 0:
+            return 0
+        end += 1
+        lines_before = self.lines
+        minutes = self.minutes
+        ips = self.ips
+        pos = start
+        while pos < end:
+            if self.lines % BLOCK_LINES == 0:
+                self.checkpoints.append(pos)
+            block = self.lines // BLOCK_LINES
+            stop = pos
+            remaining = BLOCK_LINES - self.lines % BLOCK_LINES
+            while remaining and stop < end:
+                stop = mm.find(b'\n', stop, end) + 1
+                remaining -= 1
+                self.lines += 1
+
+            chunk = mm[pos:stop]
+            block_ips = Counter()
+            block_actions = Counter()
+            timestamp = None
+            for m in _LOG_LINE_MULTILINE.finditer(chunk):
+                timestamp, ip, action = m.groups()
+                minute = int(timestamp[11:13]) * 60 + int(timestamp[14:16])
+                bucket = minutes.get(minute)
+                if bucket is None:
+                    minutes[minute] = [pos + m.start(), pos + m.start(), 1]
+                else:
+                    bucket[0] = min(bucket[0], pos + m.start())
+                    bucket[1] = pos + m.start()
+                    bucket[2] += 1
+                block_ips[ip] += 1
+                block_actions[action] += 1
+                if self.first is None:
+                    self.first = timestamp.decode('ascii')
+            if timestamp is not None:
+                self.last = timestamp.decode('ascii')
+            for action, count in block_actions.items():
+                self._post(self.actions, action.decode('utf-8', errors='replace'), count, block)
+            for ip, count in block_ips.items():
+                if self._post(ips, ip.decode('utf-8', errors='replace'), count, block):
+                    # 每个 IP 只需加入草图一次
+                    self.distinct_ips += 1
+                    self.hll.add(ip)
+            self.parsed += sum(block_ips.values())
+            pos = stop
+        self.offset = end
+        return self.lines - lines_before
+
+    def block_range(self, block: int) -> tuple:
+        stop = self.checkpoints[block + 1] if block + 1 < len(self.checkpoints) else self.offset
+        return self.checkpoints[block], stop
+
+    def time_range(self, start_minute: int, end_minute: int):
+        """覆盖 [start_minute, end_minute] 所有行的字节范围（结束位置可能在最后一行中间），没有这段时间的日志时返回 None"""
+        buckets = [b for minute, b in self.minutes.items() if start_minute <= minute <= end_minute]
+        if not buckets:
+            return None
+        return min(b[0] for b in buckets), max(b[1] for b in buckets) + 1
+
+# ✨日志文件列表与索引维护
+
+def get_index_path(index_dir: str, log_path: str) -> str:
+    return os.path.join(index_dir, os.path.basename(log_path) + ".idx.json")
+
+def list_log_files(logs_dir: str):
+    """通过目录扫描找到 access-yyyy-MM-dd.log，返回按日期排序的 [(日期, 完整路径, 大小, 修改时间ns)]"""
+    files = []
+    for item in scan_project.iter_scan_directory(logs_dir, max_depth=1, workers=1):
+        info = item['info']
+        m = LOG_FILE_PATTERN.match(item['name'])
+        if m and not info.get('error') and info['is_file']:
+            files.append((m.group(1), item['full_path'], info['size'], info.get('mtime_ns', 0)))
+    return sorted(files)
+
+def select_log_files(files, date=None, days=None, since=None, until=None):
+    """按日期筛选日志文件：--date 指定某一天，--days 为最近 N 个日志文件"""
+    if date:
+        files = [f for f in files if f[0] == date]
+    if since:
+        files = [f for f in files if f[0] >= since]
+    if until:
+        files = [f for f in files if f[0] <= until]
+    if days:
+        files = files[-days:]
+    return files
+
+def open_indexes(files, index_dir: str, update: bool = True, stats: dict = None):
+    """加载每个日志文件的索引，大小或修改时间变化的文件增量更新后保存"""
+    indexes = []
+    for _, log_path, size, mtime_ns in files:
+        index = LogIndex.load(log_path, get_index_path(index_dir, log_path))
+        if update and not index.is_current(size, mtime_ns):
+            added = index.update()
+            index.save()
+            if stats is not None:
+                stats['updated'] = stats.get('updated', 0) + 1
+                stats['lines'] = stats.get('lines', 0) + added
+        indexes.append(index)
+    return indexes
+
+# ✨查询
+
+def read_ranges(index: LogIndex, ranges, predicate=None):
+    """mmap 日志文件，只读取给定的字节范围（结束位置在行中间时读到该行末尾），产出满足条件的行"""
+    if not ranges:
+        return
+    with open(index.log_path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        match = _LOG_LINE.match
+        for start, stop in ranges:
+            newline = mm.find(b'\n', max(stop - 1, start), index.offset)
+            stop = index.offset if newline < 0 else newline + 1
+            for line_start, line_end in iter_lines(mm, start, stop):
+                m = match(mm, line_start, line_end)
+                if predicate is None or (m and predicate(m)):
+                    yield decode_line(mm[line_start:line_end])
+    finally:
+        mm.close()
+
+def query_postings(indexes, field: str, value: str, limit: int):
+    """按 ACTION 或 IP 查询：只读取该值出现过的块"""
+    group = 3 if field == 'actions' else 2
+    wanted = value.encode('utf-8')
+    count = 0
+    for index in indexes:
+        entry = (getattr(index, field) or {}).get(value)
+        if not entry:
+            continue
+        ranges = [index.block_range(block) for block in entry[1]]
+        for line in read_ranges(index, ranges, lambda m: m.group(group) == wanted):
+            yield line
+            count += 1
+            if count >= limit:
+                return
+
+def query_time_range(files, indexes, start: datetime, end: datetime, limit: int):
+    """时间范围查询：按分钟时间桶定位字节范围，再逐行比较时间戳"""
+    start_text = start.strftime("%Y-%m-%d %H:%M:%S").encode('ascii')
+    end_text = end.strftime("%Y-%m-%d %H:%M:%S").encode('ascii')
+    count = 0
+    for (date, _, _, _), index in zip(files, indexes):
+        start_minute = start.hour * 60 + start.minute if date == start.strftime("%Y-%m-%d") else 0
+        end_minute = end.hour * 60 + end.minute if date == end.strftime("%Y-%m-%d") else 24 * 60
+        window = index.time_range(start_minute, end_minute)
+        if window is None:
+            continue
+        for line in read_ranges(index, [window], lambda m: start_text <= m.group(1) <= end_text):
+            yield line
+            count += 1
+            if count >= limit:
+                return
+
+def tail_lines(files, count: int):
+    """从最新的日志文件末尾向前查找换行符，只读取最后 count 行（不需要索引）"""
+    lines = []
+    for _, log_path, size, _ in reversed(files):
+        if size == 0:
+            continue
+        with open(log_path, 'rb') as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            end = len(mm)
+            if mm[end - 1:end] == b'\n':
+                end -= 1
+            chunk = []
+            while end > 0 and len(lines) + len(chunk) < count:
+                start = mm.rfind(b'\n', 0, end) + 1
+                if start < end:
+                    chunk.append(decode_line(mm[start:end]))
+                end = start - 1
+            lines.extend(chunk)
+        finally:
+            mm.close()
+        if len(lines) >= count:
+            break
+    return list(reversed(lines[:count]))
+
+def summarize(files, indexes, top: int = 10):
+    """每天的行数、不同 IP 数和最多的 ACTION，合并 HyperLogLog 估计整个时间段的不同 IP 数"""
+    merged = HyperLogLog()
+    actions = Counter()
+    rows = []
+    for (date, _, size, _), index in zip(files, indexes):
+        merged.merge(index.hll)
+        day_actions = Counter({action: entry[0] for action, entry in index.actions.items()})
+        actions.update(day_actions)
+        busiest = day_actions.most_common(1)
+        rows.append((date, index.lines, index.parsed, index.distinct_ips, size,
+                     f"{busiest[0][0]} ({busiest[0][1]})" if busiest else "-"))
+    return rows, merged.estimate(), actions.most_common(top)
+
+# ✨命令行
+
+def parse_date(text: str) -> str:
+    return datetime.strptime(text, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+def parse_datetime(text: str) -> datetime:
+    for fmt in ("%Y-%m-%d %H:%M:%S", "%Y-%m-%d %H:%M", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"无法识别的时间: {text}（格式 yyyy-MM-dd [HH:mm[:ss]]）")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="访问日志索引与查询")
+    parser.add_argument('--index-dir', help=f"索引目录（默认为日志目录下的 {INDEX_DIR_NAME}/）")
+    parser.add_argument('--no-update', action='store_true', help="只使用已有索引，不增量更新")
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    def add_parser(name, help_text, dates=True):
+        p = sub.add_parser(name, help=help_text)
+        p.add_argument('logs', help="日志目录，如 /var/www/vacantroomweb/Logs")
+        if dates:
+            p.add_argument('--date', type=parse_date, help="只查询某一天（yyyy-MM-dd）")
+            p.add_argument('--days', type=int, help="只查询最近 N 个日志文件")
+        return p
+
+    add_parser('index', "建立或增量更新所有日志文件的索引")
+
+    p_tail = add_parser('tail', "输出最后 N 行", dates=False)
+    p_tail.add_argument('-n', '--lines', type=int, default=50, help="行数（默认 50）")
+
+    p_range = add_parser('range', "输出时间范围内的日志", dates=False)
+    p_range.add_argument('--from', dest='start', type=parse_datetime, required=True)
+    p_range.add_argument('--to', dest='end', type=parse_datetime, required=True)
+    p_range.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help=f"最多输出行数（默认 {DEFAULT_LIMIT}）")
+
+    for name, help_text in (('action', "输出指定 ACTION 的日志"), ('ip', "输出指定 IP 的日志")):
+        p = add_parser(name, help_text)
+        p.add_argument('value')
+        p.add_argument('--limit', type=int, default=DEFAULT_LIMIT, help=f"最多输出行数（默认 {DEFAULT_LIMIT}）")
+        p.add_argument('--count', action='store_true', help="只按索引统计每天的次数，不读取日志")
+
+    p_summary = add_parser('summary', "按天汇总行数、不同 IP 数和 ACTION 分布")
+    p_summary.add_argument('--top', type=int, default=10, help="显示最多的 ACTION 数（默认 10）")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    start_time = time.perf_counter()
+    logs_dir = os.path.abspath(args.logs)
+    if not os.path.isdir(logs_dir):
+        print(f"❌ 日志目录不存在: {logs_dir}")
+        return 1
+    index_dir = args.index_dir or os.path.join(logs_dir, INDEX_DIR_NAME)
+    files = list_log_files(logs_dir)
+
+    if args.command == 'tail':
+        for line in tail_lines(files, args.lines):
+            print(line)
+        return 0
+
+    if args.command == 'range':
+        if args.end < args.start:
+            print("❌ --to 早于 --from")
+            return 1
+        files = select_log_files(files, since=args.start.strftime("%Y-%m-%d"), until=args.end.strftime("%Y-%m-%d"))
+    else:
+        files = select_log_files(files, date=args.date, days=args.days)
+
+    stats = {}
+    indexes = open_indexes(files, index_dir, not args.no_update, stats)
+
+    if args.command == 'index':
+        print(f"日志文件: {len(files)} 个，更新索引 {stats.get('updated', 0)} 个，新增 {stats.get('lines', 0)} 行"
+              f"（{time.perf_counter() - start_time:.2f} 秒）")
+        print(f"索引目录: {index_dir}")
+    elif args.command == 'range':
+        for line in query_time_range(files, indexes, args.start, args.end, args.limit):
+            print(line)
+    elif args.command in ('action', 'ip'):
+        field = 'actions' if args.command == 'action' else 'ips'
+        if args.count:
+            total = 0
+            for (date, _, _, _), index in zip(files, indexes):
+                entry = (getattr(index, field) or {}).get(args.value)
+                if entry:
+                    total += entry[0]
+                    print(f"{date}  {entry[0]:>8}")
+            print(f"合计: {total}")
+        else:
+            for line in query_postings(indexes, field, args.value, args.limit):
+                print(line)
+    elif args.command == 'summary':
+        rows, distinct_ips, top_actions = summarize(files, indexes, args.top)
+        print(f"{'日期':<12}{'行数':>10}{'已解析':>10}{'不同IP':>8}{'大小':>10}  最多的 ACTION")
+        for date, lines, parsed, ips, size, busiest in rows:
+            print(f"{date:<12}{lines:>10}{parsed:>10}{ips:>8}{scan_project.format_size(size):>10}  {busiest}")
+        print("-" * 80)
+        print(f"{len(rows)} 天，共 {sum(r[1] for r in rows)} 行，不同 IP 约 {distinct_ips} 个（HyperLogLog 估计）")
+        for action, count in top_actions:
+            print(f"  {action:<36}{count:>10}")
+        print(f"耗时 {time.perf_counter() - start_time:.2f} 秒（更新索引 {stats.get('updated', 0)} 个）")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
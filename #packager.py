@@ -7,11 +7,110 @@ VacantRoomWeb 项目代码打包脚本
 """
 
 import os
-import glob
+import sys
 import json
 import re
+import io
+import glob
+import gzip
+import zlib
+import struct
+import hashlib
+import argparse
+import mmap
+import select
+import shutil
+import time
+import math
+import zipfile
+import xml.etree.ElementTree as ET
+from collections import Counter, defaultdict, deque, namedtuple
+from contextlib import contextmanager, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from datetime import datetime
+from _script_loader import load_script
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+path_matcher = load_script("#path_matcher.py", "path_matcher")
+
+try:
+    import zstandard
+except ImportError:  # 未安装时压缩包使用 gzip
+    zstandard = None
+
+try:
+    import numpy as np
+except ImportError:  # 未安装时高熵检测逐个片段计算
+    np = None
+
+# ✨各掩码规则的命中次数（--profile 报告使用）
+RULE_HITS = Counter()
+
+# ✨线性时间保证：C# 规则使用不回溯的等价写法，任何长度的行都是线性时间
+# 兜底：超过 MASK_LONG_LINE 个字符的行（压缩或生成的单行代码），以及单个文件掩码超过 MASK_TIME_BUDGET 秒后的行，
+# 跳过精确规则，改为掩码该行所有字符串字面量（宁可多掩码），跳过的行数记录在 RULE_FALLBACKS 中并在输出统计中报告
+MASK_LONG_LINE = 16 * 1024
+MASK_TIME_BUDGET = 2.0
+RULE_FALLBACKS = Counter()
+FALLBACK_REASONS = {
+    'long_line': f"超长行（> {MASK_LONG_LINE // 1024}K 字符）",
+    'time_budget': f"超出单文件时间预算（{MASK_TIME_BUDGET:g} 秒）",
+}
+
+def take_fallbacks(before: Counter) -> dict:
+    """
+    取出 before 之后新增的兜底计数并从 RULE_FALLBACKS 中扣除
+    计数随掩码结果或缓存记录返回，由输出阶段统一合并，进程池与串行执行的统计一致
+    """
+    fallbacks = RULE_FALLBACKS - before
+    RULE_FALLBACKS.subtract(fallbacks)
+    return dict(fallbacks)
+
+def print_fallback_stats(fallbacks):
+    print("\n掩码兜底（跳过精确规则，改为掩码所有字符串字面量）:")
+    for reason, count in sorted(fallbacks.items(), key=lambda kv: kv[1], reverse=True):
+        print(f"  {FALLBACK_REASONS.get(reason, reason)}: {count} 行")
+
+class MaskingBudget:
+    """单个文件的掩码时间预算，超出后该文件剩余的行都使用兜底规则"""
+
+    def __init__(self, seconds: float = None):
+        self.deadline = time.perf_counter() + (MASK_TIME_BUDGET if seconds is None else seconds)
+        self.exceeded = False
+
+    def is_exceeded(self) -> bool:
+        if not self.exceeded and time.perf_counter() > self.deadline:
+            self.exceeded = True
+        return self.exceeded
+
+def sub_candidates(pattern, text: str, replace) -> str:
+    r"""
+    与 pattern.sub 相同，但 replace 返回 None 时视为该位置不匹配，从下一个字符继续查找
+    用于"宽松模式匹配 + 单独检查关键词"的线性写法：结果与关键词写在正则中的原始规则一致，
+    但不会出现 \w*(关键词)\w* 在长单词上逐位置回溯的平方级耗时
+    """
+    out = []
+    pos = last = 0
+    while True:
+        match = pattern.search(text, pos)
+        if match is None:
+            break
+        replacement = replace(match)
+        if replacement is None:
+            pos = match.start() + 1
+            continue
+        out.append(text[last:match.start()])
+        out.append(replacement)
+        last = pos = match.end()
+    if not out:
+        return text
+    out.append(text[last:])
+    return ''.join(out)
+
+# 兜底规则：相邻两个同类引号之间的内容，从一个引号最多扫描到下一个引号，整行线性时间
+_QUOTED_LITERAL = re.compile(r'(["\'])([^"\'\n]+)\1')
 
 # ✨增强的掩码函数
 def mask_value(val: str, min_show: int = None) -> str:
@@ -45,10 +144,95 @@ SENSITIVE_KEYWORDS = [
     'database', 'server', 'userid', 'user_id', 'username', 'admin'
 ]
 
+class MaskingEngine:
+    """
+    预编译的敏感信息掩码引擎（每次运行只编译一次）
+    - 所有关键词合并为一个正则作为预过滤，不含敏感关键词的文件/行直接原样返回
+    - 赋值、const string、Configuration[...] 三条规则预先编译，行内缺少 const / Configuration 时跳过对应规则
+    - 三条规则的正则不含关键词，标识符从单词开头完整匹配后再检查关键词（见 sub_candidates），保证线性时间
+    - raw_prefilter 直接在原始字节上判断文件是否可能含敏感关键词
+    - 规则仍按原顺序依次作用于同一行，输出与 process_csharp_content_reference 逐字节一致
+      （超长行和超出时间预算后的兜底规则除外）
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(keywords)
+        alternation = '|'.join(self.keywords)
+        self.key_pattern = re.compile(alternation)
+        self.prefilter = re.compile(alternation, re.IGNORECASE)
+        self.raw_prefilter = re.compile(alternation.encode('ascii') + _CASEFOLD_LOOKALIKES, re.IGNORECASE)
+        self.const_hint = re.compile(r'const', re.IGNORECASE)
+        self.config_hint = re.compile(r'Configuration\[', re.IGNORECASE)
+        # 原始规则中的 \w*(关键词)\w* 只能匹配完整单词，这里先匹配完整单词，关键词在回调中检查
+        self.assignment_pattern = re.compile(r'(?<!\w)(\w+)\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+        self.const_pattern = re.compile(
+            r'(const\s+string\s+(\w+)\s*=\s*["\'])([^"\']+)(["\'])', re.IGNORECASE)
+        self.config_pattern = re.compile(
+            r'(Configuration\[["\']([^"\']*)["\']]\s*=\s*["\'])([^"\']+)(["\'])', re.IGNORECASE)
+
+    def is_sensitive_key(self, key: str) -> bool:
+        return self.key_pattern.search(key.lower()) is not None
+
+    def _replace_assignment(self, match):
+        var_name, value = match.groups()
+        if not self.prefilter.search(var_name):
+            return None
+        if self.is_sensitive_key(var_name):
+            RULE_HITS['csharp_assignment'] += 1
+            return f'{var_name} = "{mask_value(value)}"'
+        return match.group(0)
+
+    def _replace_const(self, match):
+        prefix, name, value, suffix = match.groups()
+        if not self.prefilter.search(name):
+            return None
+        RULE_HITS['csharp_const'] += 1
+        return f'{prefix}{mask_value(value)}{suffix}'
+
+    def _replace_config(self, match):
+        prefix, key, value, suffix = match.groups()
+        if not self.prefilter.search(key):
+            return None
+        RULE_HITS['csharp_configuration'] += 1
+        return f'{prefix}{mask_value(value)}{suffix}'
+
+    @staticmethod
+    def _replace_literal(match):
+        quote, value = match.groups()
+        RULE_HITS['csharp_fallback'] += 1
+        return f'{quote}{mask_value(value)}{quote}'
+
+    def process_csharp_line(self, line: str, budget: MaskingBudget = None) -> str:
+        if not self.prefilter.search(line):
+            return line
+        if len(line) > MASK_LONG_LINE or (budget is not None and budget.is_exceeded()):
+            RULE_FALLBACKS['long_line' if len(line) > MASK_LONG_LINE else 'time_budget'] += 1
+            return _QUOTED_LITERAL.sub(self._replace_literal, line)
+        line = sub_candidates(self.assignment_pattern, line, self._replace_assignment)
+        if self.const_hint.search(line):
+            line = sub_candidates(self.const_pattern, line, self._replace_const)
+        if self.config_hint.search(line):
+            line = sub_candidates(self.config_pattern, line, self._replace_config)
+        return line
+
+    def process_csharp(self, content: str) -> str:
+        if not self.prefilter.search(content):
+            return content
+        budget = MaskingBudget()
+        return '\n'.join(self.process_csharp_line(line, budget) for line in content.split('\n'))
+
+_masking_engine = None
+
+def get_masking_engine() -> MaskingEngine:
+    """获取当前关键词列表对应的掩码引擎（关键词列表变化时重新编译）"""
+    global _masking_engine
+    if _masking_engine is None or _masking_engine.keywords != tuple(SENSITIVE_KEYWORDS):
+        _masking_engine = MaskingEngine(SENSITIVE_KEYWORDS)
+    return _masking_engine
+
 def is_sensitive_key(key: str) -> bool:
     """检查键名是否包含敏感关键词"""
-    key_lower = key.lower()
-    return any(keyword in key_lower for keyword in SENSITIVE_KEYWORDS)
+    return get_masking_engine().is_sensitive_key(key)
 
 def mask_connection_string(conn_str: str) -> str:
     """智能处理连接字符串，只掩码敏感部分"""
@@ -71,14 +255,106 @@ def mask_connection_string(conn_str: str) -> str:
     
     return result
 
+class JsonStreamMasker:
+    """
+    基于词法扫描的 JSON 掩码器，保持原始格式（不做 json.loads + json.dumps 往返）
+    - 按块输入，未完整的词法单元留到下一块，内存占用与块大小相当
+    - 与 mask_json_recursive 规则一致：对象中敏感键的字符串值被掩码，连接字符串只掩码敏感部分
+    - 允许 // 和 /* */ 注释（appsettings.json 中常见）
+    """
+
+    TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"|//[^\n]*\n|/\*.*?\*/|\s+|[{}\[\]:,]|[^"{}\[\]:,\s/]+|.', re.S)
+
+    def __init__(self):
+        self.carry = ''
+        self.stack = []
+        self.expect_key = False
+        self.after_colon = False
+        self.current_key = None
+        self.changed = False
+
+    def feed(self, chunk: str, final: bool = False) -> str:
+        """输入一块文本，返回可以输出的掩码结果；final=True 时输出全部剩余内容"""
+        buf = self.carry + chunk if self.carry else chunk
+        out = []
+        pos = 0
+        n = len(buf)
+        while pos < n:
+            match = self.TOKEN.match(buf, pos)
+            end = match.end()
+            if not final and (end == n or self._is_incomplete(buf, pos, match.group())):
+                break
+            out.append(self._emit(match.group()))
+            pos = end
+        self.carry = buf[pos:]
+        return ''.join(out)
+
+    @staticmethod
+    def _is_incomplete(buf: str, pos: int, token: str) -> bool:
+        """字符串或注释被块边界截断"""
+        if token == '"':
+            return buf.find('\n', pos) == -1
+        if token == '/':
+            return buf.startswith('/*', pos) or buf.startswith('//', pos)
+        return False
+
+    @staticmethod
+    def _decode(token: str):
+        try:
+            return json.loads(token)
+        except ValueError:
+            return None
+
+    def _emit(self, token: str) -> str:
+        top = self.stack[-1] if self.stack else None
+        if token.isspace() or token.startswith('//') or token.startswith('/*'):
+            pass
+        elif token in ('{', '['):
+            self.stack.append(token)
+            self.expect_key = token == '{'
+            self.after_colon = False
+        elif token in ('}', ']'):
+            if self.stack:
+                self.stack.pop()
+            self.expect_key = False
+            self.after_colon = False
+        elif token == ',':
+            self.expect_key = top == '{'
+            self.after_colon = False
+        elif token == ':':
+            self.after_colon = top == '{'
+        elif token.startswith('"') and len(token) > 1:
+            if top == '{' and self.expect_key:
+                self.current_key = self._decode(token)
+                self.expect_key = False
+            elif self.after_colon:
+                self.after_colon = False
+                return self._mask_string(token)
+        else:
+            self.after_colon = False
+        return token
+
+    def _mask_string(self, token: str) -> str:
+        key = self.current_key
+        if not isinstance(key, str) or not is_sensitive_key(key):
+            return token
+        value = self._decode(token)
+        if not isinstance(value, str):
+            return token
+        # 特殊处理连接字符串
+        if 'connection' in key.lower():
+            masked = mask_connection_string(value)
+        else:
+            masked = mask_value(value)
+        if masked == value:
+            return token
+        RULE_HITS['json_value'] += 1
+        self.changed = True
+        return json.dumps(masked, ensure_ascii=False)
+
 def process_json_content(content: str) -> str:
-    """处理JSON文件中的敏感信息"""
-    try:
-        data = json.loads(content)
-        processed_data = mask_json_recursive(data)
-        return json.dumps(processed_data, indent=2, ensure_ascii=False)
-    except json.JSONDecodeError:
-        return content
+    """处理JSON文件中的敏感信息（保持原始格式）"""
+    return JsonStreamMasker().feed(content, final=True)
 
 def mask_json_recursive(obj):
     """递归处理JSON对象中的敏感信息"""
@@ -103,6 +379,10 @@ def mask_json_recursive(obj):
 
 def process_csharp_content(content: str) -> str:
     """处理C#代码中的敏感信息"""
+    return get_masking_engine().process_csharp(content)
+
+def process_csharp_content_reference(content: str) -> str:
+    """逐行构建并执行三个正则的原始实现，作为 MaskingEngine 的差分校验基准"""
     lines = content.split('\n')
     processed_lines = []
     
@@ -143,44 +423,71 @@ def process_csharp_content(content: str) -> str:
     
     return '\n'.join(processed_lines)
 
+def verify_masking_engine(contents) -> list:
+    """
+    差分校验：对比 MaskingEngine 与原始实现的输出
+    返回不一致的 (序号, 原始实现输出, 引擎输出) 列表，空列表表示逐字节一致
+    """
+    mismatches = []
+    for index, content in enumerate(contents):
+        expected = process_csharp_content_reference(content)
+        actual = process_csharp_content(content)
+        if actual != expected:
+            mismatches.append((index, expected, actual))
+    return mismatches
+
+_CONFIG_SEPARATOR = re.compile(r'[=:]')
+
+def mask_config_line(line: str) -> str:
+    r"""
+    处理单行 key=value 或 key:value 配置
+    与原正则 ^(\s*)([^=:]+)[=:](.+)$ 等价：键为第一个 = 或 : 之前的非空部分，值非空；
+    只查找一次分隔符，不会在长行上回溯
+    """
+    stripped = line.strip()
+    separator = _CONFIG_SEPARATOR.search(stripped)
+
+    if separator and 0 < separator.start() < len(stripped) - 1:
+        key, value = stripped[:separator.start()], stripped[separator.start() + 1:]
+        if is_sensitive_key(key.strip()):
+            RULE_HITS['config_kv'] += 1
+            return f'{key.strip()}={mask_value(value.strip())}'
+    return line
+
 def process_config_content(content: str) -> str:
     """处理其他配置文件中的敏感信息"""
     # 处理 key=value 格式
-    lines = content.split('\n')
-    processed_lines = []
-    
-    for line in lines:
-        # 匹配 key=value 或 key:value 格式
-        kv_pattern = r'^(\s*)([^=:]+)[=:](.+)$'
-        match = re.match(kv_pattern, line.strip())
-        
-        if match:
-            indent, key, value = match.groups()
-            if is_sensitive_key(key.strip()):
-                processed_line = f'{indent}{key.strip()}={mask_value(value.strip())}'
-            else:
-                processed_line = line
-        else:
-            processed_line = line
-        
-        processed_lines.append(processed_line)
-    
-    return '\n'.join(processed_lines)
+    return '\n'.join(mask_config_line(line) for line in content.split('\n'))
 
-def process_file_content(file_path: str, content: str) -> str:
-    """根据文件类型处理敏感信息"""
+def get_masking_kind(file_path: str):
+    """返回文件对应的掩码处理类型：'json' / 'csharp' / 'xml_config' / 'config'，无需处理时返回 None"""
     file_ext = os.path.splitext(file_path)[1].lower()
     file_name = os.path.basename(file_path).lower()
     
     if file_ext == '.json':
+        return 'json'
+    elif file_ext == '.cs':
+        return 'csharp'
+    elif file_ext in ['.config', '.xml'] and ('web.config' in file_name or 'app.config' in file_name):
+        return 'xml_config'
+    elif file_ext in ['.properties', '.ini', '.env']:
+        return 'config'
+    return None
+
+def process_file_content(file_path: str, content: str) -> str:
+    """根据文件类型处理敏感信息"""
+    kind = get_masking_kind(file_path)
+    
+    if kind == 'json':
         # 处理 JSON 配置文件
         return process_json_content(content)
-    elif file_ext == '.cs':
+    elif kind == 'csharp':
         # 处理 C# 代码文件
         return process_csharp_content(content)
-    elif file_ext in ['.config', '.xml'] and ('web.config' in file_name or 'app.config' in file_name):
+    elif kind == 'xml_config':
         # 处理 XML 配置文件中的环境变量
         def replacer(m):
+            RULE_HITS['xml_environment'] += 1
             name, val = m.group(1), m.group(2)
             return f'<environmentVariable name="{name}" value="{mask_value(val)}" />'
         
@@ -192,12 +499,461 @@ def process_file_content(file_path: str, content: str) -> str:
         content = process_config_content(content)
         
         return content
-    elif file_ext in ['.properties', '.ini', '.env']:
+    elif kind == 'config':
         # 处理其他配置文件格式
         return process_config_content(content)
     else:
         return content
 
+# ✨高熵字符串检测（第二层掩码）：变量名不含敏感关键词的硬编码密码、API 令牌按字符分布识别
+# 只有由 base64 / hex 字符组成、长度 ≥ ENTROPY_MIN_LENGTH 的连续片段是候选，逐个片段计算香农熵
+# 安装 numpy 时所有候选片段拼接为一个数组批量计算，否则逐个用 Counter 计算
+ENTROPY_MIN_LENGTH = 20
+# 熵阈值为该长度下可能的最大熵（log2(min(长度, 字母表大小))）乘以该比例
+ENTROPY_THRESHOLD_RATIO = 0.8
+# 大小写字母、数字之间切换的比例下限：随机串约 0.6，驼峰命名的标识符通常低于 0.35
+ENTROPY_MIN_CLASS_CHANGES = 0.4
+_ENTROPY_TOKEN = r'(?<![\w+/=\-])[A-Za-z0-9+/_\-]{%d,}={0,2}(?![\w+/=\-])' % ENTROPY_MIN_LENGTH
+_ENTROPY_TOKEN_PATTERN = re.compile(_ENTROPY_TOKEN)
+_ENTROPY_TOKEN_BYTES = re.compile(_ENTROPY_TOKEN.encode('ascii'))
+_HEX_TOKEN = re.compile(r'[0-9a-fA-F]+')
+_GUID_TOKEN = re.compile(r'[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}')
+# 字节所属的字符类别：0 小写字母、1 大写字母、2 数字、3 其他
+_CHAR_CLASSES = bytes(0 if 97 <= b <= 122 else 1 if 65 <= b <= 90 else 2 if 48 <= b <= 57 else 3
+                      for b in range(256))
+
+def _is_entropy_candidate(token: str, prefix: str) -> bool:
+    """在计算熵之前排除明显不是密钥的片段：不含数字或纯数字、GUID、data URI 中的 base64 图片"""
+    if token.isdigit() or not any(c.isdigit() for c in token):
+        return False
+    if _GUID_TOKEN.fullmatch(token):
+        return False
+    return not prefix.endswith('base64,')
+
+def _entropy_thresholds(tokens):
+    return [ENTROPY_THRESHOLD_RATIO * math.log2(min(len(t), 16 if _HEX_TOKEN.fullmatch(t) else 64)) for t in tokens]
+
+def token_entropy_stats(tokens) -> tuple:
+    """返回每个片段的 (香农熵列表, 字符类别切换比例列表)，片段为 ASCII 字符串"""
+    if not tokens:
+        return [], []
+    if np is None:
+        entropies, changes = [], []
+        for token in tokens:
+            length = len(token)
+            entropies.append(-sum(c / length * math.log2(c / length) for c in Counter(token).values()))
+            classes = token.encode('ascii').translate(_CHAR_CLASSES)
+            changes.append(sum(a != b for a, b in zip(classes, classes[1:])) / (length - 1))
+        return entropies, changes
+
+    # 每个字节的键为 片段序号 * 256 + 字节值，np.unique 统计各片段内每个字符的出现次数
+    lengths = np.fromiter(map(len, tokens), dtype=np.int64, count=len(tokens))
+    buf = np.frombuffer(''.join(tokens).encode('ascii'), dtype=np.uint8)
+    segments = np.repeat(np.arange(len(tokens), dtype=np.int64), lengths)
+    keys, counts = np.unique(segments * 256 + buf, return_counts=True)
+    key_segments = keys >> 8
+    p = counts / lengths[key_segments]
+    entropies = np.bincount(key_segments, weights=-p * np.log2(p), minlength=len(tokens))
+
+    # 相邻字节类别不同且属于同一片段时记为一次切换
+    classes = np.frombuffer(buf.tobytes().translate(_CHAR_CLASSES), dtype=np.uint8)
+    switched = (classes[1:] != classes[:-1]) & (segments[1:] == segments[:-1])
+    changes = np.bincount(segments[1:][switched], minlength=len(tokens)) / (lengths - 1)
+    return entropies.tolist(), changes.tolist()
+
+def find_high_entropy_spans(text: str) -> list:
+    """返回文本中高熵片段的 [(起始, 结束)]"""
+    matches = [m for m in _ENTROPY_TOKEN_PATTERN.finditer(text)
+               if _is_entropy_candidate(m.group(), text[max(m.start() - 7, 0):m.start()])]
+    tokens = [m.group().rstrip('=') for m in matches]
+    entropies, changes = token_entropy_stats(tokens)
+    return [m.span() for m, token, entropy, change, threshold
+            in zip(matches, tokens, entropies, changes, _entropy_thresholds(tokens))
+            if entropy >= threshold and (change >= ENTROPY_MIN_CLASS_CHANGES or _HEX_TOKEN.fullmatch(token))]
+
+def has_high_entropy(data) -> bool:
+    """直接在原始字节上判断是否含高熵片段（候选片段只含 ASCII 字符，无需解码）"""
+    if not _ENTROPY_TOKEN_BYTES.search(data):
+        return False
+    return bool(find_high_entropy_spans(str(data, 'utf-8', 'ignore')))
+
+def mask_high_entropy(content: str) -> str:
+    """用 mask_value 掩码所有高熵片段；掩码后追加的 **** 会截断片段，重复执行结果不变"""
+    spans = find_high_entropy_spans(content)
+    if not spans:
+        return content
+    RULE_HITS['entropy'] += len(spans)
+    pieces = []
+    last = 0
+    for start, end in spans:
+        pieces.append(content[last:start])
+        pieces.append(mask_value(content[start:end]))
+        last = end
+    pieces.append(content[last:])
+    return ''.join(pieces)
+
+# ✨精简模式：去掉注释和多余空白，字符串字面量保持不变
+# 每种语言使用一个单次扫描的正则：各分支在起始符号匹配后必定成功（未闭合的字符串延伸到行尾，
+# 未闭合的注释延伸到文件尾），重复部分均为无歧义的展开循环，re.sub 对每个字符只扫描常数次，整体为线性时间
+_CSHARP_COMPACT_PATTERN = re.compile(r'''
+    (?P<keep>
+        \$*"""[\s\S]*?(?:"""|\Z)                      # 原始字符串 """..."""
+      | (?:\$@|@\$|@)"[^"]*(?:""[^"]*)*(?:"|\Z)       # 逐字字符串 @"..."
+      | \$?"[^"\\\n]*(?:\\.[^"\\\n]*)*(?:"|$)         # 普通 / 插值字符串
+      | '[^'\\\n]*(?:\\.[^'\\\n]*)*(?:'|$)            # 字符字面量
+    )
+  | (?P<comment>
+        \s*//[^\n]*                                  # // 和 /// 注释
+      | \s*/\*[^*]*\*+(?:[^/*][^*]*\*+)*/              # /* */ 注释
+      | \s*/\*[\s\S]*\Z                              # 未闭合的 /* 注释
+    )
+  | (?P<space>\s\s+|[^\S ])                          # 单个空格无需替换
+''', re.VERBOSE | re.MULTILINE)
+
+_RAZOR_COMPACT_PATTERN = re.compile(r'''
+    (?P<keep>
+        "[^"\\\n]*(?:\\.[^"\\\n]*)*(?:"|$)              # 属性值 / C# 字符串
+      | '[^'\\\n]*(?:\\.[^'\\\n]*)*(?:'|$)
+    )
+  | (?P<comment>\s*@\*[\s\S]*?(?:\*@|\Z))              # @* *@ 注释
+  | (?P<space>\s\s+|[^\S ])                          # 单个空格无需替换
+''', re.VERBOSE | re.MULTILINE)
+
+_CSS_COMPACT_PATTERN = re.compile(r'''
+    (?P<keep>
+        "[^"\\\n]*(?:\\.[^"\\\n]*)*(?:"|$)
+      | '[^'\\\n]*(?:\\.[^'\\\n]*)*(?:'|$)
+    )
+  | (?P<comment>
+        \s*/\*[^*]*\*+(?:[^/*][^*]*\*+)*/
+      | \s*/\*[\s\S]*\Z
+    )
+  | (?P<space>\s\s+|[^\S ])                          # 单个空格无需替换
+''', re.VERBOSE | re.MULTILINE)
+
+COMPACT_PATTERNS = {
+    '.cs': _CSHARP_COMPACT_PATTERN,
+    '.razor': _RAZOR_COMPACT_PATTERN,
+    '.cshtml': _RAZOR_COMPACT_PATTERN,
+    '.css': _CSS_COMPACT_PATTERN,
+}
+
+def get_compact_pattern(file_path: str):
+    """返回文件类型对应的精简正则，不支持的类型返回 None"""
+    return COMPACT_PATTERNS.get(os.path.splitext(file_path)[1].lower())
+
+def compact_content(file_path: str, content: str) -> str:
+    """
+    精简模式：去掉注释，缩进和空行合并为单个换行，行内连续空白合并为单个空格
+    在掩码之后执行，字符串字面量（包括多行逐字字符串）原样保留
+    """
+    pattern = get_compact_pattern(file_path)
+    if pattern is None:
+        return content
+
+    def replace(m):
+        kind = m.lastgroup
+        text = m.group()
+        if kind == 'keep':
+            return text
+        if kind == 'space':
+            return '\n' if '\n' in text else ' '
+        # 注释后面紧跟空白时由空白负责分隔，否则保留一个分隔符，避免前后两个记号粘连
+        end = m.end()
+        if end >= len(content) or content[end].isspace():
+            return ''
+        lead = text[:len(text) - len(text.lstrip())]
+        return '\n' if '\n' in lead else ' '
+
+    return pattern.sub(replace, content).strip()
+
+def add_compact_stats(stats: dict, file_path: str, out_size: int, saved: int):
+    """按扩展名累计精简前后的字节数 {扩展名: [文件数, 精简前, 精简后]}"""
+    ext = os.path.splitext(file_path)[1].lower() or '(无扩展名)'
+    item = stats.setdefault(ext, [0, 0, 0])
+    item[0] += 1
+    item[1] += out_size + saved
+    item[2] += out_size
+
+def merge_compact_stats(target: dict, stats: dict):
+    for ext, (files, before, after) in stats.items():
+        item = target.setdefault(ext, [0, 0, 0])
+        item[0] += files
+        item[1] += before
+        item[2] += after
+
+def print_compact_stats(stats: dict):
+    print("\n精简统计（按文件类型）:")
+    for ext, (files, before, after) in sorted(stats.items(), key=lambda kv: kv[1][1] - kv[1][2], reverse=True):
+        saved = before - after
+        ratio = saved / before * 100 if before else 0
+        print(f"  {ext:<10} {files:>4} 个文件  {get_file_size_from_bytes(before):>10} -> "
+              f"{get_file_size_from_bytes(after):>10}  节省 {get_file_size_from_bytes(saved)} ({ratio:.1f}%)")
+
+# ✨Excel 工作簿摘要：Data/*.xlsx 不输出原始内容，改为输出结构和取值概况
+# 直接用 zipfile 流式解压、iterparse 逐行解析工作表，每行处理完立即释放，内存占用与工作簿大小无关
+# 工作表先扫描一遍，只记录共享字符串的序号；之后再流式读取共享字符串表，只保留用到的字符串
+XLSX_SAMPLE_ROWS = 5
+# 每列最多记录的不同取值数，超过后只计数
+XLSX_MAX_DISTINCT = 500
+# 每个工作表最多扫描的行数，超过后提前结束
+XLSX_MAX_ROWS = 200000
+# 需要统计不同取值的列：按表头关键词识别，找不到时使用 VacantRoomService 读取的列号（从 1 开始）
+XLSX_KEY_COLUMNS = [
+    ('教室', ('上课地点', '教室', '地点', 'room'), 16),
+    ('周次', ('起止周', '周次', 'week'), 15),
+    ('节次', ('上课时间', '节次', 'period'), 14),
+]
+_XLSX_NS = {
+    'main': 'http://schemas.openxmlformats.org/spreadsheetml/2006/main',
+    'rel': 'http://schemas.openxmlformats.org/officeDocument/2006/relationships',
+    'pkg': 'http://schemas.openxmlformats.org/package/2006/relationships',
+}
+_CELL_REF = re.compile(r'[A-Z]+')
+_XLSX_TAGS = {name: f"{{{_XLSX_NS['main']}}}{name}" for name in ('sheet', 'sheetData', 'dimension', 'row', 'v', 't', 'rPh', 'si')}
+
+def is_workbook(file_path: str) -> bool:
+    return file_path.lower().endswith('.xlsx')
+
+def column_letter(index: int) -> str:
+    """列号（从 1 开始）转为 Excel 列字母"""
+    letters = ''
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(65 + rem) + letters
+    return letters
+
+def column_index(letters: str) -> int:
+    index = 0
+    for c in letters:
+        index = index * 26 + ord(c) - 64
+    return index
+
+def list_workbook_sheets(zf: zipfile.ZipFile) -> list:
+    """返回 [(工作表名, zip 内路径)]，按工作簿中的顺序"""
+    with zf.open('xl/_rels/workbook.xml.rels') as f:
+        targets = {rel.get('Id'): rel.get('Target') for rel in ET.parse(f).getroot()}
+    sheets = []
+    with zf.open('xl/workbook.xml') as f:
+        for sheet in ET.parse(f).getroot().iter(_XLSX_TAGS['sheet']):
+            target = targets.get(sheet.get(f"{{{_XLSX_NS['rel']}}}id"), '')
+            target = target.lstrip('/') if target.startswith('/') else 'xl/' + target
+            sheets.append((sheet.get('name'), target))
+    return sheets
+
+class SheetDigest:
+    """单个工作表的扫描结果，字符串单元格暂存为共享字符串序号（int），数值等保持原文本"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.dimension = None
+        self.rows = 0
+        self.truncated = False
+        self.header = {}
+        self.samples = []
+        self.key_columns = []
+        self.distinct = {}
+
+    def add_row(self, cells: dict):
+        if not self.header:
+            self.header = cells
+            return
+        self.rows += 1
+        if len(self.samples) < XLSX_SAMPLE_ROWS:
+            self.samples.append(cells)
+        for _, column in self.key_columns:
+            value = cells.get(column)
+            values = self.distinct[column]
+            if value not in (None, '') and len(values) < XLSX_MAX_DISTINCT:
+                values.add(value)
+
+    def referenced_strings(self) -> set:
+        refs = set()
+        for cells in [self.header, *self.samples]:
+            refs.update(v for v in cells.values() if isinstance(v, int))
+        for values in self.distinct.values():
+            refs.update(v for v in values if isinstance(v, int))
+        return refs
+
+def _read_cell_value(cell):
+    """返回单元格的值：共享字符串返回序号，其余返回文本"""
+    cell_type = cell.get('t')
+    if cell_type == 'inlineStr':
+        return ''.join(t.text or '' for t in cell.iter(_XLSX_TAGS['t']))
+    value = cell.find(_XLSX_TAGS['v'])
+    if value is None or value.text is None:
+        return None
+    return int(value.text) if cell_type == 's' else value.text
+
+def scan_sheet(zf: zipfile.ZipFile, name: str, path: str, shared_lookup=None) -> SheetDigest:
+    """流式扫描工作表：读取范围、表头、前几行样例和关键列的不同取值"""
+    digest = SheetDigest(name)
+    sheet_data = None
+    row_tag, sheet_data_tag, dimension_tag = _XLSX_TAGS['row'], _XLSX_TAGS['sheetData'], _XLSX_TAGS['dimension']
+    with zf.open(path) as f:
+        for event, elem in ET.iterparse(f, events=('start', 'end')):
+            if event == 'start':
+                if elem.tag == sheet_data_tag:
+                    sheet_data = elem
+                continue
+            if elem.tag == dimension_tag:
+                digest.dimension = elem.get('ref')
+            elif elem.tag == row_tag:
+                cells = {}
+                position = 0
+                for cell in elem:
+                    match = _CELL_REF.match(cell.get('r', ''))
+                    position = column_index(match.group()) if match else position + 1
+                    value = _read_cell_value(cell)
+                    if value is not None:
+                        cells[position] = value
+                if cells:
+                    if not digest.header:
+                        digest.key_columns = _find_key_columns(cells, shared_lookup)
+                        digest.distinct = {column: set() for _, column in digest.key_columns}
+                    digest.add_row(cells)
+                # 已处理的行立即释放
+                sheet_data.clear()
+                if digest.rows >= XLSX_MAX_ROWS:
+                    digest.truncated = True
+                    break
+    return digest
+
+def _find_key_columns(header: dict, shared_lookup) -> list:
+    """按表头关键词确定需要统计不同取值的列，返回 [(标签, 列号)]"""
+    names = {column: str(shared_lookup(value) if isinstance(value, int) else value).strip().lower()
+             for column, value in header.items()}
+    columns = []
+    for label, keywords, fallback in XLSX_KEY_COLUMNS:
+        column = next((c for c, name in sorted(names.items()) if any(k in name for k in keywords)), fallback)
+        columns.append((label, column))
+    return columns
+
+def read_shared_strings(zf: zipfile.ZipFile, wanted: set) -> dict:
+    """流式读取共享字符串表，只保留 wanted 中的序号"""
+    strings = {}
+    if not wanted or 'xl/sharedStrings.xml' not in zf.NameToInfo:
+        return strings
+    last = max(wanted)
+    index = 0
+    with zf.open('xl/sharedStrings.xml') as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != _XLSX_TAGS['si']:
+                continue
+            if index in wanted:
+                # 富文本中的拼音注释（rPh）不属于单元格文本
+                phonetic = {t for rph in elem.iter(_XLSX_TAGS['rPh']) for t in rph.iter(_XLSX_TAGS['t'])}
+                strings[index] = ''.join(t.text or '' for t in elem.iter(_XLSX_TAGS['t']) if t not in phonetic)
+            elem.clear()
+            index += 1
+            if index > last:
+                break
+    return strings
+
+def summarize_workbook(file_path: str) -> str:
+    """生成工作簿摘要文本：工作表列表、范围、表头、关键列的不同取值和样例行"""
+    with zipfile.ZipFile(file_path) as zf:
+        sheets = list_workbook_sheets(zf)
+        # 表头需要先解析才能识别关键列，只为表头单独读取一次共享字符串
+        header_strings = {}
+
+        def header_lookup(index):
+            if index not in header_strings:
+                header_strings.update(read_shared_strings(zf, {index}))
+            return header_strings.get(index, '')
+
+        digests = [scan_sheet(zf, name, path, header_lookup) for name, path in sheets]
+        wanted = set().union(*(d.referenced_strings() for d in digests))
+        strings = read_shared_strings(zf, wanted)
+
+    def text(value):
+        return strings.get(value, '') if isinstance(value, int) else value
+
+    lines = [f"Excel 工作簿摘要（原文件 {get_file_size_from_bytes(os.path.getsize(file_path))}，"
+             f"只包含结构和取值概况）",
+             "工作表: " + ", ".join(f"{d.name} ({d.dimension or '-'})" for d in digests)]
+    for digest in digests:
+        lines.append(f"\n## {digest.name}")
+        if not digest.header:
+            lines.append("空工作表")
+            continue
+        lines.append(f"范围: {digest.dimension or '-'}，数据行: {digest.rows}"
+                     + (f"（只扫描了前 {XLSX_MAX_ROWS} 行）" if digest.truncated else ""))
+        lines.append("表头: " + " | ".join(f"{column_letter(c)} {text(v)}"
+                                          for c, v in sorted(digest.header.items())))
+        for label, column in digest.key_columns:
+            values = sorted({text(v).strip() for v in digest.distinct[column]} - {''})
+            more = "及更多" if len(digest.distinct[column]) >= XLSX_MAX_DISTINCT else ""
+            title = text(digest.header.get(column, '')) or label
+            lines.append(f"{title}（{column_letter(column)} 列，{len(values)} 个{more}不同取值）: "
+                         + ", ".join(values))
+        lines.append(f"样例（前 {len(digest.samples)} 行）:")
+        for cells in digest.samples:
+            lines.append(("  " + " | ".join(text(cells.get(c, '')) for c in sorted(digest.header))).rstrip())
+    return "\n".join(lines) + "\n"
+
+# ✨无需掩码文件的字节级直通
+# 大于该阈值的文件使用 mmap 扫描，避免整体读入内存
+MMAP_THRESHOLD = 1024 * 1024
+
+# re.IGNORECASE 下会匹配 ASCII 字母的非 ASCII 字符（İ ı ſ K），字节级扫描时一律视为命中
+_CASEFOLD_LOOKALIKES = rb'|\xc4\xb0|\xc4\xb1|\xc5\xbf|\xe2\x84\xaa'
+_NON_ASCII_BYTES = re.compile(rb'[\x80-\xff]')
+# 文本模式读写会改变的换行符：Linux 下任何 \r；Windows 下单独的 \r 或 \n
+_UNSTABLE_NEWLINES = re.compile(rb'\r' if os.linesep == '\n' else rb'\r(?!\n)|(?<!\r)\n')
+
+def count_bytes(data, needle: bytes) -> int:
+    """统计字节串出现次数（兼容 mmap）"""
+    if isinstance(data, bytes):
+        return data.count(needle)
+    return sum(data[i:i + MMAP_THRESHOLD].count(needle) for i in range(0, len(data), MMAP_THRESHOLD))
+
+def is_raw_copy_safe(data) -> bool:
+    """原始字节直接写入输出，是否与按文本模式读取再写出的结果逐字节一致"""
+    if _UNSTABLE_NEWLINES.search(data):
+        return False
+    if _NON_ASCII_BYTES.search(data):
+        try:
+            str(data, 'utf-8')
+        except UnicodeDecodeError:
+            return False
+    return True
+
+def can_passthrough(file_path: str, data) -> bool:
+    """判断文件能否跳过解码和掩码，直接复制原始字节"""
+    kind = get_masking_kind(file_path)
+    if kind == 'json':
+        # JSON 会被重新格式化输出，不能直通
+        return False
+    if kind is not None:
+        if get_masking_engine().raw_prefilter.search(data):
+            return False
+        if kind == 'xml_config' and data.find(b'<environmentVariable') != -1:
+            return False
+    return is_raw_copy_safe(data)
+
+def copy_file_into(outf, file_path: str):
+    """将文件原始字节直接追加到文本输出流，优先使用 os.sendfile 零拷贝"""
+    outf.flush()
+    out = outf.buffer
+    out.flush()
+    with open(file_path, 'rb') as inf:
+        size = os.fstat(inf.fileno()).st_size
+        offset = 0
+        if hasattr(os, 'sendfile'):
+            try:
+                while offset < size:
+                    sent = os.sendfile(out.fileno(), inf.fileno(), offset, size - offset)
+                    if sent == 0:
+                        break
+                    offset += sent
+                return
+            except OSError:
+                pass
+        inf.seek(offset)
+        shutil.copyfileobj(inf, out, MMAP_THRESHOLD)
+        out.flush()
+
 def get_file_size_from_bytes(size_bytes):
     """将字节数转换为人类可读格式"""
     if size_bytes < 1024:
@@ -226,29 +982,118 @@ def get_file_extension_for_syntax(file_path):
     
     return syntax_map.get(ext, 'text')
 
-def should_skip_file(filename):
-    """判断是否应该跳过文件"""
-    skip_patterns = [
-        ".tmp", ".temp", ".bak", ".old", ".user", ".suo", ".cache",
-        ".dll", ".exe", ".pdb", ".deps.json"
-    ]
-    
-    skip_files = [
-        "bootstrap.min.css",
-        "bootstrap.min.css.map"
-    ]
-    
-    # 检查文件扩展名
-    for pattern in skip_patterns:
-        if filename.lower().endswith(pattern):
+def _normalize_case(path):
+    """Windows 下 glob 不区分大小写，保持同样的匹配语义"""
+    return path.lower() if os.name == 'nt' else path
+
+def glob_to_regex(pattern):
+    """将 glob 模式转换为正则（* 和 ? 不跨越 /，**/ 匹配零个或多个目录）"""
+    regex = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith('**/', i):
+            regex.append(r'(?:[^/]+/)*')
+            i += 3
+        elif pattern.startswith('**', i):
+            regex.append(r'.*')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append(r'[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append(r'[^/]')
+            i += 1
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+def compile_file_patterns(file_patterns):
+    """将所有包含模式编译为单个正则，每个文件只需匹配一次"""
+    combined = '|'.join(f'(?:{glob_to_regex(_normalize_case(p))})' for p in file_patterns)
+    return re.compile(combined)
+
+def get_pattern_scopes(file_patterns):
+    """
+    计算每个包含模式可能命中的目录范围 (字面前缀目录, 是否可继续向下)
+    例如 "Components/**/*.razor" -> ("Components", True)，"*.cs" -> ("", False)
+    """
+    scopes = []
+    for pattern in file_patterns:
+        literal = []
+        open_ended = False
+        for segment in _normalize_case(pattern).split('/')[:-1]:
+            if any(c in segment for c in '*?['):
+                open_ended = True
+                break
+            literal.append(segment)
+        scopes.append(('/'.join(literal), open_ended))
+    return scopes
+
+def should_enter_directory(rel_dir, scopes):
+    """判断目录下是否可能存在被包含模式命中的文件"""
+    rel_dir = _normalize_case(rel_dir)
+    for prefix, open_ended in scopes:
+        if prefix == rel_dir or prefix.startswith(rel_dir + '/'):
+            return True
+        if open_ended and (prefix == '' or rel_dir.startswith(prefix + '/')):
             return True
-    
-    # 检查特定文件名
-    if filename in skip_files:
-        return True
-        
     return False
 
+def walk_project_files(base_dir, file_patterns, ignore, profiler=None):
+    """
+    单次遍历项目目录，返回去重并按路径排序的文件记录 {'path', 'size', 'mtime'}
+    - ignore 为 #path_matcher.py 的 PathMatcher（工具规则 + .gitignore）
+    - 使用 os.scandir，进入目录前先按排除规则和包含模式范围剪枝（bin/ obj/ 等不会被遍历）
+    - 所有包含模式编译为一个匹配器，每个文件只匹配一次
+    - 与 glob 一致，跳过以 . 开头的隐藏文件和目录
+    - 传入 profiler 时分别统计遍历（discovery）和 stat 耗时
+    """
+    walk_start = time.perf_counter()
+    stat_time = 0.0
+    matcher = compile_file_patterns(file_patterns)
+    scopes = get_pattern_scopes(file_patterns)
+    records = {}
+    stack = ['']
+
+    while stack:
+        rel_dir = stack.pop()
+        try:
+            with os.scandir(os.path.join(base_dir, rel_dir) if rel_dir else base_dir) as it:
+                entries = list(it)
+        except OSError:
+            continue
+
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            try:
+                if entry.is_dir():
+                    if not ignore.is_ignored(rel_path, True) and should_enter_directory(rel_path, scopes):
+                        stack.append(rel_path)
+                    continue
+                if not entry.is_file() or not matcher.fullmatch(_normalize_case(rel_path)):
+                    continue
+                if ignore.is_ignored(rel_path):
+                    continue
+                stat_start = time.perf_counter()
+                file_stat = entry.stat()
+                stat_time += time.perf_counter() - stat_start
+            except OSError:
+                continue
+            records[rel_path] = {
+                'path': rel_path,
+                'size': file_stat.st_size,
+                'mtime': file_stat.st_mtime_ns
+            }
+
+    result = [records[path] for path in sorted(records)]
+    if profiler:
+        profiler.add('stat', stat_time)
+        profiler.add('discovery', time.perf_counter() - walk_start - stat_time)
+    return result
+
 def get_target_folders():
     """获取需要扫描的目标文件夹"""
     return [
@@ -267,34 +1112,1602 @@ def get_target_folders():
         "Properties"
     ]
 
-def combine_code_files():
+def assign_folders(file_records, target_folders):
+    """
+    为文件记录填写所属文件夹，返回按 (文件夹, 路径) 排序的文件列表和每个文件夹的文件数
+    根目录下的文件归入"根目录"，不在目标文件夹中的子目录文件不打包
+    """
+    all_files = []
+    folder_stats = {}  # 统计每个文件夹的文件数
+    for file_record in file_records:
+        normalized_path = file_record['path']
+
+        # 确定文件夹
+        folder_name = "根目录"
+        for folder in target_folders:
+            if normalized_path.startswith(folder + '/'):
+                folder_name = folder
+                break
+
+        if folder_name == "根目录" and '/' in normalized_path:
+            continue  # 跳过不在目标文件夹的文件
+
+        file_record['folder'] = folder_name
+        all_files.append(file_record)
+        folder_stats[folder_name] = folder_stats.get(folder_name, 0) + 1
+
+    return sorted(all_files, key=lambda x: (x['folder'], x['path'])), folder_stats
+
+# ✨增量打包缓存
+# 掩码规则（SENSITIVE_KEYWORDS / process_* 函数）发生变化时递增，使旧缓存全部失效
+MASKING_RULES_VERSION = 3
+
+def hash_bytes(data: bytes) -> str:
+    """计算内容哈希"""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+# ✨近似 token 统计：ASCII 约 4 字节一个 token，中文等非 ASCII 字符约一个字符一个 token
+_ASCII_BYTES = bytes(range(0x80))
+_UTF8_LEAD_BYTES = bytes(range(0xc0, 0x100))
+
+def count_token_units(data) -> tuple:
+    """返回 (ASCII 字节数, 非 ASCII 字符数)，只用 bytes.translate 计数（兼容 mmap）"""
+    ascii_bytes = non_ascii_chars = 0
+    for start in range(0, len(data), STREAM_CHUNK_SIZE):
+        chunk = data[start:start + STREAM_CHUNK_SIZE]
+        non_ascii = chunk.translate(None, _ASCII_BYTES)
+        ascii_bytes += len(chunk) - len(non_ascii)
+        non_ascii_chars += len(non_ascii) - len(non_ascii.translate(None, _UTF8_LEAD_BYTES))
+    return ascii_bytes, non_ascii_chars
+
+def tokens_from_units(ascii_bytes: int, non_ascii_chars: int) -> int:
+    return (ascii_bytes + 3) // 4 + non_ascii_chars
+
+def estimate_tokens(data) -> int:
+    """近似 token 数，用于分卷预算，不做真实分词"""
+    return tokens_from_units(*count_token_units(data))
+
+def decode_source(data: bytes) -> str:
+    """按文本模式 open(..., encoding='utf-8', errors='ignore') 的语义解码（含通用换行符转换）"""
+    text = str(data, 'utf-8', 'ignore')
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+# ✨大文件流式掩码
+# 超过该大小且类型支持流式处理的文件逐行/逐块掩码，直接写入输出，不整体读入内存
+STREAMING_THRESHOLD = 8 * 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 1024
+STREAMABLE_KINDS = ('json', 'csharp', 'config')
+
+class MaskedStreamWriter:
+    """流式写出掩码结果，同时统计 UTF-8 字节数和内容哈希"""
+
+    def __init__(self, text_out=None, binary_out=None):
+        self.text_out = text_out
+        self.binary_out = binary_out
+        self.size = 0
+        self.hasher = hashlib.blake2b(digest_size=16)
+        self.token_units = [0, 0]
+
+    def write(self, text: str):
+        if not text:
+            return
+        data = text.encode('utf-8')
+        self.size += len(data)
+        self.hasher.update(data)
+        ascii_bytes, non_ascii_chars = count_token_units(data)
+        self.token_units[0] += ascii_bytes
+        self.token_units[1] += non_ascii_chars
+        if self.binary_out is not None:
+            self.binary_out.write(data)
+        else:
+            self.text_out.write(text)
+
+    def hexdigest(self) -> str:
+        return self.hasher.hexdigest()
+
+    @property
+    def tokens(self) -> int:
+        return tokens_from_units(*self.token_units)
+
+def stream_masked_file(file_path: str, writer: MaskedStreamWriter) -> bool:
+    """
+    逐行（C# / 配置文件）或逐块（JSON）掩码文件并写入 writer，返回是否有内容被掩码
+    输出与 process_file_content 一致，峰值内存只与单行或单块大小有关
+    """
+    kind = get_masking_kind(file_path)
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as inf:
+        if kind == 'json':
+            masker = JsonStreamMasker()
+            for chunk in iter(lambda: inf.read(STREAM_CHUNK_SIZE), ''):
+                writer.write(masker.feed(chunk))
+            writer.write(masker.feed('', final=True))
+            return masker.changed
+
+        budget = MaskingBudget()
+        engine = get_masking_engine()
+        changed = False
+        for line in inf:
+            body = line[:-1] if line.endswith('\n') else line
+            masked = engine.process_csharp_line(body, budget) if kind == 'csharp' else mask_config_line(body)
+            if masked != body:
+                changed = True
+            writer.write(masked + line[len(body):])
+        return changed
+
+# 单个文件的处理结果
+# - content 为 None 且 passthrough 为 False：内容哈希与 known_hash 相同，未重新掩码
+# - passthrough 为 True：文件无需掩码，输出时直接复制原始字节
+# - streaming 为 True：大文件，输出时再调用 stream_masked_file 流式掩码
+# - profile：--profile 模式下的 读取/掩码耗时、输入字节数和规则命中次数
+MaskResult = namedtuple('MaskResult', ['content_hash', 'content', 'protected', 'passthrough', 'out_size',
+                                       'streaming', 'profile', 'tokens', 'compact_saved', 'fallbacks'],
+                        defaults=(False, None, None, 0, None))
+
+def mask_file_task(file_path: str, known_hash: str = None, profile: bool = False,
+                   compact: bool = False, entropy: bool = False) -> MaskResult:
+    """
+    读取并掩码单个文件（可在进程池中执行），大文件使用 mmap 扫描
+    compact 为 True 时掩码后再精简，entropy 为 True 时关键词掩码后再掩码高熵片段
+    使用兜底规则的行数通过 fallbacks 返回（见 take_fallbacks）
+    """
+    fallbacks_before = RULE_FALLBACKS.copy()
+    if not profile:
+        result = _mask_file(file_path, known_hash, compact=compact, entropy=entropy)
+        return result._replace(fallbacks=take_fallbacks(fallbacks_before) or None)
+
+    hits_before = RULE_HITS.copy()
+    timings = {}
+    start = time.perf_counter()
+    result = _mask_file(file_path, known_hash, timings, compact, entropy)
+    total = time.perf_counter() - start
+    read = timings.get('read_end', start + total) - start
+    return result._replace(fallbacks=take_fallbacks(fallbacks_before) or None, profile={
+        'read': read,
+        'mask': total - read,
+        'bytes_in': timings.get('bytes_in', 0),
+        'rules': dict(RULE_HITS - hits_before),
+    })
+
+def _mask_file(file_path: str, known_hash: str = None, timings: dict = None, compact: bool = False,
+               entropy: bool = False) -> MaskResult:
+    with open(file_path, 'rb') as inf:
+        if os.fstat(inf.fileno()).st_size >= MMAP_THRESHOLD:
+            data = mmap.mmap(inf.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            data = inf.read()
+    try:
+        content_hash = hash_bytes(data)
+        if timings is not None:
+            timings['read_end'] = time.perf_counter()
+            timings['bytes_in'] = len(data)
+        if content_hash == known_hash:
+            return MaskResult(content_hash, None, None, False, None)
+        if is_workbook(file_path):
+            # 工作簿输出摘要而不是原始内容
+            summary = summarize_workbook(file_path)
+            if entropy:
+                summary = mask_high_entropy(summary)
+            encoded = summary.encode('utf-8')
+            return MaskResult(content_hash, summary, False, False, len(encoded), tokens=estimate_tokens(encoded))
+        # 精简模式下需要精简的文件不能直通或流式处理
+        compactable = compact and get_compact_pattern(file_path) is not None
+        if (not compactable and can_passthrough(file_path, data)
+                and not (entropy and has_high_entropy(data))):
+            return MaskResult(content_hash, None, False, True, len(data) - count_bytes(data, b'\r'),
+                              tokens=estimate_tokens(data))
+        # 高熵检测需要完整内容，不使用流式处理
+        if (not compactable and not entropy and len(data) >= STREAMING_THRESHOLD
+                and get_masking_kind(file_path) in STREAMABLE_KINDS):
+            return MaskResult(content_hash, None, None, False, None, streaming=True)
+        original_content = decode_source(data)
+    finally:
+        if isinstance(data, mmap.mmap):
+            data.close()
+    file_content = process_file_content(file_path, original_content)
+    if entropy:
+        file_content = mask_high_entropy(file_content)
+    is_protected = file_content != original_content
+    compact_saved = 0
+    if compactable:
+        full_size = len(file_content.encode('utf-8'))
+        file_content = compact_content(file_path, file_content)
+    masked = file_content.encode('utf-8')
+    if compactable:
+        compact_saved = full_size - len(masked)
+    return MaskResult(content_hash, file_content, is_protected, False,
+                      len(masked), tokens=estimate_tokens(masked), compact_saved=compact_saved)
+
+def iter_ordered_results(func, tasks, jobs: int = 1):
+    """
+    按提交顺序逐个产出 (结果, 异常)
+    - jobs <= 1 时在当前进程中串行执行
+    - jobs > 1 时使用进程池，最多保持 jobs * 4 个在途任务，结果不会全部堆积在内存中
+    """
+    if jobs <= 1:
+        for args in tasks:
+            try:
+                yield func(*args), None
+            except Exception as e:
+                yield None, e
+        return
+
+    task_iter = iter(tasks)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        pending = deque()
+        for args in task_iter:
+            pending.append(pool.submit(func, *args))
+            if len(pending) >= jobs * 4:
+                break
+        while pending:
+            future = pending.popleft()
+            for args in task_iter:
+                pending.append(pool.submit(func, *args))
+                break
+            try:
+                yield future.result(), None
+            except Exception as e:
+                yield None, e
+
+# ✨压缩包输出格式
+# [BUNDLE_MAGIC][每个文件一个独立压缩帧 ...][gzip 压缩的 JSON 索引][尾部: 魔数 + 索引偏移 + 索引长度]
+# 索引记录每个文件帧的偏移、压缩长度、原始长度和内容哈希，读取单个文件时只需解压该文件的帧
+BUNDLE_MAGIC = b'VRBUNDL1'
+BUNDLE_FOOTER = struct.Struct('>8sQQ')
+BUNDLE_FOOTER_MAGIC = b'VRBINDEX'
+BUNDLE_VERSION = 1
+BUNDLE_CODECS = ('gzip', 'zstd')
+
+def get_bundle_codec(codec: str = None) -> str:
+    """未指定时优先使用 zstd（需安装 zstandard），否则使用 gzip"""
+    if codec is None:
+        return 'zstd' if zstandard else 'gzip'
+    if codec not in BUNDLE_CODECS:
+        raise ValueError(f"不支持的压缩格式: {codec}")
+    if codec == 'zstd' and zstandard is None:
+        raise ValueError("zstd 压缩需要安装 zstandard: pip install zstandard")
+    return codec
+
+def _new_compressor(codec: str):
+    if codec == 'zstd':
+        return zstandard.ZstdCompressor(level=3).compressobj()
+    # wbits=31 输出完整的 gzip 成员，每个文件帧都可以单独用 gzip 解压
+    return zlib.compressobj(6, zlib.DEFLATED, 31)
+
+# 解压失败统一转换为 ValueError，与哈希校验失败一致
+_DECOMPRESS_ERRORS = (zlib.error,) + ((zstandard.ZstdError,) if zstandard else ())
+
+def _new_decompressor(codec: str):
+    if codec == 'zstd':
+        if zstandard is None:
+            raise ValueError("读取 zstd 压缩包需要安装 zstandard: pip install zstandard")
+        return zstandard.ZstdDecompressor().decompressobj()
+    return zlib.decompressobj(31)
+
+class BundleFrame:
+    """单个文件的压缩帧，write() 接收掩码后的 UTF-8 字节"""
+
+    def __init__(self, out, codec: str):
+        self.out = out
+        self.compressor = _new_compressor(codec)
+        self.hasher = hashlib.blake2b(digest_size=16)
+        self.size = 0
+        self.length = 0
+
+    def write(self, data: bytes):
+        self.size += len(data)
+        self.hasher.update(data)
+        self._emit(self.compressor.compress(data))
+
+    def _emit(self, chunk: bytes):
+        if chunk:
+            self.out.write(chunk)
+            self.length += len(chunk)
+
+    def close(self):
+        self._emit(self.compressor.flush())
+
+class BundleWriter:
+    """写入压缩包，先写临时文件，close() 时写入索引并替换目标文件"""
+
+    def __init__(self, bundle_path: str, codec: str = None):
+        self.codec = get_bundle_codec(codec)
+        self.bundle_path = bundle_path
+        self.tmp_path = bundle_path + ".tmp"
+        self.out = open(self.tmp_path, 'wb')
+        self.out.write(BUNDLE_MAGIC)
+        self.entries = []
+        self._offset = None
+
+    def open_frame(self) -> BundleFrame:
+        self._offset = self.out.tell()
+        return BundleFrame(self.out, self.codec)
+
+    def close_frame(self, frame: BundleFrame, path: str, **meta):
+        frame.close()
+        self.entries.append({'path': path, 'offset': self._offset, 'length': frame.length,
+                             'size': frame.size, 'hash': frame.hasher.hexdigest(), **meta})
+
+    def add_bytes(self, path: str, data: bytes, **meta):
+        frame = self.open_frame()
+        frame.write(data)
+        self.close_frame(frame, path, **meta)
+
+    def add_file(self, path: str, source_path: str, **meta):
+        """逐块压缩文件的原始字节"""
+        frame = self.open_frame()
+        with open(source_path, 'rb') as inf:
+            for chunk in iter(lambda: inf.read(STREAM_CHUNK_SIZE), b''):
+                frame.write(chunk)
+        self.close_frame(frame, path, **meta)
+
+    def add_error(self, path: str, error: str, **meta):
+        """读取失败的文件只记录错误信息，不写入帧"""
+        self.entries.append({'path': path, 'offset': None, 'length': 0, 'size': 0,
+                             'hash': None, 'error': error, **meta})
+
+    def close(self, **meta):
+        index = {'version': BUNDLE_VERSION, 'codec': self.codec, 'files': self.entries, **meta}
+        data = gzip.compress(json.dumps(index, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+        index_offset = self.out.tell()
+        self.out.write(data)
+        self.out.write(BUNDLE_FOOTER.pack(BUNDLE_FOOTER_MAGIC, index_offset, len(data)))
+        self.out.close()
+        os.replace(self.tmp_path, self.bundle_path)
+
+    def abort(self):
+        self.out.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+class BundleReader:
+    """按索引随机读取压缩包中的单个文件，不解压其他文件"""
+
+    def __init__(self, bundle_path: str):
+        self.f = open(bundle_path, 'rb')
+        try:
+            if self.f.read(len(BUNDLE_MAGIC)) != BUNDLE_MAGIC:
+                raise ValueError(f"不是有效的压缩包: {bundle_path}")
+            self.f.seek(-BUNDLE_FOOTER.size, os.SEEK_END)
+            magic, index_offset, index_length = BUNDLE_FOOTER.unpack(self.f.read(BUNDLE_FOOTER.size))
+            if magic != BUNDLE_FOOTER_MAGIC:
+                raise ValueError(f"压缩包索引损坏: {bundle_path}")
+            self.f.seek(index_offset)
+            self.index = json.loads(gzip.decompress(self.f.read(index_length)).decode('utf-8'))
+            if self.index.get('version') != BUNDLE_VERSION:
+                raise ValueError(f"不支持的压缩包版本: {self.index.get('version')}")
+        except Exception:
+            self.f.close()
+            raise
+        self.codec = self.index['codec']
+        self.entries = {entry['path']: entry for entry in self.index['files']}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.f.close()
+
+    def iter_chunks(self, path: str):
+        """逐块产出解压后的内容，结束时校验内容哈希"""
+        entry = self.entries[path]
+        if entry.get('error'):
+            raise OSError(entry['error'])
+        decompressor = _new_decompressor(self.codec)
+        hasher = hashlib.blake2b(digest_size=16)
+        self.f.seek(entry['offset'])
+        remaining = entry['length']
+        while remaining:
+            chunk = self.f.read(min(remaining, STREAM_CHUNK_SIZE))
+            if not chunk:
+                raise ValueError(f"压缩包数据不完整: {path}")
+            remaining -= len(chunk)
+            try:
+                data = decompressor.decompress(chunk)
+            except _DECOMPRESS_ERRORS as e:
+                raise ValueError(f"压缩帧损坏: {path}: {e}") from e
+            hasher.update(data)
+            yield data
+        if hasher.hexdigest() != entry['hash']:
+            raise ValueError(f"内容校验失败: {path}")
+
+    def read(self, path: str) -> bytes:
+        return b''.join(self.iter_chunks(path))
+
+def write_code_bundle(bundle_path: str, all_files, payloads, codec: str = None, profiler=None,
+                      duplicates=None, **meta):
+    """
+    将掩码结果写入压缩包，payloads 为 iter_file_payloads 的输出
+    duplicates 为 {重复文件路径: 首次出现的文件路径} 时，重复文件的索引直接指向首个文件的压缩帧
+    返回 (处理文件数, 保护文件数, 掩码后总大小)
+    """
+    writer = BundleWriter(bundle_path, codec)
+    processed_files = protected_files = total_size = 0
+    written = {}
+    try:
+        for file_info, payload, error in payloads:
+            write_start = time.perf_counter()
+            stream_time = 0.0
+            out_size = 0
+            file_meta = {'folder': file_info['folder'], 'source_size': file_info['size']}
+            processed_files += 1
+            try:
+                if error is not None:
+                    raise error
+                first = written.get(duplicates.get(file_info['path'])) if duplicates else None
+                if first is not None:
+                    is_protected = payload.protected
+                    writer.entries.append(dict(first, path=file_info['path'], protected=is_protected,
+                                               duplicate_of=first['path'], **file_meta))
+                elif payload.streaming:
+                    stream_start = time.perf_counter()
+                    hits_before = RULE_HITS.copy()
+                    frame = writer.open_frame()
+                    is_protected = stream_masked_file(file_info['path'], MaskedStreamWriter(binary_out=frame))
+                    writer.close_frame(frame, file_info['path'], protected=is_protected, **file_meta)
+                    stream_time = time.perf_counter() - stream_start
+                    if profiler:
+                        profiler.record_stream(file_info['path'], stream_time, dict(RULE_HITS - hits_before))
+                elif payload.raw_source:
+                    is_protected = payload.protected
+                    writer.add_file(file_info['path'], payload.raw_source, protected=is_protected, **file_meta)
+                else:
+                    is_protected = payload.protected
+                    writer.add_bytes(file_info['path'], payload.content.encode('utf-8'),
+                                     protected=is_protected, **file_meta)
+                written[file_info['path']] = writer.entries[-1]
+                out_size = writer.entries[-1]['size']
+                protected_files += 1 if is_protected else 0
+                total_size += out_size
+            except Exception as e:
+                writer.add_error(file_info['path'], str(e), **file_meta)
+
+            if profiler:
+                profiler.record_write(file_info['path'],
+                                      time.perf_counter() - write_start - stream_time, out_size)
+
+        writer.close(protected_files=protected_files, **meta)
+    except BaseException:
+        writer.abort()
+        raise
+    return processed_files, protected_files, total_size
+
+FilePayload = namedtuple('FilePayload', 'protected out_size raw_source content streaming')
+
+def iter_file_payloads(all_files, cache, resolved, jobs: int = 1, profiler=None,
+                       compact: bool = False, compact_stats: dict = None, entropy: bool = False):
+    """
+    按 all_files 顺序产出 (file_info, FilePayload, 异常)，文本输出和压缩包输出共用
+    - raw_source 不为空时直接复制该文件的原始字节（可原样输出的源文件或缓存对象），跳过解码和重新编码
+    - streaming 为 True 时由调用方调用 stream_masked_file 边掩码边写出
+    - 无缓存时按顺序流式获取掩码结果，与串行输出完全一致
+    - compact_stats 不为 None 时累计精简模式节省的字节数（见 add_compact_stats）
+    """
+    if not cache:
+        tasks = [(f['path'], None, profiler is not None, compact, entropy) for f in all_files]
+        results = iter_ordered_results(mask_file_task, tasks, jobs)
+
+    for file_info in all_files:
+        if cache:
+            entry = resolved[file_info['path']]
+            if 'error' in entry:
+                yield file_info, None, OSError(entry['error'])
+                continue
+            raw_source = content = None
+            if entry.get('passthrough'):
+                raw_source = file_info['path']
+            elif os.linesep == '\n':
+                raw_source = cache.object_path(entry)
+            else:
+                content = cache.read_masked(entry)
+            if compact_stats is not None and get_compact_pattern(file_info['path']):
+                add_compact_stats(compact_stats, file_info['path'], entry['masked_size'], entry.get('compact_saved', 0))
+            RULE_FALLBACKS.update(entry.get('fallbacks', {}))
+            yield file_info, FilePayload(entry['protected'], entry['masked_size'], raw_source, content, False), None
+        else:
+            result, error = next(results)
+            if error is not None:
+                yield file_info, None, error
+                continue
+            if profiler and result.profile:
+                profiler.record_mask(file_info['path'], result.profile)
+            if compact_stats is not None and get_compact_pattern(file_info['path']):
+                add_compact_stats(compact_stats, file_info['path'], result.out_size or 0, result.compact_saved)
+            if result.fallbacks:
+                RULE_FALLBACKS.update(result.fallbacks)
+            raw_source = file_info['path'] if result.passthrough else None
+            yield file_info, FilePayload(result.protected, result.out_size, raw_source,
+                                         result.content, result.streaming), None
+
+class PackagingProfiler:
+    """
+    --profile 模式的分阶段计时与热点统计
+    - 阶段：discovery / stat / read / mask:<扩展名> / write（并行时 read 和 mask 为各进程耗时之和）
+    - 每个文件的读取、掩码、写入耗时和输入/输出字节数
+    - 各掩码规则的命中次数
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases = defaultdict(float)
+        self.files = {}
+        self.rule_hits = Counter()
+
+    def add(self, phase: str, seconds: float):
+        self.phases[phase] += seconds
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    def _file(self, path: str) -> dict:
+        if path not in self.files:
+            self.files[path] = {
+                'path': path,
+                'type': os.path.splitext(path)[1].lower() or '(无扩展名)',
+                'read': 0.0, 'mask': 0.0, 'write': 0.0,
+                'bytes_in': 0, 'bytes_out': 0,
+                'rules': {},
+            }
+        return self.files[path]
+
+    def record_mask(self, path: str, profile: dict):
+        """记录 mask_file_task 返回的读取/掩码耗时"""
+        record = self._file(path)
+        record['read'] += profile['read']
+        record['mask'] += profile['mask']
+        record['bytes_in'] = profile['bytes_in']
+        record['rules'] = profile['rules']
+        self.phases['read'] += profile['read']
+        self.phases['mask:' + record['type']] += profile['mask']
+        self.rule_hits.update(profile['rules'])
+
+    def record_stream(self, path: str, seconds: float, rules: dict):
+        """记录大文件流式掩码（掩码与写出同时进行，全部计入掩码耗时）"""
+        record = self._file(path)
+        record['mask'] += seconds
+        record['rules'] = rules
+        self.phases['mask:' + record['type']] += seconds
+        self.rule_hits.update(rules)
+
+    def record_write(self, path: str, seconds: float, bytes_out: int):
+        record = self._file(path)
+        record['write'] += seconds
+        record['bytes_out'] = bytes_out
+        self.phases['write'] += seconds
+
+    def report(self, jobs: int = 1) -> dict:
+        files = sorted(self.files.values(), key=lambda r: r['read'] + r['mask'] + r['write'], reverse=True)
+        by_type = {}
+        for record in files:
+            stats = by_type.setdefault(record['type'], {'files': 0, 'mask': 0.0, 'bytes_in': 0, 'bytes_out': 0})
+            stats['files'] += 1
+            stats['mask'] += record['mask']
+            stats['bytes_in'] += record['bytes_in']
+            stats['bytes_out'] += record['bytes_out']
+        return {
+            'wall_time': time.perf_counter() - self.started,
+            'jobs': jobs,
+            'phases': dict(sorted(self.phases.items())),
+            'mask_by_type': by_type,
+            'rule_hits': dict(self.rule_hits.most_common()),
+            'files': files,
+        }
+
+    def print_report(self, report: dict, top: int = 10):
+        """打印阶段耗时和最慢的文件"""
+        print("\n" + "=" * 60)
+        print(f"⏱️  性能分析（总耗时 {report['wall_time'] * 1000:.1f} ms）")
+        print("=" * 60)
+        for phase, seconds in report['phases'].items():
+            print(f"  {phase:<20}{seconds * 1000:>10.1f} ms")
+        if report['rule_hits']:
+            print("\n规则命中次数:")
+            for rule, count in report['rule_hits'].items():
+                print(f"  {rule:<24}{count:>8}")
+        print(f"\n最慢的 {min(top, len(report['files']))} 个文件:")
+        print(f"  {'读取ms':>8}{'掩码ms':>8}{'写入ms':>8}{'输入':>10}{'输出':>10}  文件")
+        for record in report['files'][:top]:
+            print(f"  {record['read'] * 1000:>8.2f}{record['mask'] * 1000:>8.2f}{record['write'] * 1000:>8.2f}"
+                  f"{get_file_size_from_bytes(record['bytes_in']):>10}{get_file_size_from_bytes(record['bytes_out']):>10}"
+                  f"  {record['path']}")
+
+def get_cache_root(output_file: str, cache_dir: str = None) -> str:
+    """缓存清单和缓存目录的路径前缀：默认与输出文件同目录，指定 cache_dir 时按输出文件名放在该目录中"""
+    root = os.path.splitext(output_file)[0]
+    if cache_dir:
+        return os.path.join(os.path.abspath(cache_dir), os.path.basename(root))
+    return root
+
+class ManifestCache:
+    """
+    增量打包缓存
+    - 清单文件（与输出文件同目录，或多项目共用的 cache_dir 中）记录每个文件的 路径/大小/修改时间/内容哈希/掩码结果哈希
+    - 掩码结果按哈希存放在缓存目录中，未变化的文件直接复用，不再调用 process_file_content
+    - 无需掩码的直通文件不保存缓存对象，输出时直接复制源文件
+    - 掩码规则版本或是否启用高熵检测不一致时整个缓存失效
+    """
+
+    def __init__(self, output_file: str, compact: bool = False, entropy: bool = False, cache_dir: str = None):
+        root = get_cache_root(output_file, cache_dir)
+        self.compact = compact
+        self.entropy = entropy
+        self.manifest_path = root + ".manifest.json"
+        self.objects_dir = root + ".cache"
+        self.entries = {}
+        self.bundle_digest = None
+        self.hits = 0
+        self.misses = 0
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.manifest_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('rules_version') != MASKING_RULES_VERSION or data.get('entropy', False) != self.entropy:
+            return
+        self.entries = data.get('files', {})
+        self.bundle_digest = data.get('bundle_digest')
+
+    def _object_path(self, masked_hash: str) -> str:
+        return os.path.join(self.objects_dir, masked_hash + ".txt")
+
+    def object_path(self, entry) -> str:
+        """缓存记录对应的掩码结果文件"""
+        return self._object_path(entry['masked_hash'])
+
+    def _is_available(self, entry) -> bool:
+        return entry.get('passthrough') or os.path.exists(self._object_path(entry['masked_hash']))
+
+    def lookup(self, file_info):
+        """大小和修改时间都未变化时直接返回缓存记录（不读取文件），否则返回 None"""
+        cached = self.entries.get(file_info['path'])
+        if (cached and cached['size'] == file_info['size'] and cached['mtime'] == file_info['mtime']
+                and self._is_available(cached)):
+            self.hits += 1
+            return cached
+        return None
+
+    def known_hash(self, path: str):
+        """返回缓存中记录的内容哈希（缓存对象仍存在时）"""
+        cached = self.entries.get(path)
+        if cached and self._is_available(cached):
+            return cached['content_hash']
+        return None
+
+    def store(self, file_info, result: MaskResult) -> dict:
+        """记录 mask_file_task 的结果"""
+        path = file_info['path']
+        if result.content is None and not result.passthrough:
+            # 内容未变，仅更新大小和修改时间
+            self.hits += 1
+            entry = dict(self.entries[path], size=file_info['size'], mtime=file_info['mtime'])
+        elif result.passthrough:
+            self.misses += 1
+            entry = {
+                'size': file_info['size'],
+                'mtime': file_info['mtime'],
+                'content_hash': result.content_hash,
+                'masked_hash': None,
+                'masked_size': result.out_size,
+                'tokens': result.tokens,
+                'protected': False,
+                'passthrough': True,
+            }
+        else:
+            self.misses += 1
+            masked = result.content.encode('utf-8')
+            masked_hash = hash_bytes(masked)
+            object_path = self._object_path(masked_hash)
+            if not os.path.exists(object_path):
+                os.makedirs(self.objects_dir, exist_ok=True)
+                with open(object_path, 'wb') as f:
+                    f.write(masked)
+            entry = {
+                'size': file_info['size'],
+                'mtime': file_info['mtime'],
+                'content_hash': result.content_hash,
+                'masked_hash': masked_hash,
+                'masked_size': len(masked),
+                'tokens': result.tokens,
+                'protected': result.protected,
+            }
+            if result.compact_saved:
+                entry['compact_saved'] = result.compact_saved
+            if result.fallbacks:
+                entry['fallbacks'] = result.fallbacks
+        self.entries[path] = entry
+        return entry
+
+    def store_streamed(self, file_info, result: MaskResult, profiler=None) -> dict:
+        """流式掩码大文件并直接写入缓存对象"""
+        self.misses += 1
+        stream_start = time.perf_counter()
+        hits_before = RULE_HITS.copy()
+        fallbacks_before = RULE_FALLBACKS.copy()
+        os.makedirs(self.objects_dir, exist_ok=True)
+        temp_path = os.path.join(self.objects_dir, f"stream-{os.getpid()}.tmp")
+        with open(temp_path, 'wb') as f:
+            writer = MaskedStreamWriter(binary_out=f)
+            is_protected = stream_masked_file(file_info['path'], writer)
+        masked_hash = writer.hexdigest()
+        os.replace(temp_path, self._object_path(masked_hash))
+        if profiler:
+            profiler.record_stream(file_info['path'], time.perf_counter() - stream_start,
+                                   dict(RULE_HITS - hits_before))
+        entry = {
+            'size': file_info['size'],
+            'mtime': file_info['mtime'],
+            'content_hash': result.content_hash,
+            'masked_hash': masked_hash,
+            'masked_size': writer.size,
+            'tokens': writer.tokens,
+            'protected': is_protected,
+        }
+        fallbacks = take_fallbacks(fallbacks_before)
+        if fallbacks:
+            entry['fallbacks'] = fallbacks
+        self.entries[file_info['path']] = entry
+        return entry
+
+    def resolve_all(self, all_files, jobs: int = 1, profiler=None) -> dict:
+        """返回 {路径: 掩码结果记录}，只有发生变化的文件会被读取和掩码（可并行）"""
+        resolved = {}
+        changed = []
+        for file_info in all_files:
+            entry = self.lookup(file_info)
+            if entry:
+                resolved[file_info['path']] = entry
+            else:
+                changed.append(file_info)
+
+        tasks = [(f['path'], self.known_hash(f['path']), profiler is not None, self.compact, self.entropy)
+                 for f in changed]
+        for file_info, (result, error) in zip(changed, iter_ordered_results(mask_file_task, tasks, jobs)):
+            if profiler and error is None and result.profile:
+                profiler.record_mask(file_info['path'], result.profile)
+            if error is None and result.streaming:
+                try:
+                    resolved[file_info['path']] = self.store_streamed(file_info, result, profiler)
+                except Exception as e:
+                    resolved[file_info['path']] = {'error': str(e)}
+            elif error is not None:
+                resolved[file_info['path']] = {'error': str(error)}
+            else:
+                resolved[file_info['path']] = self.store(file_info, result)
+        return resolved
+
+    def read_masked(self, entry) -> str:
+        """读取缓存的掩码结果"""
+        with open(self._object_path(entry['masked_hash']), 'rb') as f:
+            return f.read().decode('utf-8')
+
+    def save(self, all_files, bundle_digest: str):
+        """写入清单，并清理不再引用的文件和缓存对象"""
+        current_paths = {f['path'] for f in all_files}
+        self.entries = {p: e for p, e in self.entries.items() if p in current_paths}
+        self.bundle_digest = bundle_digest
+
+        referenced = {e['masked_hash'] + ".txt" for e in self.entries.values() if e.get('masked_hash')}
+        if os.path.isdir(self.objects_dir):
+            for name in os.listdir(self.objects_dir):
+                if name not in referenced:
+                    os.remove(os.path.join(self.objects_dir, name))
+
+        os.makedirs(os.path.dirname(self.manifest_path), exist_ok=True)
+        with open(self.manifest_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                'rules_version': MASKING_RULES_VERSION,
+                'entropy': self.entropy,
+                'bundle_digest': bundle_digest,
+                'files': self.entries,
+            }, f, ensure_ascii=False, indent=1)
+
+def compute_bundle_digest(base_dir, all_files, resolved, project_info=None) -> str:
+    """根据文件列表、掩码结果和项目描述（写入头部）计算整个打包结果的摘要，用于判断是否需要重写输出"""
+    info = project_info or DEFAULT_PROJECT_INFO
+    parts = [base_dir, str(MASKING_RULES_VERSION), json.dumps(info, ensure_ascii=False, sort_keys=True)]
+    for file_info in all_files:
+        entry = resolved[file_info['path']]
+        parts.append(f"{file_info['folder']}|{file_info['path']}|{file_info['size']}|"
+                     f"{entry.get('masked_hash') or entry.get('content_hash') or 'ERROR:' + entry.get('error', '')}")
+    return hash_bytes("\n".join(parts).encode('utf-8'))
+
+# ✨内容去重
+# 以掩码后输出内容的哈希为键：相同内容只输出一次，重复文件写入引用
+# 可选的块级去重：大文件按行做内容定义分块（行哈希满足条件处切分，插入或删除几行只影响附近的块），
+# 与前面已输出的块相同的部分写入引用
+DEDUP_BLOCK_THRESHOLD = 64 * 1024
+DEDUP_MIN_BLOCK_LINES = 8
+DEDUP_MAX_BLOCK_LINES = 256
+DEDUP_MIN_BLOCK_BYTES = 512
+DEDUP_CUT_MASK = 0x0f  # 平均约 16 行一个切分点
+
+DedupPlan = namedtuple('DedupPlan', ['duplicates', 'blocks', 'file_bytes', 'block_count', 'block_bytes'])
+
+def get_output_hash(entry):
+    """缓存记录对应的输出内容哈希（直通文件的输出就是源文件，使用源文件哈希）"""
+    return entry.get('masked_hash') or entry.get('content_hash')
+
+def split_line_blocks(lines):
+    """按内容切分行块，返回 [(起始行, 结束行)]（左闭右开）"""
+    blocks = []
+    start = 0
+    for i, line in enumerate(lines):
+        count = i + 1 - start
+        if count >= DEDUP_MAX_BLOCK_LINES or (
+                count >= DEDUP_MIN_BLOCK_LINES
+                and zlib.crc32(line.encode('utf-8')) & DEDUP_CUT_MASK == DEDUP_CUT_MASK):
+            blocks.append((start, i + 1))
+            start = i + 1
+    if start < len(lines):
+        blocks.append((start, len(lines)))
+    return blocks
+
+def read_output_text(file_info, entry, cache) -> str:
+    """读取缓存记录对应的输出内容"""
+    if entry.get('passthrough'):
+        with open(file_info['path'], 'rb') as f:
+            return str(f.read(), 'utf-8')
+    return cache.read_masked(entry)
+
+def plan_dedup(all_files, resolved, cache, blocks: bool = False) -> DedupPlan:
+    """
+    根据缓存记录规划去重，返回 DedupPlan
+    - duplicates: {重复文件路径: 首次出现的文件路径}
+    - blocks: {路径: [(起始行, 结束行, 引用路径, 引用起始行, 引用结束行)]}，仅 blocks=True 时规划
+    """
+    duplicates = {}
+    first_by_hash = {}
+    file_bytes = 0
+    for file_info in all_files:
+        entry = resolved[file_info['path']]
+        output_hash = get_output_hash(entry) if 'error' not in entry else None
+        if output_hash is None:
+            continue
+        if output_hash in first_by_hash:
+            duplicates[file_info['path']] = first_by_hash[output_hash]
+            file_bytes += entry['masked_size']
+        else:
+            first_by_hash[output_hash] = file_info['path']
+
+    block_refs = {}
+    block_count = block_bytes = 0
+    if blocks:
+        seen_blocks = {}
+        for file_info in all_files:
+            path = file_info['path']
+            entry = resolved[path]
+            if path in duplicates or 'error' in entry or entry['masked_size'] < DEDUP_BLOCK_THRESHOLD:
+                continue
+            lines = read_output_text(file_info, entry, cache).splitlines(keepends=True)
+            refs = []
+            for start, end in split_line_blocks(lines):
+                data = ''.join(lines[start:end]).encode('utf-8')
+                key = hash_bytes(data)
+                if key in seen_blocks and len(data) >= DEDUP_MIN_BLOCK_BYTES:
+                    ref_path, ref_start, ref_end = seen_blocks[key]
+                    if refs and refs[-1][1] == start and refs[-1][2] == ref_path and refs[-1][4] == ref_start:
+                        # 与上一个引用前后相接时合并为一个引用
+                        refs[-1] = (refs[-1][0], end, ref_path, refs[-1][3], ref_end)
+                    else:
+                        refs.append((start, end, ref_path, ref_start, ref_end))
+                    block_count += 1
+                    block_bytes += len(data)
+                else:
+                    seen_blocks.setdefault(key, (path, start, end))
+            if refs:
+                block_refs[path] = refs
+    return DedupPlan(duplicates, block_refs, file_bytes, block_count, block_bytes)
+
+def write_block_deduped(outf, content: str, refs) -> int:
+    """按块级去重规划写出内容，返回写出的字节数"""
+    lines = content.splitlines(keepends=True)
+    written = 0
+    pos = 0
+    for start, end, ref_path, ref_start, ref_end in refs:
+        text = ''.join(lines[pos:start])
+        text += f"[… 第 {start + 1}-{end} 行与 {ref_path} 第 {ref_start + 1}-{ref_end} 行相同，已去重 …]\n"
+        outf.write(text)
+        written += len(text.encode('utf-8'))
+        pos = end
+    text = ''.join(lines[pos:])
+    outf.write(text)
+    return written + len(text.encode('utf-8'))
+
+# ✨文本输出
+
+@contextmanager
+def atomic_write(path: str, mode: str = 'w', **kwargs):
+    """与压缩包相同，先写 path.tmp，成功后替换目标文件，读取方不会看到写了一半的输出"""
+    tmp_path = path + ".tmp"
+    try:
+        with open(tmp_path, mode, **kwargs) as f:
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+# ✨项目描述：未指定时使用 VacantRoomWeb 主项目的描述，其他项目在配置文件中填写（见 load_projects_config）
+DEFAULT_PROJECT_INFO = {
+    'title': "VacantRoomWeb - 空房间管理系统",
+    'description': "基于 Blazor Server 的房间管理系统，提供房间状态监控、预订管理等功能",
+    'banner': "VACANTROOM WEB PROJECT - ALL CODE FILES",
+    'tech_stack': [
+        "ASP.NET Core Blazor Server",
+        "Entity Framework Core",
+        "Bootstrap CSS Framework",
+        "SignalR (实时通信)",
+    ],
+}
+
+def write_text_header(outf, all_files, folder_stats, current_time, base_dir, part_of=None, part=None,
+                      compact=False, dedup=None, project_info=None):
+    """
+    写入项目描述、文件索引和统计信息
+    分卷输出时 part_of 为 {路径: 分卷号}，part 为 (当前分卷号, 分卷总数)，每个分卷都包含完整索引
+    """
+    info = project_info or DEFAULT_PROJECT_INFO
+
+    # ✨写入项目描述
+    outf.write(f"# {info['title']}\n")
+    outf.write("## 项目概述\n")
+    if info['description']:
+        outf.write(f"{info['description']}\n")
+    outf.write("⚠️  敏感信息已自动掩码处理，保护密码、密钥、连接字符串等\n\n")
+
+    outf.write("=" * 80 + "\n")
+    outf.write(f"打包时间: {current_time}\n")
+    if part:
+        outf.write(f"分卷: 第 {part[0]}/{part[1]} 部分\n")
+    outf.write(f"{info['banner']}\n")
+    outf.write("⚠️  敏感信息已自动掩码处理\n")
+    if compact:
+        outf.write("✂️  精简模式：C# / Razor / CSS 已去除注释和多余空白\n")
+    outf.write("=" * 80 + "\n\n")
+
+    # ✨写入文件索引
+    outf.write("## 文件索引\n")
+    current_folder = ""
+    for file_info in all_files:
+        folder = file_info['folder']
+        if folder != current_folder:
+            current_folder = folder
+            file_count = folder_stats.get(folder, 0)
+            outf.write(f"\n### {folder} ({file_count} 个文件)\n")
+
+        size_str = get_file_size_from_bytes(file_info['size'])
+        part_str = f" [第 {part_of[file_info['path']]} 部分]" if part_of else ""
+        outf.write(f"- {file_info['path']} ({size_str}){part_str}\n")
+
+    # ✨写入项目统计
+    outf.write(f"\n## 项目统计\n")
+    outf.write(f"- 总文件数: {len(all_files)}\n")
+    outf.write(f"- 总大小: {get_file_size_from_bytes(sum(f['size'] for f in all_files))}\n")
+    outf.write(f"- 生成时间: {current_time}\n")
+    outf.write(f"- 项目路径: {base_dir}\n")
+    if dedup:
+        outf.write(f"- 重复文件: {len(dedup.duplicates)} 个（只输出一次，"
+                   f"节省 {get_file_size_from_bytes(dedup.file_bytes)}）\n")
+        if dedup.blocks:
+            outf.write(f"- 重复块: {dedup.block_count} 个，分布在 {len(dedup.blocks)} 个大文件中"
+                       f"（节省 {get_file_size_from_bytes(dedup.block_bytes)}）\n")
+
+    # ✨写入技术栈信息
+    if info['tech_stack']:
+        outf.write(f"\n## 技术栈\n")
+        for item in info['tech_stack']:
+            outf.write(f"- {item}\n")
+
+    # ✨写入文件夹统计
+    outf.write(f"\n## 文件夹统计\n")
+    for folder, count in sorted(folder_stats.items()):
+        outf.write(f"- {folder}: {count} 个文件\n")
+
+    # ✨写入文件内容
+    outf.write("\n" + "="*80 + "\n")
+    outf.write("## 文件内容\n")
+    outf.write("="*80 + "\n")
+
+def write_text_contents(outf, payloads, profiler=None, dedup=None):
+    """
+    写入文件内容，payloads 为 iter_file_payloads 的输出，返回 (处理文件数, 保护文件数, 掩码后总大小)
+    dedup 为 plan_dedup 的结果时，重复文件和重复块写入引用
+    """
+    processed_files = 0
+    protected_files = 0
+    total_size = 0
+    current_folder = ""
+    for file_info, payload, error in payloads:
+        write_start = time.perf_counter()
+        stream_time = 0.0
+        out_size = 0
+        folder = file_info['folder']
+        if folder != current_folder:
+            current_folder = folder
+            outf.write(f"\n\n### {folder} 文件夹\n")
+            outf.write("-" * 50 + "\n")
+
+        try:
+            outf.write(f"\n#### 文件: {file_info['path']}\n")
+            outf.write(f"```{get_file_extension_for_syntax(file_info['path'])}\n")
+
+            # ✨处理敏感信息（优先使用缓存结果）
+            if error is not None:
+                raise error
+            raw_source = payload.raw_source
+            block_refs = dedup.blocks.get(file_info['path']) if dedup else None
+            if dedup and file_info['path'] in dedup.duplicates:
+                # 与前面的文件内容相同，只写引用
+                raw_source = None
+                file_content = f"[与 {dedup.duplicates[file_info['path']]} 内容相同，已去重]"
+                is_protected, out_size = payload.protected, len(file_content.encode('utf-8'))
+            elif payload.streaming:
+                # 大文件：边掩码边写入输出
+                stream_start = time.perf_counter()
+                hits_before = RULE_HITS.copy()
+                writer = MaskedStreamWriter(text_out=outf)
+                is_protected = stream_masked_file(file_info['path'], writer)
+                file_content, out_size = '', writer.size
+                stream_time = time.perf_counter() - stream_start
+                if profiler:
+                    profiler.record_stream(file_info['path'], stream_time,
+                                           dict(RULE_HITS - hits_before))
+            else:
+                file_content = payload.content
+                is_protected, out_size = payload.protected, payload.out_size
+
+            # 统计是否有敏感信息被保护
+            if is_protected:
+                protected_files += 1
+
+            if block_refs:
+                # 大文件中与前面内容相同的块只写引用
+                if raw_source:
+                    with open(raw_source, 'rb') as f:
+                        file_content = str(f.read(), 'utf-8')
+                out_size = write_block_deduped(outf, file_content, block_refs)
+                outf.write("\n\n")
+            elif raw_source:
+                copy_file_into(outf, raw_source)
+                outf.write("\n\n")
+            else:
+                outf.write(file_content + "\n\n")
+            outf.write("```\n")
+
+            # 统计文件大小
+            processed_files += 1
+            total_size += out_size
+
+        except Exception as e:
+            outf.write(f"[ERROR: 无法读取文件 - {str(e)}]\n```\n")
+            processed_files += 1
+
+        if profiler:
+            profiler.record_write(file_info['path'],
+                                  time.perf_counter() - write_start - stream_time, out_size)
+    return processed_files, protected_files, total_size
+
+def write_text_footer(outf, processed_files, protected_files):
+    # ✨写入保护统计
+    outf.write("\n" + "=" * 80 + "\n")
+    outf.write("代码文件结束\n")
+    outf.write("✅ 敏感信息保护：密码、密钥、连接字符串等已自动掩码\n")
+    outf.write(f"📊 统计信息：包含文件总数 {processed_files} 个\n")
+    outf.write(f"🔒 敏感信息保护：{protected_files} 个文件\n")
+    outf.write("=" * 80 + "\n")
+
+# ✨分卷输出
+# 按字节数或近似 token 数限制每个分卷的大小，每个分卷都包含完整的文件索引
+
+def parse_budget(text: str, unit: int = 1024) -> int:
+    """解析 500K / 2M / 100000 形式的预算，unit 为 K 对应的倍数"""
+    text = text.strip().upper()
+    multiplier = 1
+    if text[-1:] in ('K', 'M'):
+        multiplier = unit if text[-1] == 'K' else unit * unit
+        text = text[:-1]
+    try:
+        value = int(float(text) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"无效的预算: {text}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError("预算必须大于 0")
+    return value
+
+def get_file_weight(file_info, entry=None):
+    """
+    文件在分卷中占用的 (字节数, 近似 token 数)，包含标题和代码块标记
+    有缓存记录时使用掩码后的实际大小和统计的 token 数，否则按源文件大小估算
+    """
+    path = file_info['path']
+    fence = f"\n#### 文件: {path}\n```{get_file_extension_for_syntax(path)}\n\n\n```\n".encode('utf-8')
+    if entry and 'error' not in entry:
+        size = entry['masked_size']
+        tokens = entry.get('tokens')
+    else:
+        size = file_info['size']
+        tokens = None
+    if tokens is None:
+        tokens = (size + 3) // 4
+    return len(fence) + size, estimate_tokens(fence) + tokens
+
+def plan_parts(all_files, resolved=None, max_bytes=None, max_tokens=None, reserved=(0, 0)):
+    """
+    将 all_files 装箱为多个分卷，返回 [[file_info, ...], ...]，每个分卷内保持 (folder, path) 顺序
+    - 以 get_target_folders 的文件夹为单位做首次适应递减装箱，能整体放下的文件夹不拆分
+    - 超出单个分卷预算的文件夹按路径顺序拆分到新的分卷，单个文件超出预算时单独成卷
+    - reserved 为每个分卷固定占用的 (字节数, token 数)，即共用的索引头部
+    """
+    limit = ((max_bytes or float('inf')) - reserved[0], (max_tokens or float('inf')) - reserved[1])
+    if limit[0] <= 0 or limit[1] <= 0:
+        raise ValueError("分卷预算小于文件索引头部，请增大预算")
+
+    folders = defaultdict(list)
+    for file_info in all_files:
+        entry = resolved.get(file_info['path']) if resolved else None
+        folders[file_info['folder']].append((file_info, get_file_weight(file_info, entry)))
+
+    def fits(used, weight):
+        return used[0] + weight[0] <= limit[0] and used[1] + weight[1] <= limit[1]
+
+    def load(weight):
+        return max(weight[0] / limit[0], weight[1] / limit[1])
+
+    bins = []  # [[已用字节, 已用 token], [file_info, ...]]
+
+    def add(part, file_info, weight):
+        part[0][0] += weight[0]
+        part[0][1] += weight[1]
+        if file_info is not None:
+            part[1].append(file_info)
+
+    groups = []
+    for folder, items in folders.items():
+        # 每个分卷中的文件夹都有一个小标题
+        heading = f"\n\n### {folder} 文件夹\n{'-' * 50}\n".encode('utf-8')
+        heading = (len(heading), estimate_tokens(heading))
+        weight = (heading[0] + sum(w[0] for _, w in items), heading[1] + sum(w[1] for _, w in items))
+        groups.append((items, heading, weight))
+    groups.sort(key=lambda g: load(g[2]), reverse=True)
+
+    for items, heading, weight in groups:
+        if fits((0, 0), weight):
+            part = next((b for b in bins if fits(b[0], weight)), None)
+            if part is None:
+                part = [[0, 0], []]
+                bins.append(part)
+            add(part, None, heading)
+            for file_info, file_weight in items:
+                add(part, file_info, file_weight)
+        else:
+            part = [list(heading), []]
+            bins.append(part)
+            for file_info, file_weight in items:
+                if part[1] and not fits(part[0], file_weight):
+                    part = [list(heading), []]
+                    bins.append(part)
+                add(part, file_info, file_weight)
+
+    parts = [sorted(b[1], key=lambda f: (f['folder'], f['path'])) for b in bins]
+    parts.sort(key=lambda files: (files[0]['folder'], files[0]['path']))
+    return parts
+
+def get_part_paths(output_file: str, count: int):
+    root, ext = os.path.splitext(output_file)
+    return [f"{root}.part{i:02d}{ext}" for i in range(1, count + 1)]
+
+def remove_stale_parts(output_file: str, part_paths):
+    """删除上一次运行留下的多余分卷"""
+    root, ext = os.path.splitext(output_file)
+    keep = set(part_paths)
+    for path in glob.glob(glob.escape(root) + ".part[0-9][0-9]*" + glob.escape(ext)):
+        if path not in keep:
+            os.remove(path)
+
+def measure_header(all_files, folder_stats, current_time, base_dir, part_count: int, compact=False, dedup=None,
+                   project_info=None):
+    """分卷共用头部的 (字节数, token 数)，按最长的分卷号估算"""
+    buf = io.StringIO()
+    part_of = dict.fromkeys((f['path'] for f in all_files), part_count)
+    write_text_header(buf, all_files, folder_stats, current_time, base_dir, part_of, (part_count, part_count),
+                      compact, dedup, project_info)
+    data = buf.getvalue().encode('utf-8')
+    footer = io.StringIO()
+    write_text_footer(footer, len(all_files), len(all_files))
+    return len(data) + len(footer.getvalue().encode('utf-8')), estimate_tokens(data) + 200
+
+def write_part_task(part_path: str, header: str, files, cache, resolved, compact=False, dedup=None,
+                    entropy=False):
+    """写入单个分卷（可在子进程中执行），返回 (处理文件数, 保护文件数, 掩码后总大小, 精简统计, 兜底计数)"""
+    compact_stats = {} if compact else None
+    fallbacks_before = RULE_FALLBACKS.copy()
+    with atomic_write(part_path, 'w', encoding='utf-8') as outf:
+        outf.write(header)
+        result = write_text_contents(outf, iter_file_payloads(files, cache, resolved, compact=compact,
+                                                              compact_stats=compact_stats, entropy=entropy),
+                                     dedup=dedup)
+        write_text_footer(outf, result[0], result[1])
+    return result + (compact_stats, take_fallbacks(fallbacks_before))
+
+def write_text_parts(parts, part_paths, all_files, folder_stats, current_time, base_dir,
+                     cache, resolved, jobs: int = 1, profiler=None, compact=False, dedup=None, entropy=False,
+                     project_info=None):
+    """写入所有分卷，jobs > 1 时每个分卷在独立进程中并行写入（--profile 时串行写入以便记录耗时）"""
+    part_of = {f['path']: number for number, files in enumerate(parts, 1) for f in files}
+
+    def header(number):
+        buf = io.StringIO()
+        write_text_header(buf, all_files, folder_stats, current_time, base_dir, part_of, (number, len(parts)),
+                          compact, dedup, project_info)
+        return buf.getvalue()
+
+    def part_resolved(files):
+        return {f['path']: resolved[f['path']] for f in files} if resolved else None
+
+    if jobs <= 1 or profiler or len(parts) == 1:
+        results = []
+        for number, (path, files) in enumerate(zip(part_paths, parts), 1):
+            header_start = time.perf_counter()
+            compact_stats = {} if compact else None
+            with atomic_write(path, 'w', encoding='utf-8') as outf:
+                outf.write(header(number))
+                if profiler:
+                    profiler.add('write', time.perf_counter() - header_start)
+                payloads = iter_file_payloads(files, cache, part_resolved(files), jobs, profiler,
+                                              compact, compact_stats, entropy)
+                result = write_text_contents(outf, payloads, profiler, dedup)
+                write_text_footer(outf, result[0], result[1])
+            results.append(result + (compact_stats,))
+        return results
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(parts))) as pool:
+        futures = [pool.submit(write_part_task, path, header(number), files, cache, part_resolved(files),
+                               compact, dedup, entropy)
+                   for number, (path, files) in enumerate(zip(part_paths, parts), 1)]
+        results = [future.result() for future in futures]
+    for result in results:
+        RULE_FALLBACKS.update(result[4])
+    return [result[:4] for result in results]
+
+# ✨泄漏审计：打包完成后把输出完整扫描一遍，检查是否有未被掩码的敏感信息（例如 .razor 中的硬编码密码）
+# 输出按行对齐的大块（mmap）顺序读取，每块只读一次，所有规则都在同一块内存上查找后按位置合并
+# 每条规则都以字面量或单个字符集开头，re / bytes.find 可以快速跳过不相关的内容（合并成一个多分支正则反而慢很多），
+# 各规则的重复次数都有上限，整体为线性时间
+# - assignment：变量名含敏感关键词、值为引号内字面量的赋值（已掩码的值以 **** 结尾，不会命中）
+# - connection：连接字符串中的 Password= / Pwd= / AccountKey= 等片段
+# - blob：长度 ≥ AUDIT_BLOB_LENGTH 的 base64 / hex 串，按高熵检测的阈值过滤
+# - known：项目目录下真实 appsettings*.json 中密钥类键的取值原文（不区分大小写）
+AUDIT_CHUNK_SIZE = 16 * 1024 * 1024
+AUDIT_BLOB_LENGTH = 32
+AUDIT_MIN_SECRET_LENGTH = 6
+AUDIT_REPORT_LIMIT = 50
+AUDIT_MODES = ('warn', 'fail')
+# 变量名含这些关键词时，值看起来像标识符也视为泄漏；appsettings 中只收集这些键的取值
+AUDIT_SECRET_KEYWORDS = ('password', 'pwd', 'passwd', 'secret', 'token', 'apikey', 'api_key', 'credential',
+                         'jwt', 'bearer', 'private', 'connectionstring', 'connection_string', 'connstr')
+AUDIT_RULE_NAMES = {
+    'assignment': '敏感赋值',
+    'connection': '连接字符串',
+    'blob': '高熵串',
+    'known': '已知密钥',
+}
+AUDIT_FILE_HEADER = "#### 文件: "
+_AUDIT_HEADER = re.compile(re.escape(AUDIT_FILE_HEADER.encode('utf-8')) + rb'([^\r\n]*)')
+# 赋值以 "= 引号" 定位，再向前取变量名检查关键词
+_AUDIT_ASSIGNMENT = re.compile(rb'[=:][ \t]*(["\'])([^"\'\s*@{}()<>\\]{5,200})\1')
+_AUDIT_KEY_BEFORE = re.compile(rb'(?<!\w)(\w{1,64})["\']?[ \t]*\Z')
+AUDIT_KEY_WINDOW = 72
+_AUDIT_CONNECTION_KEYS = (b'password', b'pwd', b'accountkey', b'sharedaccesskey')
+_AUDIT_CONNECTION_VALUE = re.compile(rb'[ \t]*=[ \t]*([^;"\'\s*<>=(){}]{3,200})(?=[;"\'])')
+# blob 字符映射为 b，其他字节映射为空格，连续 AUDIT_BLOB_LENGTH 个 b 用 bytes.find 查找
+_AUDIT_BLOB_CHARS = bytes(0x62 if chr(b).isascii() and (chr(b).isalnum() or chr(b) in '+/_-') else 0x20
+                          for b in range(256))
+_AUDIT_BLOB_RUN = b'b' * AUDIT_BLOB_LENGTH
+AUDIT_BLOB_MAX = 4096
+_IDENTIFIER_VALUE = re.compile(r'[A-Za-z_][\w.]*')
+_CONNECTION_SECRET = re.compile(r'(?:password|pwd|accountkey|sharedaccesskey)\s*=\s*([^;]+)', re.IGNORECASE)
+
+# output 为输出文件，line 为输出中的行号，file / file_line 为对应的源文件和源文件中的行号，text 为掩码后的命中内容
+LeakHit = namedtuple('LeakHit', ['output', 'line', 'file', 'file_line', 'rule', 'text'])
+
+class _SecretCollector(JsonStreamMasker):
+    """复用 JSON 词法扫描（允许注释和多余逗号），只收集密钥类键的字符串值，不修改内容"""
+
+    def __init__(self):
+        super().__init__()
+        self.values = set()
+
+    def _mask_string(self, token: str) -> str:
+        key, value = self.current_key, self._decode(token)
+        if isinstance(key, str) and isinstance(value, str):
+            if any(keyword in key.lower() for keyword in AUDIT_SECRET_KEYWORDS):
+                self.values.add(value)
+            self.values.update(m.group(1).strip() for m in _CONNECTION_SECRET.finditer(value))
+        return token
+
+def load_known_secrets(base_dir: str) -> list:
+    """读取项目目录下所有 appsettings*.json（跳过 bin / obj 和隐藏目录），返回密钥原文，按长度降序"""
+    values = set()
+    for root, dirs, files in os.walk(base_dir):
+        dirs[:] = [d for d in dirs if not d.startswith('.') and d.lower() not in ('bin', 'obj', 'node_modules')]
+        for name in files:
+            lower = name.lower()
+            if not (lower.startswith('appsettings') and lower.endswith('.json')):
+                continue
+            collector = _SecretCollector()
+            try:
+                with open(os.path.join(root, name), 'r', encoding='utf-8-sig') as f:
+                    collector.feed(f.read(), final=True)
+            except (OSError, UnicodeDecodeError):
+                continue
+            values.update(collector.values)
+    secrets = (v for v in values if len(v) >= AUDIT_MIN_SECRET_LENGTH and not v.isdigit() and '****' not in v)
+    return sorted(secrets, key=len, reverse=True)
+
+def _iter_literal(data: bytes, literal: bytes):
+    """依次产出 literal 在 data 中的所有起始位置（bytes.find，不经过正则）"""
+    pos = data.find(literal)
+    while pos >= 0:
+        yield pos
+        pos = data.find(literal, pos + len(literal))
+
+def _is_word_byte(data: bytes, pos: int) -> bool:
+    return 0 <= pos < len(data) and (data[pos:pos + 1].isalnum() or data[pos] == 0x5f)
+
+class LeakAuditor:
+    """
+    多规则泄漏检测器，scan_chunk 在同一块内容上运行全部规则，按位置合并命中结果
+    文本输出中的 "#### 文件: " 标题行同时用于确定每个命中所在的源文件和行号
+    """
+
+    def __init__(self, known_secrets=()):
+        self.known_secrets = list(known_secrets)
+        self.known_literals = sorted({s.lower().encode('utf-8') for s in self.known_secrets}, key=len, reverse=True)
+        self.keyword_pattern = re.compile('|'.join(re.escape(k) for k in SENSITIVE_KEYWORDS).encode('ascii'))
+
+    @staticmethod
+    def _is_secret_blob(token: bytes, prefix: bytes) -> bool:
+        """与 find_high_entropy_spans 使用相同的候选条件和熵阈值"""
+        token = token.rstrip(b'=').decode('ascii')
+        if not _is_entropy_candidate(token, prefix.decode('ascii', 'ignore')):
+            return False
+        (entropy,), (change,) = token_entropy_stats([token])
+        return entropy >= _entropy_thresholds([token])[0] and (
+            change >= ENTROPY_MIN_CLASS_CHANGES or _HEX_TOKEN.fullmatch(token) is not None)
+
+    def _find_assignments(self, lower: bytes):
+        for m in _AUDIT_ASSIGNMENT.finditer(lower):
+            window = max(m.start() - AUDIT_KEY_WINDOW, 0)
+            if not self.keyword_pattern.search(lower, window, m.start()):
+                continue
+            key = _AUDIT_KEY_BEFORE.search(lower, window, m.start())
+            if key is None or not self.keyword_pattern.search(key.group(1)):
+                continue
+            value = m.group(2)
+            if (_IDENTIFIER_VALUE.fullmatch(value.decode('ascii', 'replace'))
+                    and not any(k.encode('ascii') in key.group(1) for k in AUDIT_SECRET_KEYWORDS)):
+                continue
+            yield m.start(2), m.end(2), 'assignment'
+
+    @staticmethod
+    def _find_connections(lower: bytes):
+        for literal in _AUDIT_CONNECTION_KEYS:
+            for pos in _iter_literal(lower, literal):
+                if _is_word_byte(lower, pos - 1):
+                    continue
+                m = _AUDIT_CONNECTION_VALUE.match(lower, pos + len(literal))
+                if m:
+                    yield m.start(1), m.end(1), 'connection'
+
+    def _find_blobs(self, chunk: bytes):
+        classes = chunk.translate(_AUDIT_BLOB_CHARS)
+        pos = classes.find(_AUDIT_BLOB_RUN)
+        while pos >= 0:
+            end = classes.find(b' ', pos + AUDIT_BLOB_LENGTH)
+            end = len(chunk) if end < 0 else end
+            # base64 末尾最多两个 =
+            padding = len(chunk[end:end + 2]) - len(chunk[end:end + 2].lstrip(b'='))
+            token_end = min(end + padding, pos + AUDIT_BLOB_MAX)
+            if self._is_secret_blob(chunk[pos:token_end], chunk[max(pos - 7, 0):pos]):
+                yield pos, token_end, 'blob'
+            pos = classes.find(_AUDIT_BLOB_RUN, end)
+
+    def _find_known(self, lower: bytes):
+        for literal in self.known_literals:
+            for pos in _iter_literal(lower, literal):
+                yield pos, pos + len(literal), 'known'
+
+    def scan_chunk(self, chunk: bytes, state: dict, output: str) -> list:
+        """
+        扫描按行对齐的一块内容，state 在块之间传递：
+        line 为块首的行号，file 为当前源文件，file_line_base 为该源文件第 0 行对应的输出行号
+        """
+        lower = chunk.lower()
+        headers = [(m.start(), m.group(1).decode('utf-8', 'replace')) for m in _AUDIT_HEADER.finditer(chunk)
+                   if m.start() == 0 or chunk[m.start() - 1] == 0x0a]
+        found = []
+        found.extend(self._find_assignments(lower))
+        found.extend(self._find_connections(lower))
+        found.extend(self._find_blobs(chunk))
+        found.extend(self._find_known(lower))
+        # 同一位置只报告一次：已知密钥优先，其余按规则顺序
+        found.sort(key=lambda hit: (hit[0], hit[2] != 'known'))
+
+        hits = []
+        line = state['line']
+        last = 0
+        header_index = 0
+        covered = -1
+        for start, end, rule in found:
+            if start < covered:
+                continue
+            covered = end
+            while header_index < len(headers) and headers[header_index][0] < start:
+                header_pos, state['file'] = headers[header_index]
+                line += chunk.count(b'\n', last, header_pos)
+                last = header_pos
+                # 标题行之后是 ``` 行，再之后才是文件第 1 行
+                state['file_line_base'] = line + 1
+                header_index += 1
+            line += chunk.count(b'\n', last, start)
+            last = start
+            file_path = state['file']
+            hits.append(LeakHit(output, line, file_path, line - state['file_line_base'] if file_path else None,
+                                rule, mask_value(chunk[start:end].decode('utf-8', 'replace'), 4)))
+        for header_pos, state['file'] in headers[header_index:]:
+            line += chunk.count(b'\n', last, header_pos)
+            last = header_pos
+            state['file_line_base'] = line + 1
+        state['line'] = line + chunk.count(b'\n', last)
+        return hits
+
+    def audit_text(self, path: str) -> list:
+        """按行对齐的 AUDIT_CHUNK_SIZE 大块扫描文本输出（mmap，不整体读入内存）"""
+        state = {'line': 1, 'file': None, 'file_line_base': 0}
+        hits = []
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            if not size:
+                return hits
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                start = 0
+                while start < size:
+                    end = min(start + AUDIT_CHUNK_SIZE, size)
+                    if end < size:
+                        newline = data.rfind(b'\n', start, end)
+                        end = newline + 1 if newline >= 0 else (data.find(b'\n', end) + 1 or size)
+                    hits.extend(self.scan_chunk(data[start:end], state, path))
+                    start = end
+        return hits
+
+    def audit_bundle(self, path: str) -> list:
+        """逐个文件流式解压压缩包并扫描，行号为源文件中的行号（重复文件与首个文件共用内容，只扫描一次）"""
+        hits = []
+        with BundleReader(path) as reader:
+            for entry in reader.index['files']:
+                if entry.get('error') or entry.get('duplicate_of'):
+                    continue
+                state = {'line': 1, 'file': entry['path'], 'file_line_base': 0}
+                carry = b''
+                for data in reader.iter_chunks(entry['path']):
+                    data = carry + data
+                    newline = data.rfind(b'\n') + 1
+                    if newline:
+                        hits.extend(self.scan_chunk(data[:newline], state, path))
+                    carry = data[newline:]
+                if carry:
+                    hits.extend(self.scan_chunk(carry, state, path))
+        return hits
+
+def run_leak_audit(output_paths, base_dir: str, output_format: str = 'text', mode: str = 'warn') -> list:
+    """审计全部输出文件并打印命中位置，mode 为 'fail' 且有命中时抛出 RuntimeError"""
+    start = time.perf_counter()
+    auditor = LeakAuditor(load_known_secrets(base_dir))
+    hits = []
+    for path in output_paths:
+        hits.extend(auditor.audit_bundle(path) if output_format == 'bundle' else auditor.audit_text(path))
+    elapsed = time.perf_counter() - start
+    total = sum(os.path.getsize(p) for p in output_paths)
+    speed = f"，{get_file_size_from_bytes(int(total / elapsed))}/s" if elapsed > 0 else ""
+    print(f"\n🔍 泄漏审计: {get_file_size_from_bytes(total)}，{elapsed:.2f} 秒{speed}，"
+          f"已知密钥 {len(auditor.known_secrets)} 个")
+    if not hits:
+        print("✅ 未发现未掩码的敏感信息")
+        return hits
+
+    print(f"⚠️  发现 {len(hits)} 处可能未掩码的敏感信息:")
+    for hit in hits[:AUDIT_REPORT_LIMIT]:
+        output = os.path.basename(hit.output) + (f":{hit.line}" if output_format != 'bundle' else '')
+        location = f"{hit.file}:{hit.file_line}（{output}）" if hit.file else output
+        print(f"  [{AUDIT_RULE_NAMES[hit.rule]}] {location} {hit.text}")
+    if len(hits) > AUDIT_REPORT_LIMIT:
+        print(f"  ... 另有 {len(hits) - AUDIT_REPORT_LIMIT} 处")
+    if mode == 'fail':
+        raise RuntimeError(f"泄漏审计发现 {len(hits)} 处可能未掩码的敏感信息，请检查后再上传")
+    return hits
+
+# ✨打包范围
+DEFAULT_BASE_DIR = r"D:\Programing\C#\VacantRoomWeb\VacantRoomWeb"
+DEFAULT_OUTPUT_FILE = os.path.join(r"D:\Programing\C#\VacantRoomWeb", "#VacantRoomWeb_Code.txt")
+
+FILE_PATTERNS = [
+    "*.cs", "*.css", "*.razor", "*.csproj", "*.json", "*.config", "*.xml",
+    "*.md", "*.txt", "Components/**/*.razor", "Components/**/*.css",
+    "Pages/**/*.razor", "Layout/**/*.razor", "Layout/**/*.css",
+    "Services/**/*.cs", "wwwroot/**/*.css", "wwwroot/**/*.js",
+    "Properties/**/*.json", "Properties/**/*.xml",
+    # 课表工作簿只输出摘要（见 summarize_workbook）
+    "Data/**/*.xlsx",
+]
+
+# 排除规则见 #path_matcher.py 的 SOURCE_IGNORE_RULES（与目录扫描脚本共用），并读取仓库中的 .gitignore
+
+def get_output_file(output_file, compact=False, output_format='text'):
+    """实际写入的输出文件：精简输出加 .compact，压缩包扩展名为 .bundle"""
+    output_file = os.path.abspath(output_file)
+    if compact:
+        # 精简输出使用独立的文件名和缓存，不覆盖完整输出
+        root, ext = os.path.splitext(output_file)
+        output_file = f"{root}.compact{ext}"
+    if output_format == 'bundle':
+        # 压缩包与文本输出共用掩码缓存，输出文件扩展名为 .bundle
+        output_file = os.path.splitext(output_file)[0] + ".bundle"
+    return output_file
+
+def collect_project_files(base_dir, file_patterns=None, exclude_patterns=None, folders=None,
+                          use_gitignore=True, profiler=None):
+    """遍历项目目录，返回 (文件列表, 文件夹统计)，批量打包的预处理与 combine_code_files 共用"""
+    patterns = path_matcher.SOURCE_IGNORE_RULES + list(exclude_patterns or [])
+    ignore = path_matcher.load_project_matcher(base_dir, patterns, use_gitignore=use_gitignore)
+    records = walk_project_files(base_dir, file_patterns or FILE_PATTERNS, ignore, profiler)
+    return assign_folders(records, get_target_folders() if folders is None else folders)
+
+def combine_code_files(base_dir=None, output_file=None, use_cache=True, jobs=1, profile=False, profile_top=10,
+                       output_format='text', codec=None, max_part_bytes=None, max_part_tokens=None,
+                       compact=False, dedup=False, dedup_blocks=False, entropy=False, use_gitignore=True,
+                       file_patterns=None, exclude_patterns=None, folders=None, project_info=None,
+                       cache_dir=None, audit=None):
+    """
+    打包单个项目
+    - file_patterns / folders 默认为 FILE_PATTERNS / get_target_folders()，exclude_patterns 追加到工具自带的排除规则之后
+    - project_info 为头部的项目描述（默认 DEFAULT_PROJECT_INFO），cache_dir 为多项目共用的缓存目录
+    - audit 为 'warn' / 'fail' 时打包后对输出做泄漏审计（见 run_leak_audit），'fail' 时发现泄漏抛出异常
+    """
     # Base directory of your project
-    base_dir = r"D:\Programing\C#\VacantRoomWeb\VacantRoomWeb"
+    if base_dir is None:
+        base_dir = DEFAULT_BASE_DIR
 
     # Output text file
-    output_file = os.path.join(r"D:\Programing\C#\VacantRoomWeb", "#VacantRoomWeb_Code.txt")
-
-    file_patterns = [
-        "*.cs", "*.css", "*.razor", "*.csproj", "*.json", "*.config", "*.xml",
-        "*.md", "*.txt", "Components/**/*.razor", "Components/**/*.css",
-        "Pages/**/*.razor", "Layout/**/*.razor", "Layout/**/*.css",
-        "Services/**/*.cs", "wwwroot/**/*.css", "wwwroot/**/*.js",
-        "Properties/**/*.json", "Properties/**/*.xml",
-    ]
-
-    exclude_patterns = [
-        "bin/**","obj/**",".vs/**","*.user","*.cache","*.tmp","*.log",
-        "bootstrap.min.css","bootstrap.min.css.map",
-        "node_modules/**","packages/**",".git/**","Logs/**","VacantRoomWeb_Code.txt"
-    ]
+    if output_file is None:
+        output_file = DEFAULT_OUTPUT_FILE
+    if audit not in (None,) + AUDIT_MODES:
+        raise ValueError(f"不支持的审计模式: {audit}")
+    if (dedup or dedup_blocks) and not use_cache:
+        raise ValueError("去重需要增量缓存中的内容哈希，不能与 --no-cache 同时使用")
+    if output_format == 'bundle':
+        if max_part_bytes or max_part_tokens:
+            raise ValueError("分卷输出只支持文本格式")
+        codec = get_bundle_codec(codec)
+    output_file = get_output_file(output_file, compact, output_format)
 
     # 检查目录是否存在
     if not os.path.exists(base_dir):
         print(f"错误: 目录不存在: {base_dir}")
-        print("请修改脚本中的 base_dir 路径")
+        print("请检查 --base-dir 参数或配置文件中的 base_dir")
         
         # 尝试父目录
-        parent_dir = r"D:\Programing\C#\VacantRoomWeb"
+        parent_dir = os.path.dirname(os.path.abspath(base_dir))
         if os.path.exists(parent_dir):
             print(f"发现父目录: {parent_dir}")
             print("父目录内容:")
@@ -306,6 +2719,11 @@ def combine_code_files():
                     print(f"  📄 {item}")
         return
 
+    # 之后会切换工作目录，相对路径先转为绝对路径
+    base_dir = os.path.abspath(base_dir)
+    if cache_dir:
+        cache_dir = os.path.abspath(cache_dir)
+
     print(f"扫描目录: {base_dir}")
     print(f"输出文件: {output_file}")
     
@@ -313,178 +2731,649 @@ def combine_code_files():
     processed_files = 0
     total_size = 0
     protected_files = 0  # ✨统计被保护的文件数
-    target_folders = get_target_folders()
+    RULE_FALLBACKS.clear()
 
     current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M")
+    profiler = PackagingProfiler() if profile else None
 
-    with open(output_file, 'w', encoding='utf-8') as outf:
-        # ✨写入项目描述
-        outf.write("# VacantRoomWeb - 空房间管理系统\n")
-        outf.write("## 项目概述\n")
-        outf.write("基于 Blazor Server 的房间管理系统，提供房间状态监控、预订管理等功能\n")
-        outf.write("⚠️  敏感信息已自动掩码处理，保护密码、密钥、连接字符串等\n\n")
-        
-        outf.write("=" * 80 + "\n")
-        outf.write(f"打包时间: {current_time}\n")
-        outf.write("VACANTROOM WEB PROJECT - ALL CODE FILES\n")
-        outf.write("⚠️  敏感信息已自动掩码处理\n")
-        outf.write("=" * 80 + "\n\n")
+    original_dir = os.getcwd()
+    os.chdir(base_dir)
 
-        original_dir = os.getcwd()
-        os.chdir(base_dir)
+    try:
+        # ✨收集所有文件信息
+        print("开始扫描文件...")
+        all_files, folder_stats = collect_project_files(base_dir, file_patterns, exclude_patterns, folders,
+                                                        use_gitignore, profiler)
+        print(f"找到 {len(all_files)} 个文件进行打包")
 
-        try:
-            # ✨收集所有文件信息
-            all_files = []
-            folder_stats = {}  # 统计每个文件夹的文件数
-            
-            print("开始扫描文件...")
-            
-            for pattern in file_patterns:
-                matching_files = glob.glob(pattern, recursive=True)
-                for file_path in matching_files:
-                    if os.path.isfile(file_path):
-                        normalized_path = file_path.replace('\\', '/')
-                        
-                        # 检查是否需要排除
-                        should_exclude = False
-                        for exclude_pattern in exclude_patterns:
-                            if exclude_pattern.endswith('/**'):
-                                if normalized_path.startswith(exclude_pattern[:-3] + '/'):
-                                    should_exclude = True
-                                    break
-                            elif (exclude_pattern in normalized_path or 
-                                  os.path.basename(file_path) == exclude_pattern):
-                                should_exclude = True
-                                break
-                        
-                        if should_exclude or should_skip_file(os.path.basename(file_path)):
-                            continue
-                        
-                        # 确定文件夹
-                        folder_name = "根目录"
-                        for folder in target_folders:
-                            if normalized_path.startswith(folder + '/'):
-                                folder_name = folder
-                                break
-                        
-                        if folder_name == "根目录" and '/' in normalized_path:
-                            continue  # 跳过不在目标文件夹的文件
-                        
-                        file_size = os.path.getsize(file_path)
-                        all_files.append({
-                            'path': normalized_path,
-                            'folder': folder_name,
-                            'size': file_size
-                        })
-                        
-                        # 统计文件夹
-                        if folder_name not in folder_stats:
-                            folder_stats[folder_name] = 0
-                        folder_stats[folder_name] += 1
-
-            all_files = sorted(all_files, key=lambda x: (x['folder'], x['path']))
-            
-            print(f"找到 {len(all_files)} 个文件进行打包")
-
-            # ✨写入文件索引
-            outf.write("## 文件索引\n")
-            current_folder = ""
-            for file_info in all_files:
-                folder = file_info['folder']
-                if folder != current_folder:
-                    current_folder = folder
-                    file_count = folder_stats.get(folder, 0)
-                    outf.write(f"\n### {folder} ({file_count} 个文件)\n")
-                
-                size_str = get_file_size_from_bytes(file_info['size'])
-                outf.write(f"- {file_info['path']} ({size_str})\n")
-
-            # ✨写入项目统计
-            outf.write(f"\n## 项目统计\n")
-            outf.write(f"- 总文件数: {len(all_files)}\n")
-            outf.write(f"- 总大小: {get_file_size_from_bytes(sum(f['size'] for f in all_files))}\n")
-            outf.write(f"- 生成时间: {current_time}\n")
-            outf.write(f"- 项目路径: {base_dir}\n")
-            
-            # ✨写入技术栈信息
-            outf.write(f"\n## 技术栈\n")
-            outf.write("- ASP.NET Core Blazor Server\n")
-            outf.write("- Entity Framework Core\n")
-            outf.write("- Bootstrap CSS Framework\n")
-            outf.write("- SignalR (实时通信)\n")
-            
-            # ✨写入文件夹统计
-            outf.write(f"\n## 文件夹统计\n")
-            for folder, count in sorted(folder_stats.items()):
-                outf.write(f"- {folder}: {count} 个文件\n")
-
-            # ✨写入文件内容
-            outf.write("\n" + "="*80 + "\n")
-            outf.write("## 文件内容\n")
-            outf.write("="*80 + "\n")
-
-            current_folder = ""
-            for file_info in all_files:
-                folder = file_info['folder']
-                if folder != current_folder:
-                    current_folder = folder
-                    outf.write(f"\n\n### {folder} 文件夹\n")
-                    outf.write("-" * 50 + "\n")
+        # ✨增量缓存：只重新掩码发生变化的文件
+        cache = ManifestCache(output_file, compact, entropy, cache_dir) if use_cache else None
+        resolved = None
+        if jobs > 1:
+            print(f"并行处理: {jobs} 个进程")
+        if cache:
+            resolved = cache.resolve_all(all_files, jobs, profiler)
+            print(f"缓存命中: {cache.hits} 个文件, 重新处理: {cache.misses} 个文件")
 
-                try:
-                    outf.write(f"\n#### 文件: {file_info['path']}\n")
-                    outf.write(f"```{get_file_extension_for_syntax(file_info['path'])}\n")
-                    
-                    with open(file_info['path'], 'r', encoding='utf-8', errors='ignore') as inf:
-                        file_content = inf.read()
-                    
-                    # ✨处理敏感信息
-                    original_content = file_content
-                    file_content = process_file_content(file_info['path'], file_content)
-                    
-                    # 统计是否有敏感信息被保护
-                    if file_content != original_content:
-                        protected_files += 1
-                    
-                    outf.write(file_content + "\n\n")
-                    outf.write("```\n")
-                    
-                    # 统计文件大小
-                    processed_files += 1
-                    total_size += len(file_content.encode('utf-8'))
-                    
-                except Exception as e:
-                    outf.write(f"[ERROR: 无法读取文件 - {str(e)}]\n```\n")
-                    processed_files += 1
+        # ✨内容去重
+        dedup_plan = None
+        if dedup or dedup_blocks:
+            # 压缩包只做文件级去重
+            dedup_plan = plan_dedup(all_files, resolved, cache, dedup_blocks and output_format == 'text')
+            print(f"去重: {len(dedup_plan.duplicates)} 个重复文件"
+                  + (f", {dedup_plan.block_count} 个重复块" if dedup_blocks else ""))
 
-            # ✨写入保护统计
-            outf.write("\n" + "=" * 80 + "\n")
-            outf.write("代码文件结束\n")
-            outf.write("✅ 敏感信息保护：密码、密钥、连接字符串等已自动掩码\n")
-            outf.write(f"📊 统计信息：包含文件总数 {processed_files} 个\n")
-            outf.write(f"🔒 敏感信息保护：{protected_files} 个文件\n")
-            outf.write("=" * 80 + "\n")
+        # ✨分卷：有缓存时按掩码后的实际大小和 token 数装箱，否则按源文件大小估算
+        output_paths = [output_file]
+        if max_part_bytes or max_part_tokens:
+            reserved = measure_header(all_files, folder_stats, current_time, base_dir, len(all_files),
+                                      compact, dedup_plan, project_info)
+            parts = plan_parts(all_files, resolved, max_part_bytes, max_part_tokens, reserved)
+            output_paths = get_part_paths(output_file, len(parts))
+            print(f"分卷输出: {len(parts)} 个部分")
 
-        finally:
-            os.chdir(original_dir)
+        if cache:
+            # 输出选项不同时同一份缓存也需要重写输出
+            options = [output_format, codec, max_part_bytes, max_part_tokens, dedup, dedup_blocks]
+            bundle_digest = compute_bundle_digest(base_dir, all_files, resolved, project_info)
+            bundle_digest = hash_bytes(f"{bundle_digest}:{options}".encode('utf-8'))
+            if bundle_digest == cache.bundle_digest and all(os.path.exists(p) for p in output_paths):
+                cache.save(all_files, bundle_digest)
+                print("\n✅ 源文件未发生变化，跳过重新打包")
+                for path in output_paths:
+                    print(f"输出文件: {path}")
+                leaks = run_leak_audit(output_paths, base_dir, output_format, audit) if audit else []
+                return {
+                    'files': len(all_files),
+                    'input_size': sum(f['size'] for f in all_files),
+                    'protected_files': sum(1 for e in resolved.values() if e.get('protected')),
+                    'mask_fallbacks': dict(sum((Counter(e.get('fallbacks', {})) for e in resolved.values()),
+                                               Counter())),
+                    'leaks': len(leaks),
+                    'output_file': output_file,
+                    'output_files': output_paths,
+                    'skipped': True,
+                }
+
+        compact_stats = {} if compact else None
+        if output_format == 'bundle':
+            processed_files, protected_files, total_size = write_code_bundle(
+                output_file, all_files,
+                iter_file_payloads(all_files, cache, resolved, jobs, profiler, compact, compact_stats, entropy),
+                codec=codec, profiler=profiler, created=current_time, base_dir=base_dir,
+                folders=dict(sorted(folder_stats.items())), masking_rules_version=MASKING_RULES_VERSION,
+                compact=compact, duplicates=dedup_plan.duplicates if dedup_plan else None)
+        elif max_part_bytes or max_part_tokens:
+            part_results = write_text_parts(parts, output_paths, all_files, folder_stats, current_time, base_dir,
+                                            cache, resolved, jobs, profiler, compact, dedup_plan, entropy,
+                                            project_info)
+            processed_files = sum(r[0] for r in part_results)
+            protected_files = sum(r[1] for r in part_results)
+            total_size = sum(r[2] for r in part_results)
+            if compact:
+                for r in part_results:
+                    merge_compact_stats(compact_stats, r[3])
+            remove_stale_parts(output_file, output_paths)
+        else:
+            header_start = time.perf_counter()
+            with atomic_write(output_file, 'w', encoding='utf-8') as outf:
+                write_text_header(outf, all_files, folder_stats, current_time, base_dir,
+                                  compact=compact, dedup=dedup_plan, project_info=project_info)
+                if profiler:
+                    profiler.add('write', time.perf_counter() - header_start)
+                payloads = iter_file_payloads(all_files, cache, resolved, jobs, profiler, compact, compact_stats,
+                                              entropy)
+                processed_files, protected_files, total_size = write_text_contents(outf, payloads, profiler,
+                                                                                   dedup_plan)
+                write_text_footer(outf, processed_files, protected_files)
+
+        if cache:
+            cache.save(all_files, bundle_digest)
+
+    finally:
+        os.chdir(original_dir)
+
+    # ✨性能分析报告
+    if profiler:
+        report = profiler.report(jobs)
+        report_file = os.path.splitext(output_file)[0] + ".profile.json"
+        with open(report_file, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        profiler.print_report(report, profile_top)
+        print(f"性能分析报告: {report_file}")
     
     # 计算输出文件大小并显示统计信息
-    if os.path.exists(output_file):
-        output_size = os.path.getsize(output_file)
+    if all(os.path.exists(p) for p in output_paths):
+        output_size = sum(os.path.getsize(p) for p in output_paths)
         
         print("\n" + "=" * 60)
         print("✅ 所有文件合并成功!")
-        print(f"输出文件: {output_file}")
+        for path in output_paths:
+            print(f"输出文件: {path}" + (f" ({get_file_size_from_bytes(os.path.getsize(path))})"
+                                        if len(output_paths) > 1 else ""))
         print(f"文件大小: {get_file_size_from_bytes(output_size)}")
+        if output_format == 'bundle':
+            print(f"压缩格式: {codec}（掩码后内容 {get_file_size_from_bytes(total_size)}）")
         print(f"包含文件总数: {processed_files}")
         print(f"敏感信息保护: {protected_files} 个文件")
+        if compact:
+            print_compact_stats(compact_stats)
+        if +RULE_FALLBACKS:
+            print_fallback_stats(+RULE_FALLBACKS)
         print("=" * 60)
         print("\n✅ 打包完成！敏感信息已自动保护，可以安全上传到Claude进行代码分析。")
 
+    # ✨泄漏审计
+    leaks = run_leak_audit(output_paths, base_dir, output_format, audit) if audit else []
+
+    return {
+        'files': processed_files,
+        'input_size': sum(f['size'] for f in all_files),
+        'protected_files': protected_files,
+        'mask_fallbacks': dict(+RULE_FALLBACKS),
+        'leaks': len(leaks),
+        'output_file': output_file,
+        'output_files': output_paths,
+        'skipped': False,
+    }
+
+# ✨多项目批量打包：配置文件列出解决方案中的各个项目，一次运行全部打包
+# 配置文件为 JSON，相对路径以配置文件所在目录为准：
+# {
+#   "cache_dir": ".packager-cache",               各项目共用的缓存目录（可选，默认与各自的输出文件同目录）
+#   "jobs": 4,                                    默认并行进程数（可选，命令行 --jobs 优先）
+#   "projects": [{
+#     "name": "GenerateAdminPassword",            项目名（--project 按名称选择）
+#     "base_dir": "GenerateAdminPassword",        项目目录
+#     "output": "#GenerateAdminPassword_Code.txt",
+#     "include": ["*.cs", "*.csproj"],            包含模式（可选，默认 FILE_PATTERNS）
+#     "exclude": ["Migrations/"],                 追加的排除规则，.gitignore 语法（可选）
+#     "folders": ["Services"],                    分组的子目录（可选，默认 get_target_folders()）
+#     "title": "...", "description": "...", "banner": "...", "tech_stack": ["..."],   头部描述（可选）
+#     "options": {"compact": true}                覆盖命令行的打包选项（可选）
+#   }]
+# }
+DEFAULT_CONFIG_FILE = os.path.join(SCRIPT_DIR, "#packager.json")
+PROJECT_INFO_KEYS = ('title', 'description', 'banner', 'tech_stack')
+PROJECT_OPTION_KEYS = ('output_format', 'codec', 'max_part_bytes', 'max_part_tokens', 'compact',
+                       'dedup', 'dedup_blocks', 'entropy', 'use_gitignore', 'audit')
+
+def load_projects_config(config_file: str, names=None):
+    """读取批量打包配置，返回 (项目列表, 全局设置)，names 不为空时只返回这些项目"""
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    config_dir = os.path.dirname(os.path.abspath(config_file))
+
+    def resolve(path):
+        return os.path.normpath(os.path.join(config_dir, os.path.expanduser(path)))
+
+    projects = []
+    for index, item in enumerate(config.get('projects', []), 1):
+        missing = [key for key in ('name', 'base_dir', 'output') if not item.get(key)]
+        if missing:
+            raise ValueError(f"配置文件第 {index} 个项目缺少 {', '.join(missing)}")
+        options = dict(item.get('options', {}))
+        unknown = set(options) - set(PROJECT_OPTION_KEYS)
+        if unknown:
+            raise ValueError(f"项目 {item['name']} 的 options 不支持: {', '.join(sorted(unknown))}")
+        for key, unit in (('max_part_bytes', 1024), ('max_part_tokens', 1000)):
+            if isinstance(options.get(key), str):
+                options[key] = parse_budget(options[key], unit)
+        project_info = None
+        if any(key in item for key in PROJECT_INFO_KEYS):
+            project_info = {
+                'title': item.get('title', item['name']),
+                'description': item.get('description', ''),
+                'banner': item.get('banner', f"{item['name'].upper()} - ALL CODE FILES"),
+                'tech_stack': list(item.get('tech_stack', [])),
+            }
+        projects.append({
+            'name': item['name'],
+            'base_dir': resolve(item['base_dir']),
+            'output_file': resolve(item['output']),
+            'file_patterns': item.get('include'),
+            'exclude_patterns': item.get('exclude'),
+            'folders': item.get('folders'),
+            'project_info': project_info,
+            'options': options,
+        })
+
+    if names:
+        known = {p['name'] for p in projects}
+        unknown = [name for name in names if name not in known]
+        if unknown:
+            raise ValueError(f"配置文件中没有项目: {', '.join(unknown)}（可选: {', '.join(sorted(known))}）")
+        projects = [p for p in projects if p['name'] in names]
+
+    # 缓存清单按输出文件名区分，共用缓存目录时输出文件名不能重复
+    outputs = [os.path.basename(p['output_file']).lower() for p in projects]
+    if len(set(outputs)) != len(outputs):
+        raise ValueError("各项目的输出文件名不能相同")
+
+    settings = {
+        'cache_dir': resolve(config['cache_dir']) if config.get('cache_dir') else None,
+        'jobs': config.get('jobs'),
+    }
+    return projects, settings
+
+def get_project_kwargs(project, cache_dir=None, **options):
+    """项目配置转换为 combine_code_files 的参数，项目自己的 options 优先"""
+    return dict(options, base_dir=project['base_dir'], output_file=project['output_file'],
+                file_patterns=project['file_patterns'], exclude_patterns=project['exclude_patterns'],
+                folders=project['folders'], project_info=project['project_info'], cache_dir=cache_dir,
+                **project['options'])
+
+def warm_shared_cache(runs, jobs: int = 1) -> dict:
+    """
+    批量打包的预处理：各项目缓存未命中的文件按 (绝对路径, 精简, 高熵) 合并后只读取、掩码一次，
+    结果写入每个引用该文件的项目缓存，之后各项目打包时全部命中缓存
+    大文件流式掩码的结果不经过进程间传递，留给各项目自己处理
+    """
+    caches = []
+    pending = {}
+    total = 0
+    for kwargs in runs:
+        if not kwargs.get('use_cache', True) or not os.path.isdir(kwargs['base_dir']):
+            continue
+        compact = kwargs.get('compact', False)
+        entropy = kwargs.get('entropy', False)
+        output_file = get_output_file(kwargs['output_file'], compact, kwargs.get('output_format', 'text'))
+        cache = ManifestCache(output_file, compact, entropy, kwargs.get('cache_dir'))
+        all_files, _ = collect_project_files(kwargs['base_dir'], kwargs.get('file_patterns'),
+                                             kwargs.get('exclude_patterns'), kwargs.get('folders'),
+                                             kwargs.get('use_gitignore', True))
+        caches.append((cache, all_files))
+        total += len(all_files)
+        for file_info in all_files:
+            if cache.lookup(file_info) is None:
+                full_path = os.path.join(kwargs['base_dir'], *file_info['path'].split('/'))
+                key = (os.path.normcase(full_path), compact, entropy)
+                pending.setdefault(key, (full_path, []))[1].append((cache, file_info))
+
+    # 只被一个项目引用时可以带上已知的内容哈希，内容未变的文件不必重新掩码
+    items = list(pending.items())
+    tasks = []
+    for (_, compact, entropy), (full_path, users) in items:
+        known_hash = users[0][0].known_hash(users[0][1]['path']) if len(users) == 1 else None
+        tasks.append((full_path, known_hash, False, compact, entropy))
+    for (_, (_, users)), (result, error) in zip(items, iter_ordered_results(mask_file_task, tasks, jobs)):
+        if error is None and not result.streaming:
+            for cache, file_info in users:
+                cache.store(file_info, result)
+
+    # 保留原来的打包摘要，各项目仍按摘要判断是否需要重写输出
+    for cache, all_files in caches:
+        cache.save(all_files, cache.bundle_digest)
+    return {
+        'files': total,
+        'misses': sum(len(users) for _, (_, users) in items),
+        'processed': len(items),
+    }
+
+def package_project_safely(kwargs):
+    """打包单个项目，出错时打印错误并返回 None，不影响批量打包中的其他项目"""
+    try:
+        return combine_code_files(**kwargs)
+    except Exception as e:
+        print(f"❌ 错误: {e}")
+        return None
+
+def package_project_task(kwargs):
+    """在子进程中打包单个项目（combine_code_files 会切换工作目录），返回 (结果, 输出的日志)"""
+    log = io.StringIO()
+    with redirect_stdout(log):
+        summary = package_project_safely(kwargs)
+    return summary, log.getvalue()
+
+def package_projects(projects, cache_dir=None, jobs: int = 1, **options):
+    """
+    一次打包配置文件中的多个项目
+    - 先统一预处理所有项目中缓存未命中的文件，多个项目引用的同一文件只读取和掩码一次
+    - 之后各项目在独立进程中并行写入输出，总耗时接近最大的单个项目
+    - 某个项目失败时继续打包其他项目，返回的列表中该项目为 None
+    - audit 为 'fail' 的项目按 'warn' 审计，保留输出和汇总，审计发现泄漏时同样算作失败
+    """
+    start = time.perf_counter()
+    runs = [get_project_kwargs(project, cache_dir, **options) for project in projects]
+    print(f"批量打包: {len(runs)} 个项目（{', '.join(p['name'] for p in projects)}）")
+
+    warm = warm_shared_cache(runs, jobs)
+    print(f"共享预处理: {warm['files']} 个文件，缓存未命中 {warm['misses']} 个，"
+          f"实际读取并掩码 {warm['processed']} 个（{time.perf_counter() - start:.2f} 秒）")
+
+    # 掩码已在预处理中完成，各项目只需写入输出，进程数在项目之间平分
+    fail_on_leaks = []
+    for kwargs in runs:
+        kwargs['jobs'] = max(1, jobs // len(runs))
+        fail_on_leaks.append(kwargs.get('audit') == 'fail')
+        if fail_on_leaks[-1]:
+            kwargs['audit'] = 'warn'
+    if jobs <= 1 or len(runs) == 1:
+        results = [(package_project_safely(kwargs), None) for kwargs in runs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(runs))) as pool:
+            results = list(pool.map(package_project_task, runs))
+        for project, (_, log) in zip(projects, results):
+            print(f"\n{'#' * 20} {project['name']} {'#' * 20}")
+            print(log, end='')
+
+    print("\n" + "=" * 60)
+    print(f"批量打包完成（{time.perf_counter() - start:.2f} 秒）")
+    summaries = []
+    for project, (summary, _), fail in zip(projects, results, fail_on_leaks):
+        if summary is None:
+            print(f"❌ {project['name']}: 打包失败")
+        else:
+            status = "未变化" if summary['skipped'] else f"{summary['files']} 个文件"
+            if summary.get('leaks') and fail:
+                print(f"❌ {project['name']}: {status} -> {summary['output_file']}（泄漏审计: {summary['leaks']} 处）")
+                summary = None
+            elif summary.get('leaks'):
+                print(f"⚠️  {project['name']}: {status} -> {summary['output_file']}（泄漏审计: {summary['leaks']} 处）")
+            else:
+                print(f"✅ {project['name']}: {status} -> {summary['output_file']}")
+        summaries.append(summary)
+    failed = sum(1 for summary in summaries if summary is None)
+    if failed:
+        print(f"❌ {failed}/{len(summaries)} 个项目打包失败")
+    print("=" * 60)
+    return summaries
+
+# ✨监视模式：常驻运行，文件保存后增量重新打包
+
+WATCH_POLL_INTERVAL = 0.5
+# 连续保存时最多推迟重新打包的时间
+WATCH_MAX_DELAY = 1.0
+# inotify 事件：写入完成、创建、删除、移入移出（编辑器"先写临时文件再改名"的保存方式会产生移入事件）
+IN_MODIFY, IN_ATTRIB, IN_CLOSE_WRITE = 0x002, 0x004, 0x008
+IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x040, 0x080, 0x100, 0x200
+IN_DELETE_SELF, IN_Q_OVERFLOW, IN_IGNORED, IN_ISDIR = 0x400, 0x4000, 0x8000, 0x40000000
+INOTIFY_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO
+                | IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+_INOTIFY_EVENT = struct.Struct('iIII')
+
+class ProjectWatcher:
+    """
+    监视项目中参与打包的文件，与 walk_project_files 使用相同的包含/排除规则
+    - Linux 下通过 ctypes 调用 inotify（无需第三方库），只监视打包时会进入的目录，新建的目录自动加入
+    - 其他平台、inotify 不可用或 poll=True 时，每隔 WATCH_POLL_INTERVAL 秒对比一次文件的大小和修改时间
+    - ignore_prefix 下的路径（输出文件、清单、缓存目录）不算作变化，输出放在项目目录内时不会反复触发
+    """
+
+    def __init__(self, base_dir, file_patterns, ignore, ignore_prefix=None, poll=False):
+        self.base_dir = os.path.abspath(base_dir)
+        self.file_patterns = file_patterns
+        self.ignore = ignore
+        self.matcher = compile_file_patterns(file_patterns)
+        self.scopes = get_pattern_scopes(file_patterns)
+        self.ignore_prefix = ignore_prefix
+        self.fd = None
+        self.dirs = {}
+        if not poll:
+            self._init_inotify()
+        if self.fd is None:
+            self.snapshot = self._take_snapshot()
+
+    @property
+    def backend(self) -> str:
+        return 'inotify' if self.fd is not None else 'poll'
+
+    def _init_inotify(self):
+        if not sys.platform.startswith('linux'):
+            return
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        except (OSError, AttributeError):
+            return
+        if fd < 0:
+            return
+        self.fd = fd
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self._watch_tree('')
+
+    def _watch_tree(self, rel_dir):
+        """监视目录及其下所有会被打包遍历的子目录"""
+        stack = [rel_dir]
+        while stack:
+            rel_dir = stack.pop()
+            full_path = os.path.join(self.base_dir, rel_dir) if rel_dir else self.base_dir
+            wd = self._add_watch(self.fd, os.fsencode(full_path), INOTIFY_MASK)
+            if wd < 0:
+                continue
+            self.dirs[wd] = rel_dir
+            try:
+                with os.scandir(full_path) as it:
+                    for entry in it:
+                        rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                        if entry.is_dir() and self._is_relevant(rel_path, True):
+                            stack.append(rel_path)
+            except OSError:
+                continue
+
+    def _is_relevant(self, rel_path: str, is_dir: bool) -> bool:
+        if any(part.startswith('.') for part in rel_path.split('/')):
+            return False
+        if self.ignore_prefix and os.path.join(self.base_dir, rel_path).startswith(self.ignore_prefix):
+            return False
+        if is_dir:
+            return not self.ignore.is_ignored(rel_path, True) and should_enter_directory(rel_path, self.scopes)
+        return self.matcher.fullmatch(_normalize_case(rel_path)) is not None and not self.ignore.is_ignored(rel_path)
+
+    def _take_snapshot(self) -> dict:
+        return {f['path']: (f['size'], f['mtime'])
+                for f in walk_project_files(self.base_dir, self.file_patterns, self.ignore)}
+
+    def _read_inotify(self, timeout) -> set:
+        """等待 inotify 事件（timeout 为 None 时一直等待），返回发生变化的相对路径"""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        changed = set()
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, name_len = _INOTIFY_EVENT.unpack_from(data, offset)
+                name = os.fsdecode(data[offset + _INOTIFY_EVENT.size:offset + _INOTIFY_EVENT.size + name_len]
+                                   .rstrip(b'\0'))
+                offset += _INOTIFY_EVENT.size + name_len
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，无法知道具体变化，按全部变化处理
+                    changed.add('')
+                    continue
+                if mask & IN_IGNORED:
+                    self.dirs.pop(wd, None)
+                    continue
+                rel_dir = self.dirs.get(wd)
+                if rel_dir is None:
+                    continue
+                if not name:
+                    # 被监视的目录自身被删除
+                    changed.add(rel_dir)
+                    continue
+                rel_path = f"{rel_dir}/{name}" if rel_dir else name
+                is_dir = bool(mask & IN_ISDIR)
+                if not self._is_relevant(rel_path, is_dir):
+                    continue
+                if is_dir and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(rel_path)
+                changed.add(rel_path)
+        return changed
+
+    def _read_poll(self, timeout) -> set:
+        """轮询模式：timeout 为 None 时一直轮询到发现变化"""
+        while True:
+            time.sleep(WATCH_POLL_INTERVAL if timeout is None else min(timeout, WATCH_POLL_INTERVAL))
+            snapshot = self._take_snapshot()
+            changed = {path for path in snapshot.keys() | self.snapshot.keys()
+                       if snapshot.get(path) != self.snapshot.get(path)}
+            self.snapshot = snapshot
+            if changed or timeout is not None:
+                return changed
+
+    def _read_changes(self, timeout) -> set:
+        return self._read_inotify(timeout) if self.fd is not None else self._read_poll(timeout)
+
+    def wait_for_changes(self, debounce: float) -> set:
+        """
+        阻塞到有文件变化，之后继续收集，直到 debounce 秒内没有新变化
+        （连续保存时最多推迟 WATCH_MAX_DELAY 秒），返回变化的相对路径集合
+        """
+        changed = set()
+        while not changed:
+            changed = self._read_changes(None)
+        deadline = time.monotonic() + WATCH_MAX_DELAY
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            more = self._read_changes(min(debounce, remaining))
+            if not more:
+                break
+            changed |= more
+        return changed
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+def watch_project(base_dir=None, output_file=None, debounce=0.05, poll=False, **options):
+    """
+    --watch：先打包一次，之后每当参与打包的文件变化时重新打包
+    依赖增量缓存，只有变化的文件会重新掩码；输出先写临时文件再替换，读取方不会看到写了一半的内容
+    """
+    if not options.get('use_cache', True):
+        raise ValueError("监视模式依赖增量缓存，不能与 --no-cache 同时使用")
+    base_dir = os.path.abspath(base_dir or DEFAULT_BASE_DIR)
+    summary = combine_code_files(base_dir, output_file, **options)
+    if summary is None:
+        return
+
+    # 输出文件、清单、缓存目录、分卷都以输出文件名（去掉扩展名）开头
+    patterns = path_matcher.SOURCE_IGNORE_RULES + list(options.get('exclude_patterns') or [])
+    ignore = path_matcher.load_project_matcher(base_dir, patterns, use_gitignore=options.get('use_gitignore', True))
+    watcher = ProjectWatcher(base_dir, options.get('file_patterns') or FILE_PATTERNS, ignore,
+                             ignore_prefix=os.path.splitext(summary['output_file'])[0], poll=poll)
+    print(f"\n👀 正在监视 {base_dir}（{watcher.backend}），按 Ctrl+C 退出")
+    try:
+        while True:
+            changed = watcher.wait_for_changes(debounce)
+            start = time.perf_counter()
+            try:
+                with redirect_stdout(io.StringIO()):
+                    summary = combine_code_files(base_dir, output_file, **options)
+                if summary is None:
+                    raise FileNotFoundError(f"目录不存在: {base_dir}")
+            except Exception as e:
+                print(f"❌ {datetime.now():%H:%M:%S} 重新打包失败: {e}")
+                continue
+            elapsed = (time.perf_counter() - start) * 1000
+            names = ', '.join(sorted(changed)[:3]) + (f" 等 {len(changed)} 个" if len(changed) > 3 else "")
+            status = "内容未变化" if summary['skipped'] else f"已更新 {summary['files']} 个文件"
+            print(f"🔄 {datetime.now():%H:%M:%S} {names or '项目目录'}: {status}（{elapsed:.0f} ms）")
+    except KeyboardInterrupt:
+        print("\n已停止监视")
+    finally:
+        watcher.close()
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="VacantRoomWeb 项目代码打包脚本")
+    parser.add_argument('--config', metavar='FILE',
+                        help="批量打包配置文件（默认使用脚本目录下的 #packager.json，未指定 --base-dir 时生效）")
+    parser.add_argument('--project', action='append', metavar='NAME',
+                        help="只打包配置文件中的指定项目，可多次指定")
+    parser.add_argument('--base-dir', help="只打包单个项目目录，不读取配置文件")
+    parser.add_argument('--output', help="--base-dir 模式下的输出文件")
+    parser.add_argument('--jobs', '-j', type=int, default=None,
+                        help="并行掩码的进程数（0 表示使用全部 CPU 核心，默认 1 或配置文件中的 jobs）")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="禁用增量缓存，重新处理所有文件")
+    parser.add_argument('--profile', action='store_true',
+                        help="记录各阶段耗时、每个文件的掩码耗时和规则命中次数，输出 JSON 报告")
+    parser.add_argument('--profile-top', type=int, default=10,
+                        help="--profile 模式下显示最慢的文件数（默认 10）")
+    parser.add_argument('--format', choices=('text', 'bundle'), default='text',
+                        help="输出格式：text 为单个文本文件，bundle 为带索引的压缩包（可用 #bundle_reader.py 读取）")
+    parser.add_argument('--compact', action='store_true',
+                        help="精简模式：去除 C# / Razor / CSS 的注释和多余空白（输出为 *.compact.*）")
+    parser.add_argument('--entropy', action='store_true',
+                        help="额外掩码高熵字符串（变量名不含敏感关键词的硬编码密码、API 令牌等）")
+    parser.add_argument('--dedup', action='store_true',
+                        help="内容相同的文件只输出一次，重复文件写入引用（需要增量缓存）")
+    parser.add_argument('--dedup-blocks', action='store_true',
+                        help="同时对大文件做块级去重（隐含 --dedup，仅文本输出）")
+    parser.add_argument('--max-part-bytes', type=parse_budget, metavar='SIZE',
+                        help="分卷输出，每个部分的最大字节数（如 500K、2M）")
+    parser.add_argument('--max-part-tokens', type=lambda text: parse_budget(text, 1000), metavar='TOKENS',
+                        help="分卷输出，每个部分的最大近似 token 数（如 100K）")
+    parser.add_argument('--no-gitignore', action='store_true',
+                        help="不读取仓库中的 .gitignore，只使用脚本自带的排除规则")
+    parser.add_argument('--watch', action='store_true',
+                        help="监视模式：常驻运行，文件保存后增量重新打包（Linux 使用 inotify，其他平台轮询）")
+    parser.add_argument('--debounce', type=int, default=50, metavar='MS',
+                        help="监视模式下等待连续保存结束的时间（毫秒，默认 50）")
+    parser.add_argument('--poll', action='store_true',
+                        help="监视模式下强制使用轮询（网络盘、WSL 挂载目录等 inotify 收不到事件时使用）")
+    parser.add_argument('--audit', nargs='?', const='warn', choices=AUDIT_MODES,
+                        help="打包后扫描输出，报告未被掩码的敏感信息（fail：发现时打包失败）")
+    parser.add_argument('--codec', choices=BUNDLE_CODECS,
+                        help="压缩包的压缩格式（默认已安装 zstandard 时使用 zstd，否则使用 gzip）")
+    args = parser.parse_args()
+    if args.base_dir and (args.config or args.project):
+        parser.error("--base-dir 不能与 --config / --project 同时使用")
+    if args.output and not args.base_dir:
+        parser.error("--output 需要与 --base-dir 同时使用")
+    if args.jobs is not None and args.jobs <= 0:
+        args.jobs = os.cpu_count() or 1
+    return args
+
 if __name__ == "__main__":
+    args = parse_args()
+    options = dict(use_cache=not args.no_cache,
+                   profile=args.profile, profile_top=args.profile_top,
+                   output_format=args.format, codec=args.codec,
+                   max_part_bytes=args.max_part_bytes, max_part_tokens=args.max_part_tokens,
+                   compact=args.compact, dedup=args.dedup, dedup_blocks=args.dedup_blocks,
+                   entropy=args.entropy, use_gitignore=not args.no_gitignore, audit=args.audit)
+    config_file = args.config or (DEFAULT_CONFIG_FILE if not args.base_dir and os.path.exists(DEFAULT_CONFIG_FILE)
+                                  else None)
     try:
-        combine_code_files()
+        if config_file:
+            projects, settings = load_projects_config(config_file, args.project)
+            jobs = args.jobs or settings['jobs'] or 1
+            if jobs <= 0:
+                jobs = os.cpu_count() or 1
+            if args.watch:
+                if len(projects) != 1:
+                    raise ValueError("监视模式只支持单个项目，请用 --project 选择")
+                kwargs = get_project_kwargs(projects[0], settings['cache_dir'], jobs=jobs, **options)
+                watch_project(debounce=args.debounce / 1000, poll=args.poll, **kwargs)
+            else:
+                summaries = package_projects(projects, settings['cache_dir'], jobs, **options)
+                if any(summary is None for summary in summaries):
+                    sys.exit(1)
+        else:
+            output_file = args.output
+            if args.base_dir and not output_file:
+                # 默认输出到项目目录的上一级：#<项目名>_Code.txt
+                base_dir = os.path.abspath(args.base_dir)
+                output_file = os.path.join(os.path.dirname(base_dir), f"#{os.path.basename(base_dir)}_Code.txt")
+            options.update(base_dir=args.base_dir, output_file=output_file, jobs=args.jobs or 1)
+            if args.watch:
+                watch_project(debounce=args.debounce / 1000, poll=args.poll, **options)
+            else:
+                combine_code_files(**options)
     except Exception as e:
         print(f"❌ 错误: {e}")
-        input()
\ No newline at end of file
+        # 双击运行时暂停以便查看错误；在 CI 或管道中运行时不等待输入，直接以非零状态退出
+        if sys.stdin is not None and sys.stdin.isatty():
+            input()
+        sys.exit(1)
\ No newline at end of file
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+路径排除规则匹配脚本（#packager.py 和 #scan_project.py 共用）
+- 使用 .gitignore 语法描述排除规则：工具自带的规则 + 仓库中从仓库根目录到扫描目录的各级 .gitignore
+- 所有规则编译为一个正则（文件、目录各一个），每个路径只匹配一次，不再逐条规则循环判断
+- 与 git 一致：后出现的规则优先，! 开头的规则重新包含，以 / 结尾的规则只匹配目录
+- 遍历时先判断目录，被排除的目录不再进入（与 git 一致，被排除目录下的文件无法被 ! 规则重新包含）
+
+用法:
+    python "#path_matcher.py" VacantRoomWeb bin/Debug Services/RoomService.cs
+"""
+
+import os
+import re
+import sys
+import argparse
+from collections import namedtuple
+
+# ✨工具自带的排除规则
+# 打包脚本和扫描脚本的 --source-rules 使用：构建输出、IDE / 包管理器目录、日志、临时文件和打包脚本自身的输出
+# 与打包脚本原先的规则相比：bin/ obj/ packages/ Logs/ 等目录在任意层级都排除（原先只排除项目根目录下的），
+# 并新增 Debug/ Release/，与扫描脚本原先按名称跳过的目录一致；名为 Debug / Release 的源码目录不会被打包
+SOURCE_IGNORE_RULES = [
+    "bin/", "obj/", "Debug/", "Release/", ".vs/", ".vscode/", ".git/",
+    "node_modules/", "packages/", "__pycache__/", "Logs/",
+    "*.user", "*.suo", "*.cache", "*.tmp", "*.temp", "*.bak", "*.old", "*.log",
+    "*.dll", "*.exe", "*.pdb", "*.deps.json",
+    "bootstrap.min.css", "bootstrap.min.css.map",
+    "*VacantRoomWeb_Code*",
+]
+
+# 目录扫描脚本默认（包括命令行和增量部署遍历发布目录）只跳过这些名称，部署目录中的 .dll、Logs/ 等文件不受影响
+SCAN_SKIP_RULES = [
+    "__pycache__", "node_modules", ".vs", ".vscode",
+    "bin", "obj", "Debug", "Release", ".git",
+]
+
+# 一条规则：原始文本、来源（文件:行号 或 工具名）、是否为 ! 规则、是否只匹配目录、正则
+IgnoreRule = namedtuple('IgnoreRule', ['pattern', 'source', 'negate', 'dir_only', 'regex'])
+
+# ✨.gitignore 解析
+
+def _translate_glob(pattern: str) -> str:
+    """将 .gitignore 模式（已去掉开头的 / 和结尾的 /）转换为正则"""
+    regex = []
+    i = 0
+    n = len(pattern)
+    while i < n:
+        if pattern.startswith('**/', i) and (i == 0 or pattern[i - 1] == '/'):
+            regex.append(r'(?:.*/)?')
+            i += 3
+        elif pattern.startswith('**', i) and i + 2 == n and (i == 0 or pattern[i - 1] == '/'):
+            regex.append(r'.+')
+            i += 2
+        elif pattern[i] == '*':
+            regex.append(r'[^/]*')
+            i += 1
+        elif pattern[i] == '?':
+            regex.append(r'[^/]')
+            i += 1
+        elif pattern[i] == '[':
+            end = pattern.find(']', i + 2)
+            if end == -1:
+                regex.append(re.escape('['))
+                i += 1
+                continue
+            body = pattern[i + 1:end]
+            if body[0] in '!^':
+                body = '^' + body[1:]
+            regex.append('[' + body.replace('\\', '\\\\').replace('/', '') + ']')
+            i = end + 1
+        elif pattern[i] == '\\' and i + 1 < n:
+            regex.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            regex.append(re.escape(pattern[i]))
+            i += 1
+    return ''.join(regex)
+
+def parse_rule(line: str, base: str = '', source: str = ''):
+    """
+    解析一行 .gitignore 规则，base 为 .gitignore 所在目录相对匹配根目录的路径（/ 分隔，根目录为空）
+    空行和注释返回 None
+    """
+    line = line.rstrip('\n').rstrip('\r')
+    # 去掉结尾未转义的空格
+    while line.endswith(' ') and not line.endswith('\\ '):
+        line = line[:-1]
+    if not line or line.startswith('#'):
+        return None
+    pattern = line
+    negate = pattern.startswith('!')
+    if negate:
+        pattern = pattern[1:]
+    elif pattern.startswith('\\!') or pattern.startswith('\\#'):
+        pattern = pattern[1:]
+    dir_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    if not pattern:
+        return None
+    # 开头或中间含 / 的规则相对 .gitignore 所在目录，否则匹配任意层级的名称
+    anchored = '/' in pattern
+    regex = _translate_glob(pattern.lstrip('/'))
+    if not anchored:
+        regex = r'(?:.*/)?' + regex
+    if base:
+        regex = re.escape(base + '/') + regex
+    return IgnoreRule(line, source, negate, dir_only, regex)
+
+def read_gitignore(path: str, base: str = '') -> list:
+    try:
+        with open(path, 'r', encoding='utf-8', errors='ignore') as f:
+            lines = f.readlines()
+    except OSError:
+        return []
+    rules = []
+    for number, line in enumerate(lines, 1):
+        rule = parse_rule(line, base, f"{path}:{number}")
+        if rule:
+            rules.append(rule)
+    return rules
+
+def find_repo_root(path: str):
+    """向上查找包含 .git 的目录，找不到时返回 None"""
+    path = os.path.abspath(path)
+    while True:
+        if os.path.exists(os.path.join(path, '.git')):
+            return path
+        parent = os.path.dirname(path)
+        if parent == path:
+            return None
+        path = parent
+
+# ✨编译后的匹配器
+
+class PathMatcher:
+    """
+    编译后的排除规则
+    - 规则按优先级从低到高排列，编译时倒序组成一个分支正则，第一个匹配的分支即最后生效的规则
+    - 匹配的是相对 root_dir 的路径（/ 分隔），prefix 为 root_dir 相对最上层 .gitignore 所在目录的路径
+    """
+
+    def __init__(self, rules, prefix: str = '', ignore_case: bool = None):
+        self.rules = list(rules)
+        self.prefix = prefix + '/' if prefix else ''
+        if ignore_case is None:
+            ignore_case = os.name == 'nt'
+        flags = re.IGNORECASE if ignore_case else 0
+        self._dir_regex = self._compile(range(len(self.rules)), flags)
+        self._file_regex = self._compile([i for i, r in enumerate(self.rules) if not r.dir_only], flags)
+
+    def _compile(self, indexes, flags):
+        branches = [f"(?P<r{i}>{self.rules[i].regex})" for i in reversed(list(indexes))]
+        return re.compile('|'.join(branches), flags) if branches else None
+
+    def match(self, rel_path: str, is_dir: bool = False):
+        """返回对该路径最后生效的规则，没有规则匹配时返回 None"""
+        regex = self._dir_regex if is_dir else self._file_regex
+        if regex is None:
+            return None
+        m = regex.fullmatch(self.prefix + rel_path)
+        return self.rules[int(m.lastgroup[1:])] if m else None
+
+    def is_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        rule = self.match(rel_path, is_dir)
+        return rule is not None and not rule.negate
+
+    def is_path_ignored(self, rel_path: str, is_dir: bool = False) -> bool:
+        """不经过遍历直接判断路径（如清单中的文件）：任一上级目录被排除时也视为排除"""
+        parent = ''
+        for part in rel_path.split('/')[:-1]:
+            parent = f"{parent}/{part}" if parent else part
+            if self.is_ignored(parent, True):
+                return True
+        return self.is_ignored(rel_path, is_dir)
+
+def compile_rules(patterns, source: str = 'default', ignore_case: bool = None) -> PathMatcher:
+    """只由工具规则组成的匹配器（规则相对匹配根目录）"""
+    rules = [parse_rule(p, '', source) for p in patterns]
+    return PathMatcher([r for r in rules if r], ignore_case=ignore_case)
+
+def load_project_matcher(root_dir: str, patterns=SOURCE_IGNORE_RULES, use_gitignore: bool = True,
+                         ignore_case: bool = None) -> PathMatcher:
+    """
+    组合工具规则和仓库中的 .gitignore，返回匹配 root_dir 下相对路径的匹配器
+    - 工具规则优先级最低（相当于 git 的全局排除文件），.gitignore 可以用 ! 规则覆盖
+    - 读取从仓库根目录到 root_dir 每一级目录中的 .gitignore，越深的优先级越高
+    - root_dir 之下子目录中的 .gitignore 不读取
+    """
+    root_dir = os.path.abspath(root_dir)
+    repo_root = find_repo_root(root_dir) if use_gitignore else None
+    top = repo_root or root_dir
+    prefix = os.path.relpath(root_dir, top).replace(os.sep, '/')
+    prefix = '' if prefix == '.' else prefix
+
+    rules = [r for r in (parse_rule(p, prefix, 'default') for p in patterns) if r]
+    if repo_root:
+        directory = top
+        rules += read_gitignore(os.path.join(directory, '.gitignore'))
+        for part in prefix.split('/') if prefix else []:
+            directory = os.path.join(directory, part)
+            base = os.path.relpath(directory, top).replace(os.sep, '/')
+            rules += read_gitignore(os.path.join(directory, '.gitignore'), base)
+    return PathMatcher(rules, prefix, ignore_case)
+
+# ✨命令行：查看路径被哪条规则排除
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="查看路径是否被排除，以及生效的规则")
+    parser.add_argument('root', help="匹配根目录（打包脚本的项目目录或扫描目录）")
+    parser.add_argument('paths', nargs='+', help="相对根目录的路径，目录以 / 结尾")
+    parser.add_argument('--no-gitignore', action='store_true', help="不读取 .gitignore")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    matcher = load_project_matcher(args.root, use_gitignore=not args.no_gitignore)
+    for path in args.paths:
+        is_dir = path.endswith('/') or os.path.isdir(os.path.join(args.root, path))
+        rel_path = path.replace(os.sep, '/').strip('/')
+        rule = matcher.match(rel_path, is_dir)
+        if rule is None:
+            print(f"包含  {path}")
+        else:
+            print(f"{'包含' if rule.negate else '排除'}  {path}  ← {rule.pattern} ({rule.source})")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -6,8 +6,50 @@
 """
 
 import os
+import sys
+import gzip
+import json
+import stat as stat_module
+import shutil
+import time
+import heapq
+import argparse
 import datetime
+import tempfile
+from array import array
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from _script_loader import load_script
+
+try:
+    import numpy as np
+except ImportError:  # 未安装时列式存储的汇总逐条累加
+    np = None
+
+path_matcher = load_script("#path_matcher.py", "path_matcher")
+
+# 未指定排除规则时只跳过常见的临时文件和缓存目录（规则见 #path_matcher.py 的 SCAN_SKIP_RULES）
+_default_ignore = None
+
+def get_default_ignore():
+    global _default_ignore
+    if _default_ignore is None:
+        _default_ignore = path_matcher.compile_rules(path_matcher.SCAN_SKIP_RULES)
+    return _default_ignore
+
+def load_cli_ignore(root_path, source_rules=False, use_gitignore=True):
+    """
+    命令行使用的排除规则
+    - 默认只跳过 SCAN_SKIP_RULES 中的名称，部署目录中的 .dll、Logs/ 等文件照常列出和对比
+    - source_rules 为 True 时使用与 #packager.py 相同的源码规则，并读取仓库中的 .gitignore（use_gitignore 为 False 时不读取）
+    """
+    if not source_rules:
+        return get_default_ignore()
+    return path_matcher.load_project_matcher(root_path, use_gitignore=use_gitignore)
+
+def is_skipped(name, rel_path, is_dir, ignore):
+    """隐藏文件和命中排除规则的条目不扫描"""
+    return name.startswith('.') or ignore.is_ignored(rel_path, is_dir)
 
 def format_size(size_bytes):
     """格式化文件大小显示"""
@@ -29,6 +71,7 @@ def get_file_info(file_path):
         return {
             'size': stat.st_size,
             'modified': datetime.datetime.fromtimestamp(stat.st_mtime),
+            'mtime_ns': stat.st_mtime_ns,
             'is_dir': file_path.is_dir(),
             'is_file': file_path.is_file()
         }
@@ -41,26 +84,20 @@ def get_file_info(file_path):
             'error': True
         }
 
-def scan_directory(root_path, max_depth=10, current_depth=0):
-    """递归扫描目录结构"""
+def scan_directory(root_path, max_depth=10, current_depth=0, ignore=None, rel_dir=''):
+    """递归扫描目录结构，ignore 为 #path_matcher.py 的 PathMatcher，rel_dir 为 root_path 相对扫描根目录的路径"""
     items = []
     
     if current_depth >= max_depth:
         return items
+    ignore = ignore or get_default_ignore()
     
     try:
         root = Path(root_path)
         for item in sorted(root.iterdir(), key=lambda x: (x.is_file(), x.name.lower())):
-            # 跳过隐藏文件和系统文件
-            if item.name.startswith('.'):
-                continue
-                
-            # 跳过常见的临时文件和缓存目录
-            skip_patterns = {
-                '__pycache__', 'node_modules', '.vs', '.vscode', 
-                'bin', 'obj', 'Debug', 'Release', '.git'
-            }
-            if item.name in skip_patterns:
+            # 跳过隐藏文件、临时文件和缓存目录
+            rel_path = f"{rel_dir}/{item.name}" if rel_dir else item.name
+            if is_skipped(item.name, rel_path, item.is_dir(), ignore):
                 continue
             
             info = get_file_info(item)
@@ -77,7 +114,7 @@ def scan_directory(root_path, max_depth=10, current_depth=0):
             
             # 如果是目录，递归扫描
             if info['is_dir'] and not info.get('error'):
-                sub_items = scan_directory(item, max_depth, current_depth + 1)
+                sub_items = scan_directory(item, max_depth, current_depth + 1, ignore, rel_path)
                 items.extend(sub_items)
                 
     except PermissionError:
@@ -87,13 +124,114 @@ def scan_directory(root_path, max_depth=10, current_depth=0):
     
     return items
 
-def print_tree_structure(items, show_details=True):
-    """打印树状结构"""
-    print("=" * 80)
-    print("文件夹结构扫描结果")
-    print("=" * 80)
-    
-    for item in items:
+def get_entry_info(entry):
+    """从 os.DirEntry 获取文件信息（复用 scandir 缓存的类型和 stat 数据）"""
+    try:
+        stat = entry.stat()
+        return {
+            'size': stat.st_size,
+            'modified': datetime.datetime.fromtimestamp(stat.st_mtime),
+            'mtime_ns': stat.st_mtime_ns,
+            'is_dir': entry.is_dir(),
+            'is_file': entry.is_file()
+        }
+    except (OSError, PermissionError):
+        return {
+            'size': 0,
+            'modified': None,
+            'is_dir': False,
+            'is_file': False,
+            'error': True
+        }
+
+def list_directory(dir_path, ignore=None, rel_dir=''):
+    """列出单个目录（可在线程池中执行），返回 (按 scan_directory 顺序排列的 [(DirEntry, info)], 错误信息)"""
+    ignore = ignore or get_default_ignore()
+    prefix = rel_dir + '/' if rel_dir else ''
+
+    def is_dir(entry):
+        try:
+            return entry.is_dir()
+        except OSError:
+            return False
+
+    try:
+        with os.scandir(dir_path) as it:
+            entries = [e for e in it if not is_skipped(e.name, prefix + e.name, is_dir(e), ignore)]
+    except PermissionError:
+        return [], f"权限错误: 无法访问 {dir_path}"
+    except Exception as e:
+        return [], f"扫描错误: {e}"
+
+    def is_file(entry):
+        try:
+            return entry.is_file()
+        except OSError:
+            return False
+
+    entries.sort(key=lambda e: (is_file(e), e.name.lower()))
+    return [(entry, get_entry_info(entry)) for entry in entries], None
+
+def iter_scan_directory(root_path, max_depth=10, workers=8, enter_dir=None, ignore=None):
+    """
+    基于 os.scandir 的并行目录扫描生成器，按 scan_directory 的顺序逐个产出条目
+    - 复用 DirEntry 缓存的类型信息，每个条目最多一次 stat
+    - 每个目录的子目录在进入前就提交到有界线程池预取，同级目录并行读取
+    - 条目边扫描边产出，不在内存中保留完整列表
+    - enter_dir(full_path) 返回 False 的目录只产出自身，不再进入
+    - ignore 为 #path_matcher.py 的 PathMatcher，未指定时只跳过 SCAN_SKIP_RULES 中的名称
+    """
+    if max_depth <= 0:
+        return
+
+    root_path = str(Path(root_path))
+    with ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+
+        def walk(listing, depth, rel_dir):
+            entries, error = listing.result()
+            if error:
+                print(error)
+                return
+
+            # 先提交所有子目录，再按顺序深度优先输出
+            children = {}
+            if depth + 1 < max_depth:
+                for entry, info in entries:
+                    if info['is_dir'] and not info.get('error') and (enter_dir is None or enter_dir(entry.path)):
+                        children[entry.name] = pool.submit(list_directory, entry.path, ignore,
+                                                           f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+
+            for entry, info in entries:
+                yield {
+                    'name': entry.name,
+                    'path': entry.name,
+                    'full_path': entry.path,
+                    'depth': depth,
+                    'info': info
+                }
+                if entry.name in children:
+                    yield from walk(children[entry.name], depth + 1,
+                                    f"{rel_dir}/{entry.name}" if rel_dir else entry.name)
+
+        yield from walk(pool.submit(list_directory, root_path, ignore), 0, '')
+
+def scan_directory_parallel(root_path, max_depth=10, workers=8, ignore=None):
+    """并行扫描目录，返回与 scan_directory 完全一致的条目列表"""
+    return list(iter_scan_directory(root_path, max_depth, workers, ignore=ignore))
+
+# ✨输出渲染器：一次遍历同时驱动多个输出，每个渲染器实现 add(item) 和 finish()
+
+class TreeRenderer:
+    """树状结构，边扫描边打印"""
+
+    def __init__(self, show_details=True, out=None):
+        self.show_details = show_details
+        self.out = out or sys.stdout
+        self.out.write("=" * 80 + "\n")
+        self.out.write("文件夹结构扫描结果\n")
+        self.out.write("=" * 80 + "\n")
+
+    def add(self, item):
         # 计算缩进
         indent = "  " * item['depth']
         
@@ -103,61 +241,540 @@ def print_tree_structure(items, show_details=True):
             size_info = ""
         else:
             icon = "📄"
-            size_info = f" ({format_size(item['info']['size'])})" if show_details else ""
+            size_info = f" ({format_size(item['info']['size'])})" if self.show_details else ""
         
         # 修改时间
         time_info = ""
-        if show_details and item['info']['modified']:
+        if self.show_details and item['info']['modified']:
             time_info = f" - {item['info']['modified'].strftime('%Y-%m-%d %H:%M')}"
         
         # 打印项目
         if item['info'].get('error'):
-            print(f"{indent}❌ {item['name']} [访问错误]")
+            self.out.write(f"{indent}❌ {item['name']} [访问错误]\n")
         else:
-            print(f"{indent}{icon} {item['name']}{size_info}{time_info}")
+            self.out.write(f"{indent}{icon} {item['name']}{size_info}{time_info}\n")
+
+    def finish(self):
+        pass
+
+class SummaryRenderer:
+    """统计摘要，计数在遍历过程中累加"""
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.total_files = 0
+        self.total_dirs = 0
+        self.total_size = 0
+
+    def add(self, item):
+        if item['info']['is_file']:
+            self.total_files += 1
+            self.total_size += item['info']['size']
+        if item['info']['is_dir']:
+            self.total_dirs += 1
+
+    def finish(self):
+        self.out.write("\n" + "=" * 80 + "\n")
+        self.out.write("扫描统计摘要\n")
+        self.out.write("=" * 80 + "\n")
+        self.out.write(f"总文件数: {self.total_files}\n")
+        self.out.write(f"总文件夹数: {self.total_dirs}\n")
+        self.out.write(f"总大小: {format_size(self.total_size)}\n")
+
+class CopyFriendlyRenderer:
+    """
+    复制友好格式的项目结构
+    该部分显示在摘要之后，遍历期间先写入临时文件（超过 1 MB 才落盘），结束时再输出
+    """
+
+    def __init__(self, out=None):
+        self.out = out or sys.stdout
+        self.spool = tempfile.SpooledTemporaryFile(max_size=1024 * 1024, mode='w+', encoding='utf-8')
+
+    def add(self, item):
+        indent = "  " * item['depth']
+        prefix = "├── " if item['depth'] > 0 else ""
+        
+        if item['info']['is_dir']:
+            self.spool.write(f"{indent}{prefix}{item['name']}/\n")
+        else:
+            size_info = f" ({format_size(item['info']['size'])})"
+            self.spool.write(f"{indent}{prefix}{item['name']}{size_info}\n")
+
+    def finish(self):
+        self.out.write("\n" + "=" * 80 + "\n")
+        self.out.write("项目结构 (复制友好格式)\n")
+        self.out.write("=" * 80 + "\n")
+        self.spool.seek(0)
+        shutil.copyfileobj(self.spool, self.out)
+        self.spool.close()
+
+def item_to_record(item, root_path):
+    """转换为可 JSON 序列化的记录（path 为相对扫描根目录的路径）"""
+    info = item['info']
+    return {
+        'path': os.path.relpath(item['full_path'], root_path).replace(os.sep, '/'),
+        'name': item['name'],
+        'depth': item['depth'],
+        'type': 'error' if info.get('error') else 'dir' if info['is_dir'] else 'file',
+        'size': info['size'],
+        'modified': info['modified'].isoformat(timespec='seconds') if info['modified'] else None,
+    }
+
+class NdjsonRenderer:
+    """每个条目一行 JSON（NDJSON）"""
+
+    def __init__(self, output_path, root_path):
+        self.root_path = str(root_path)
+        self.file = open(output_path, 'w', encoding='utf-8')
+
+    def add(self, item):
+        self.file.write(json.dumps(item_to_record(item, self.root_path), ensure_ascii=False) + "\n")
+
+    def finish(self):
+        self.file.close()
+
+class JsonRenderer:
+    """JSON 数组，逐条写出，不在内存中构建完整列表"""
+
+    def __init__(self, output_path, root_path):
+        self.root_path = str(root_path)
+        self.file = open(output_path, 'w', encoding='utf-8')
+        self.file.write("[")
+        self.count = 0
+
+    def add(self, item):
+        self.file.write(",\n  " if self.count else "\n  ")
+        self.file.write(json.dumps(item_to_record(item, self.root_path), ensure_ascii=False))
+        self.count += 1
+
+    def finish(self):
+        self.file.write("\n]\n" if self.count else "]\n")
+        self.file.close()
+
+# ✨列式扫描结果：每个条目只占各列中的一个定长元素，不再保留 dict / datetime / 路径字符串
+# 列：大小、修改时间(ns)、深度、类型（STORE_TYPES 中的序号）、名称序号、父目录序号（顶层为 -1）、扩展名序号（非文件为 -1）
+# 名称和扩展名各只保存一份，完整路径按父目录序号逐级拼接
+# 安装 numpy 时目录汇总和扩展名汇总按列批量计算，否则逐条累加
+STORE_TYPES = 'fdoe'  # 文件 / 目录 / 其他 / 访问错误，与快照条目的类型一致
+STORE_FILE = STORE_TYPES.index('f')
+STORE_DIR = STORE_TYPES.index('d')
+NO_EXTENSION = '(无扩展名)'
+
+class ScanStore:
+    """
+    列式扫描结果存储，可作为渲染器直接接收 iter_scan_directory 产出的条目
+    finish() 一次计算每个目录包含的文件总大小和文件数，之后可查询按目录 / 扩展名的汇总和最大的 N 个文件、目录
+    """
+
+    def __init__(self):
+        self.sizes = array('q')
+        self.mtimes = array('q')
+        self.depths = array('H')
+        self.types = array('B')
+        self.name_ids = array('i')
+        self.parents = array('i')
+        self.ext_ids = array('i')
+        self.names = []
+        self.extensions = []
+        self._name_index = {}
+        self._ext_index = {}
+        self._dir_stack = []  # 每一层最近一个目录的序号，用于确定后续条目的父目录
+        self.totals = None  # finish() 后：文件为自身大小，目录为其下所有文件的总大小
+        self.file_counts = None  # finish() 后：目录下的文件总数（文件为 1）
+
+    def __len__(self):
+        return len(self.sizes)
+
+    @staticmethod
+    def _intern(value, table, index):
+        ident = index.get(value)
+        if ident is None:
+            ident = index[value] = len(table)
+            table.append(value)
+        return ident
+
+    def add(self, item):
+        info = item['info']
+        depth = item['depth']
+        kind = STORE_TYPES.index(info_to_type(info))
+        del self._dir_stack[depth:]
+        position = len(self.sizes)
+
+        self.sizes.append(info['size'])
+        self.mtimes.append(info.get('mtime_ns', 0))
+        self.depths.append(depth)
+        self.types.append(kind)
+        self.name_ids.append(self._intern(item['name'], self.names, self._name_index))
+        self.parents.append(self._dir_stack[depth - 1] if depth else -1)
+        if kind == STORE_FILE:
+            ext = os.path.splitext(item['name'])[1].lower() or NO_EXTENSION
+            self.ext_ids.append(self._intern(ext, self.extensions, self._ext_index))
+        else:
+            self.ext_ids.append(-1)
+        if kind == STORE_DIR:
+            self._dir_stack.append(position)
+
+    def finish(self):
+        """条目按深度优先顺序排列，子条目总在父目录之后，倒序累加一遍即可得到每个目录的汇总"""
+        if np is not None and len(self):
+            sizes = np.frombuffer(self.sizes, dtype=self.sizes.typecode)
+            is_file = np.frombuffer(self.types, dtype=self.types.typecode) == STORE_FILE
+            parents = np.frombuffer(self.parents, dtype=self.parents.typecode)
+            depths = np.frombuffer(self.depths, dtype=self.depths.typecode)
+            totals = np.where(is_file, sizes, 0).astype(np.int64)
+            counts = is_file.astype(np.int64)
+            # 从最深一层开始，每层一次性累加到父目录
+            for depth in range(int(depths.max()), 0, -1):
+                level = depths == depth
+                np.add.at(totals, parents[level], totals[level])
+                np.add.at(counts, parents[level], counts[level])
+            self.totals = array('q', totals.tobytes())
+            self.file_counts = array('q', counts.tobytes())
+            return
+
+        self.totals = array('q', (size if kind == STORE_FILE else 0 for size, kind in zip(self.sizes, self.types)))
+        self.file_counts = array('q', (kind == STORE_FILE for kind in self.types))
+        for position in range(len(self) - 1, -1, -1):
+            parent = self.parents[position]
+            if parent >= 0:
+                self.totals[parent] += self.totals[position]
+                self.file_counts[parent] += self.file_counts[position]
+
+    def path(self, position):
+        """条目相对扫描根目录的路径"""
+        parts = []
+        while position >= 0:
+            parts.append(self.names[self.name_ids[position]])
+            position = self.parents[position]
+        return '/'.join(reversed(parts))
+
+    def nbytes(self):
+        """各列占用的字节数（不含去重后的名称表）"""
+        return sum(column.itemsize * len(column) for column in (
+            self.sizes, self.mtimes, self.depths, self.types, self.name_ids, self.parents, self.ext_ids))
+
+    def _positions(self, kind):
+        return (position for position, value in enumerate(self.types) if value == kind)
+
+    def directory_rollups(self, max_depth=1):
+        """深度小于 max_depth 的目录的 [(路径, 文件数, 总大小)]，按总大小降序"""
+        rows = [(self.path(p), self.file_counts[p], self.totals[p])
+                for p in self._positions(STORE_DIR) if self.depths[p] < max_depth]
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def extension_rollups(self):
+        """按扩展名汇总的 [(扩展名, 文件数, 总大小)]，按总大小降序"""
+        if np is not None and len(self):
+            ext_ids = np.frombuffer(self.ext_ids, dtype=self.ext_ids.typecode)
+            files = ext_ids >= 0
+            sizes = np.frombuffer(self.sizes, dtype=self.sizes.typecode)[files]
+            counts = np.bincount(ext_ids[files], minlength=len(self.extensions))
+            totals = np.bincount(ext_ids[files], weights=sizes, minlength=len(self.extensions))
+            rows = [(ext, int(counts[i]), int(totals[i])) for i, ext in enumerate(self.extensions)]
+        else:
+            counts = [0] * len(self.extensions)
+            totals = [0] * len(self.extensions)
+            for ext_id, size in zip(self.ext_ids, self.sizes):
+                if ext_id >= 0:
+                    counts[ext_id] += 1
+                    totals[ext_id] += size
+            rows = list(zip(self.extensions, counts, totals))
+        return sorted(rows, key=lambda row: row[2], reverse=True)
+
+    def top_files(self, n=10):
+        """最大的 n 个文件 [(路径, 大小)]，用大小为 n 的堆一遍选出"""
+        largest = heapq.nlargest(n, self._positions(STORE_FILE), key=self.sizes.__getitem__)
+        return [(self.path(p), self.sizes[p]) for p in largest]
+
+    def top_dirs(self, n=10):
+        """包含文件总大小最大的 n 个目录 [(路径, 总大小)]"""
+        largest = heapq.nlargest(n, self._positions(STORE_DIR), key=self.totals.__getitem__)
+        return [(self.path(p), self.totals[p]) for p in largest]
+
+    def print_report(self, top=10, out=None):
+        out = out or sys.stdout
+        out.write("\n" + "=" * 80 + "\n")
+        out.write("大小汇总\n")
+        out.write("=" * 80 + "\n")
+        out.write(f"列式存储: {len(self)} 个条目，{format_size(self.nbytes())}，"
+                  f"{len(self.names)} 个不同名称\n")
+
+        out.write("\n按顶层目录:\n")
+        for path, files, size in self.directory_rollups()[:top]:
+            out.write(f"  {format_size(size):>10}  {files:>6} 个文件  {path}/\n")
+        out.write("\n按扩展名:\n")
+        for ext, files, size in self.extension_rollups()[:top]:
+            out.write(f"  {format_size(size):>10}  {files:>6} 个文件  {ext}\n")
+        out.write(f"\n最大的 {top} 个文件:\n")
+        for path, size in self.top_files(top):
+            out.write(f"  {format_size(size):>10}  {path}\n")
+        out.write(f"\n最大的 {top} 个目录:\n")
+        for path, size in self.top_dirs(top):
+            out.write(f"  {format_size(size):>10}  {path}/\n")
+
+def scan_to_store(root_path, max_depth=10, workers=8, ignore=None):
+    """扫描目录并直接写入 ScanStore（不保留条目列表）"""
+    store = ScanStore()
+    render_scan(iter_scan_directory(root_path, max_depth, workers, ignore=ignore), [store])
+    return store
+
+# ✨扫描快照与差异对比
+# 快照条目格式: [相对路径, 类型(d 目录 / f 文件 / o 其他 / e 访问错误), 大小, 修改时间(ns)]
+SNAPSHOT_VERSION = 1
+DEFAULT_SNAPSHOT = ".scan_snapshot.json"
+# 修改时间距快照生成不足该时长的目录不可信（同一时间粒度内可能再次被修改）
+RACY_WINDOW_NS = 2 * 10 ** 9
+
+def info_to_type(info):
+    if info.get('error'):
+        return 'e'
+    if info['is_dir']:
+        return 'd'
+    return 'f' if info['is_file'] else 'o'
+
+def stat_to_type(st):
+    if stat_module.S_ISDIR(st.st_mode):
+        return 'd'
+    return 'f' if stat_module.S_ISREG(st.st_mode) else 'o'
+
+def save_snapshot(snapshot_path, root_path, max_depth, entries):
+    """保存快照（紧凑 JSON，文件名以 .gz 结尾时 gzip 压缩）"""
+    root_path = str(root_path)
+    data = {
+        'version': SNAPSHOT_VERSION,
+        'root': root_path,
+        'root_mtime_ns': os.stat(root_path).st_mtime_ns,
+        'created_ns': time.time_ns(),
+        'max_depth': max_depth,
+        'entries': entries,
+    }
+    opener = gzip.open if snapshot_path.endswith('.gz') else open
+    with opener(snapshot_path, 'wt', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+def load_snapshot(snapshot_path):
+    """读取快照，不存在或版本不符时返回 None"""
+    opener = gzip.open if snapshot_path.endswith('.gz') else open
+    try:
+        with opener(snapshot_path, 'rt', encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return data if data.get('version') == SNAPSHOT_VERSION else None
+
+class SnapshotRenderer:
+    """正常扫描时同时生成快照"""
+
+    def __init__(self, snapshot_path, root_path, max_depth):
+        self.snapshot_path = snapshot_path
+        self.root_path = str(root_path)
+        self.max_depth = max_depth
+        self.entries = []
+
+    def add(self, item):
+        info = item['info']
+        rel_path = os.path.relpath(item['full_path'], self.root_path).replace(os.sep, '/')
+        self.entries.append([rel_path, info_to_type(info), info['size'], info.get('mtime_ns', 0)])
+
+    def finish(self):
+        save_snapshot(self.snapshot_path, self.root_path, self.max_depth, self.entries)
+
+def scan_against_snapshot(root_path, snapshot, max_depth=10, trust_dir_mtime=False, ignore=None):
+    """
+    参照上一次快照扫描目录，返回 (新快照条目, 扫描统计)
+    - 目录修改时间未变：目录内没有增删条目，沿用快照中的文件名列表，只 stat 这些条目，不重新读取目录
+    - trust_dir_mtime=True：目录修改时间未变时整个子树直接沿用快照，耗时只与变化量有关；
+      但原地覆盖写入的文件（如 scp 覆盖）不会改变目录修改时间，这类修改会被漏掉
+    """
+    root_path = str(Path(root_path))
+    previous = {entry[0]: entry for entry in snapshot['entries']}
+    previous_children = {}
+    for entry in snapshot['entries']:
+        previous_children.setdefault(entry[0].rpartition('/')[0], []).append(entry[0])
+    previous[''] = ['', 'd', 0, snapshot.get('root_mtime_ns')]
+    trusted_before = snapshot['created_ns'] - RACY_WINDOW_NS
+    stats = {'listed': 0, 'reused': 0, 'skipped': 0}
+    entries = []
+
+    def copy_subtree(rel_dir):
+        for child in previous_children.get(rel_dir, []):
+            entries.append(previous[child])
+            if previous[child][1] == 'd':
+                copy_subtree(child)
+
+    def read_children(rel_dir, abs_dir, dir_mtime):
+        """返回 [(名称, 条目)]；目录未变化时沿用快照中的名称列表"""
+        prev = previous.get(rel_dir)
+        if prev and prev[1] == 'd' and prev[3] == dir_mtime and dir_mtime < trusted_before:
+            children = []
+            for child in previous_children.get(rel_dir, []):
+                name = child.rpartition('/')[2]
+                try:
+                    st = os.stat(os.path.join(abs_dir, name))
+                    children.append((name, [child, stat_to_type(st), st.st_size, st.st_mtime_ns]))
+                except FileNotFoundError:
+                    break  # 快照已过期，重新读取目录
+                except OSError:
+                    children.append((name, [child, 'e', 0, 0]))
+            else:
+                stats['reused'] += 1
+                return children
+
+        stats['listed'] += 1
+        listing, error = list_directory(abs_dir, ignore, rel_dir)
+        if error:
+            print(error)
+        prefix = rel_dir + '/' if rel_dir else ''
+        return [(entry.name, [prefix + entry.name, info_to_type(info), info['size'], info.get('mtime_ns', 0)])
+                for entry, info in listing]
+
+    def visit(rel_dir, abs_dir, dir_mtime, depth):
+        prev = previous.get(rel_dir)
+        if (trust_dir_mtime and rel_dir and prev and prev[1] == 'd'
+                and prev[3] == dir_mtime and dir_mtime < trusted_before):
+            stats['skipped'] += 1
+            copy_subtree(rel_dir)
+            return
+        for name, entry in read_children(rel_dir, abs_dir, dir_mtime):
+            entries.append(entry)
+            if entry[1] == 'd' and depth + 1 < max_depth:
+                visit(entry[0], os.path.join(abs_dir, name), entry[3], depth + 1)
+
+    if max_depth > 0:
+        visit('', root_path, os.stat(root_path).st_mtime_ns, 0)
+    return entries, stats
+
+def diff_snapshot_entries(old_entries, new_entries):
+    """对比两份快照条目，返回 {'added', 'removed', 'modified', 'resized'}（目录只报告增删）"""
+    old = {entry[0]: entry for entry in old_entries}
+    new = {entry[0]: entry for entry in new_entries}
+    changes = {'added': [], 'removed': [], 'modified': [], 'resized': []}
+    for path, entry in new.items():
+        before = old.get(path)
+        if before is None or before[1] != entry[1]:
+            changes['added'].append(entry)
+        elif entry[1] != 'd':
+            if before[2] != entry[2]:
+                changes['resized'].append((before, entry))
+            elif before[3] != entry[3]:
+                changes['modified'].append(entry)
+    for path, entry in old.items():
+        after = new.get(path)
+        if after is None or after[1] != entry[1]:
+            changes['removed'].append(entry)
+    return changes
+
+def print_snapshot_diff(changes, stats=None):
+    """打印差异对比结果"""
+    print("=" * 80)
+    print("与上次快照的差异")
+    print("=" * 80)
+    for entry in changes['added']:
+        suffix = "/" if entry[1] == 'd' else f" ({format_size(entry[2])})"
+        print(f"+ {entry[0]}{suffix}")
+    for entry in changes['removed']:
+        suffix = "/" if entry[1] == 'd' else f" ({format_size(entry[2])})"
+        print(f"- {entry[0]}{suffix}")
+    for before, after in changes['resized']:
+        print(f"± {after[0]} ({format_size(before[2])} -> {format_size(after[2])})")
+    for entry in changes['modified']:
+        print(f"~ {entry[0]} ({datetime.datetime.fromtimestamp(entry[3] / 10 ** 9).strftime('%Y-%m-%d %H:%M:%S')})")
 
-def print_summary(items):
-    """打印统计摘要"""
-    total_files = sum(1 for item in items if item['info']['is_file'])
-    total_dirs = sum(1 for item in items if item['info']['is_dir'])
-    total_size = sum(item['info']['size'] for item in items if item['info']['is_file'])
-    
     print("\n" + "=" * 80)
-    print("扫描统计摘要")
+    print("差异统计")
     print("=" * 80)
-    print(f"总文件数: {total_files}")
-    print(f"总文件夹数: {total_dirs}")
-    print(f"总大小: {format_size(total_size)}")
+    print(f"新增: {len(changes['added'])}  删除: {len(changes['removed'])}  "
+          f"大小变化: {len(changes['resized'])}  仅修改时间变化: {len(changes['modified'])}")
+    if stats:
+        print(f"重新读取目录: {stats['listed']}  沿用快照目录: {stats['reused']}  跳过子树: {stats['skipped']}")
+
+def render_scan(items, renderers):
+    """一次遍历条目，同时送入所有渲染器"""
+    for item in items:
+        for renderer in renderers:
+            renderer.add(item)
+    for renderer in renderers:
+        renderer.finish()
+
+def print_tree_structure(items, show_details=True):
+    """打印树状结构"""
+    render_scan(items, [TreeRenderer(show_details)])
+
+def print_summary(items):
+    """打印统计摘要"""
+    render_scan(items, [SummaryRenderer()])
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description="文件夹结构遍历脚本")
+    parser.add_argument('--max-depth', type=int, default=8, help="最大扫描深度（默认 8）")
+    parser.add_argument('--workers', type=int, default=8, help="并行读取目录的线程数（默认 8）")
+    parser.add_argument('--ndjson', help="同时将扫描结果写入 NDJSON 文件")
+    parser.add_argument('--json', help="同时将扫描结果写入 JSON 文件")
+    parser.add_argument('--snapshot', default=DEFAULT_SNAPSHOT,
+                        help=f"快照文件路径（默认 {DEFAULT_SNAPSHOT}，以 .gz 结尾时压缩保存）")
+    parser.add_argument('--save-snapshot', action='store_true', help="扫描时同时保存快照")
+    parser.add_argument('--diff', action='store_true', help="只对比与上次快照的差异，并更新快照")
+    parser.add_argument('--no-update', action='store_true', help="--diff 模式下不更新快照")
+    parser.add_argument('--source-rules', action='store_true',
+                        help="使用与打包脚本相同的源码排除规则（*.dll、Logs/ 等）和仓库中的 .gitignore，"
+                             "默认只跳过 bin、obj、.git 等常见目录")
+    parser.add_argument('--no-gitignore', action='store_true',
+                        help="配合 --source-rules 使用：不读取仓库中的 .gitignore")
+    parser.add_argument('--trust-dir-mtime', action='store_true',
+                        help="--diff 模式下目录修改时间未变时跳过整个子树（更快，但会漏掉原地覆盖的文件）")
+    parser.add_argument('--top', type=int, default=0, metavar='N',
+                        help="额外输出按目录 / 扩展名的大小汇总和最大的 N 个文件、目录（默认不输出）")
+    return parser.parse_args()
+
+def run_diff(current_dir, args, ignore):
+    """差异对比模式"""
+    snapshot = load_snapshot(args.snapshot)
+    if snapshot is None:
+        print(f"未找到快照: {args.snapshot}，本次生成初始快照")
+        snapshot = {'entries': [], 'created_ns': 0, 'root_mtime_ns': None}
+    elif snapshot['root'] != str(current_dir):
+        print(f"⚠️  快照来自其他目录: {snapshot['root']}")
+
+    entries, stats = scan_against_snapshot(current_dir, snapshot, max_depth=args.max_depth,
+                                           trust_dir_mtime=args.trust_dir_mtime, ignore=ignore)
+    print_snapshot_diff(diff_snapshot_entries(snapshot['entries'], entries), stats)
+
+    if not args.no_update:
+        save_snapshot(args.snapshot, current_dir, args.max_depth, entries)
+        print(f"快照已更新: {args.snapshot}")
 
 def main():
     """主函数"""
+    args = parse_args()
     print("开始扫描当前目录...")
     
     # 获取当前工作目录
     current_dir = Path.cwd()
     print(f"扫描路径: {current_dir}")
+    ignore = load_cli_ignore(current_dir, args.source_rules, not args.no_gitignore)
     
-    # 扫描目录
-    items = scan_directory(current_dir, max_depth=8)
+    if args.diff:
+        run_diff(current_dir, args, ignore)
+        return
     
-    # 打印结果
-    print_tree_structure(items, show_details=True)
-    print_summary(items)
+    # 一次遍历同时生成 树状结构 / 统计摘要 / 复制友好格式 / 可选的 NDJSON、JSON、快照
+    renderers = [TreeRenderer(show_details=True), SummaryRenderer(), CopyFriendlyRenderer()]
+    if args.save_snapshot:
+        renderers.append(SnapshotRenderer(args.snapshot, current_dir, args.max_depth))
+    if args.ndjson:
+        renderers.append(NdjsonRenderer(args.ndjson, current_dir))
+    if args.json:
+        renderers.append(JsonRenderer(args.json, current_dir))
+    store = ScanStore() if args.top > 0 else None
+    if store is not None:
+        renderers.append(store)
     
-    # 生成项目结构文本
-    print("\n" + "=" * 80)
-    print("项目结构 (复制友好格式)")
-    print("=" * 80)
-    
-    for item in items:
-        indent = "  " * item['depth']
-        prefix = "├── " if item['depth'] > 0 else ""
-        
-        if item['info']['is_dir']:
-            print(f"{indent}{prefix}{item['name']}/")
-        else:
-            size_info = f" ({format_size(item['info']['size'])})"
-            print(f"{indent}{prefix}{item['name']}{size_info}")
+    render_scan(iter_scan_directory(current_dir, max_depth=args.max_depth, workers=args.workers, ignore=ignore),
+                renderers)
+    if store is not None:
+        store.print_report(args.top)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
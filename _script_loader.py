@@ -0,0 +1,21 @@
+# -*- coding: utf-8 -*-
+"""
+各脚本共用的加载函数：按路径加载同目录下以 # 开头的脚本（文件名无法直接 import）
+脚本直接运行时其所在目录在 sys.path 中，用 from _script_loader import load_script 导入
+"""
+
+import os
+import sys
+import importlib.util
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def load_script(file_name, module_name):
+    """加载 SCRIPT_DIR 下的 file_name 并以 module_name 注册到 sys.modules，已加载时直接返回"""
+    if module_name in sys.modules:
+        return sys.modules[module_name]
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(SCRIPT_DIR, file_name))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    return module
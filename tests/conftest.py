@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""测试共用的 fixture：按路径加载仓库根目录下以 # 开头的脚本"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 与直接运行脚本时一致：仓库根目录在 sys.path 中，各脚本可以导入共用的 _script_loader
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from _script_loader import load_script
+
+@pytest.fixture(scope="session")
+def packager():
+    return load_script("#packager.py", "packager")
+
+@pytest.fixture(scope="session")
+def scan_project():
+    return load_script("#scan_project.py", "scan_project")
+
+@pytest.fixture(scope="session")
+def path_matcher():
+    return load_script("#path_matcher.py", "path_matcher")
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""压缩包与文本输出逐字节一致、损坏检测，以及解压时的路径校验"""
+
+import os
+
+import pytest
+
+from conftest import load_script
+
+FIXTURE_FILES = {
+    'Program.cs': 'var builder = WebApplication.CreateBuilder(args);\nstring password = "hunter2hunter2";\n',
+    'appsettings.json': '{\n  "Jwt": { "Secret": "jwt-signing-secret-0001" },\n  "Name": "rooms"\n}\n',
+    'Services/RoomService.cs': 'namespace Rooms;\npublic class RoomService\n{\n    public int Count { get; set; }\n}\n',
+    'Services/Big.cs': ''.join(f'const string ApiKey{i} = "key-value-{i:05d}";\n' for i in range(200)),
+    'Components/Pages/Home.razor': '<h1>空闲教室</h1>\n@code {\n    private int count;\n}\n',
+    'wwwroot/app.css': 'body { margin: 0; }\n',
+}
+
+def codecs(packager):
+    return ['gzip'] + (['zstd'] if packager.zstandard is not None else [])
+
+@pytest.fixture
+def project(tmp_path):
+    base = tmp_path / "project"
+    for path, content in FIXTURE_FILES.items():
+        target = base / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding='utf-8')
+    return base
+
+def package(packager, base, output, monkeypatch, **options):
+    # 降低流式处理阈值，让 Big.cs 走流式掩码路径
+    monkeypatch.setattr(packager, 'STREAMING_THRESHOLD', 1024)
+    summary = packager.combine_code_files(str(base), str(output), use_cache=False, **options)
+    return summary['output_file']
+
+def test_bundle_matches_text_output(packager, project, tmp_path, monkeypatch, capsys):
+    text_file = package(packager, project, tmp_path / "out.txt", monkeypatch)
+    with open(text_file, 'rb') as f:
+        text = f.read()
+    for codec in codecs(packager):
+        bundle_file = package(packager, project, tmp_path / f"out-{codec}.txt", monkeypatch,
+                              output_format='bundle', codec=codec)
+        with packager.BundleReader(bundle_file) as reader:
+            assert reader.codec == codec
+            assert sorted(reader.entries) == sorted(FIXTURE_FILES)
+            for path in FIXTURE_FILES:
+                content = b''.join(reader.iter_chunks(path))
+                lang = packager.get_file_extension_for_syntax(path)
+                block = f"#### 文件: {path}\n```{lang}\n".encode('utf-8') + content + b"\n\n```\n"
+                assert block in text, path
+            assert b'hunter2hunter2' not in reader.read('Program.cs')
+
+def test_verify_detects_corrupted_frame(packager, project, tmp_path, monkeypatch, capsys):
+    bundle_reader = load_script("#bundle_reader.py", "bundle_reader")
+    for codec in codecs(packager):
+        bundle_file = package(packager, project, tmp_path / f"out-{codec}.txt", monkeypatch,
+                              output_format='bundle', codec=codec)
+        with packager.BundleReader(bundle_file) as reader:
+            assert bundle_reader.verify_bundle(reader)
+            entry = reader.entries['Services/Big.cs']
+        with open(bundle_file, 'r+b') as f:
+            f.seek(entry['offset'] + entry['length'] // 2)
+            byte = f.read(1)
+            f.seek(-1, os.SEEK_CUR)
+            f.write(bytes([byte[0] ^ 0xFF]))
+        with packager.BundleReader(bundle_file) as reader:
+            assert not bundle_reader.verify_bundle(reader)
+            with pytest.raises(ValueError):
+                reader.read('Services/Big.cs')
+            # 其他文件不受影响
+            assert reader.read('Program.cs')
+
+@pytest.mark.parametrize("bad_path", ['../escape.txt', 'a/../../escape.txt', '/tmp/escape.txt', 'C:/escape.txt',
+                                      'a\\..\\..\\escape.txt', ''])
+def test_extract_rejects_paths_outside_output_dir(packager, tmp_path, bad_path, capsys):
+    bundle_reader = load_script("#bundle_reader.py", "bundle_reader")
+    bundle_file = str(tmp_path / "crafted.bundle")
+    writer = packager.BundleWriter(bundle_file, 'gzip')
+    writer.add_bytes('ok/file.txt', b'fine')
+    writer.add_bytes(bad_path, b'evil')
+    writer.close()
+
+    output_dir = tmp_path / "nested" / "out"
+    with packager.BundleReader(bundle_file) as reader:
+        bundle_reader.extract_bundle(reader, None, str(output_dir))
+    assert (output_dir / "ok" / "file.txt").read_bytes() == b'fine'
+    assert not (tmp_path / "nested" / "escape.txt").exists()
+    assert not (tmp_path / "escape.txt").exists()
+    extracted = [os.path.join(root, name) for root, _, files in os.walk(tmp_path)
+                 for name in files if name != "crafted.bundle"]
+    assert extracted == [str(output_dir / "ok" / "file.txt")]
+    assert "❌" in capsys.readouterr().out
+
+def run_cat(bundle_reader, monkeypatch, bundle_file, path):
+    monkeypatch.setattr(bundle_reader.sys, 'argv', ['#bundle_reader.py', 'cat', str(bundle_file), path])
+    return bundle_reader.main()
+
+def test_cat_reports_errors(packager, tmp_path, monkeypatch, capsys):
+    bundle_reader = load_script("#bundle_reader.py", "bundle_reader")
+    bundle_file = tmp_path / "crafted.bundle"
+    writer = packager.BundleWriter(str(bundle_file), 'gzip')
+    writer.add_bytes('ok.txt', b'fine')
+    writer.add_bytes('big.txt', b'x' * 4096)
+    writer.close()
+    with packager.BundleReader(str(bundle_file)) as reader:
+        entry = reader.entries['big.txt']
+    with open(bundle_file, 'r+b') as f:
+        f.seek(entry['offset'] + entry['length'] // 2)
+        byte = f.read(1)
+        f.seek(-1, os.SEEK_CUR)
+        f.write(bytes([byte[0] ^ 0xFF]))
+
+    assert run_cat(bundle_reader, monkeypatch, bundle_file, 'ok.txt') == 0
+    assert run_cat(bundle_reader, monkeypatch, bundle_file, 'missing.txt') == 1
+    assert '❌ 压缩包中没有该文件: missing.txt' in capsys.readouterr().out
+    assert run_cat(bundle_reader, monkeypatch, bundle_file, 'big.txt') == 1
+    assert '❌ big.txt: ' in capsys.readouterr().out
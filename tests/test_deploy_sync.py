@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""增量部署的排除规则：只排除指定的路径，发布目录中的 bin/ Release/ 等目录照常部署；增量包中的删除清单"""
+
+import os
+import shutil
+import tarfile
+import subprocess
+
+import pytest
+
+from conftest import load_script
+
+PUBLISH_FILES = [
+    'VacantRoomWeb.dll', 'VacantRoomWeb.pdb', 'appsettings.json',
+    'bin/Release/tool.dll', 'Debug/readme.txt', 'obj/cache.json',
+    'wwwroot/Logs/icon.png', 'Logs/app-20250101.log', 'Logs/sub/old.log',
+]
+
+@pytest.fixture(scope="module")
+def deploy_sync():
+    return load_script("#deploy_sync.py", "deploy_sync")
+
+@pytest.fixture
+def publish(tmp_path):
+    root = tmp_path / "publish"
+    for path in PUBLISH_FILES:
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(path, encoding='utf-8')
+    return root
+
+def test_default_excludes_only_root_logs(deploy_sync, publish):
+    files = {rel_path for rel_path, _, _, _ in deploy_sync.list_files(str(publish), deploy_sync.DEFAULT_EXCLUDES)}
+    assert files == {p for p in PUBLISH_FILES if not p.startswith('Logs/')}
+
+def test_no_excludes_lists_everything(deploy_sync, publish):
+    files = {rel_path for rel_path, _, _, _ in deploy_sync.list_files(str(publish), [])}
+    assert files == set(PUBLISH_FILES)
+
+def test_gitignore_style_excludes(deploy_sync, publish):
+    excludes = ['/Logs/', '*.pdb', 'bin/', '!bin/Release/tool.dll']
+    files = {rel_path for rel_path, _, _, _ in deploy_sync.list_files(str(publish), excludes)}
+    assert files == {p for p in PUBLISH_FILES
+                     if not p.startswith(('Logs/', 'bin/')) and not p.endswith('.pdb')}
+
+def test_diff_ignores_excluded_target_files(deploy_sync, publish):
+    source = deploy_sync.build_manifest(str(publish), jobs=2)
+    target = {'files': dict(source['files'])}
+    target['files']['Logs/sub/new.log'] = [1, 0, 'x']
+    target['files']['stale.js'] = [1, 0, 'x']
+    target['files']['appsettings.json'] = [1, 0, 'changed']
+
+    changed, removed = deploy_sync.diff_manifests(source, target, deploy_sync.DEFAULT_EXCLUDES)
+    assert changed == ['appsettings.json']
+    assert removed == ['stale.js']
+
+def make_target(tmp_path, publish):
+    """模拟服务器部署目录：与发布目录相比少一个文件、多两个旧文件，另有 Logs/"""
+    target = tmp_path / "server"
+    for path in PUBLISH_FILES:
+        if path != 'appsettings.json':
+            (target / path).parent.mkdir(parents=True, exist_ok=True)
+            (target / path).write_bytes((publish / path).read_bytes())
+    for path in ('old.js', 'wwwroot/old dir/stale.css', 'Logs/app-20250102.log'):
+        (target / path).parent.mkdir(parents=True, exist_ok=True)
+        (target / path).write_text('old', encoding='utf-8')
+    return target
+
+@pytest.mark.parametrize("delete", [False, True])
+def test_archive_delete_list(deploy_sync, publish, tmp_path, delete):
+    target = make_target(tmp_path, publish)
+    source = deploy_sync.build_manifest(str(publish), jobs=2)
+    changed, removed = deploy_sync.diff_manifests(source, deploy_sync.build_manifest(str(target), jobs=2),
+                                                  deploy_sync.DEFAULT_EXCLUDES)
+    assert changed == ['appsettings.json']
+    assert removed == ['old.js', 'wwwroot/old dir/stale.css']
+
+    archive = tmp_path / "delta.tar.gz"
+    deploy_sync.write_archive(str(publish), changed, str(archive), removed if delete else ())
+    with tarfile.open(archive) as tar:
+        names = tar.getnames()
+        delete_list = tar.extractfile(deploy_sync.DELETE_LIST_NAME).read() if delete else None
+    expected = ['appsettings.json'] + ([deploy_sync.DELETE_LIST_NAME] if delete else [])
+    assert names == expected
+    if delete:
+        assert delete_list.decode('utf-8').splitlines() == removed
+
+@pytest.mark.skipif(os.name == 'nt' or shutil.which('xargs') is None, reason="需要 tar 和 GNU xargs")
+def test_upload_md_delete_step(deploy_sync, publish, tmp_path):
+    # 按 linux/upload.md 中的命令解压增量包并删除旧文件，结果与发布目录一致（Logs/ 保留）
+    target = make_target(tmp_path, publish)
+    source = deploy_sync.build_manifest(str(publish), jobs=2)
+    changed, removed = deploy_sync.diff_manifests(source, deploy_sync.build_manifest(str(target), jobs=2),
+                                                  deploy_sync.DEFAULT_EXCLUDES)
+    archive = tmp_path / "delta.tar.gz"
+    deploy_sync.write_archive(str(publish), changed, str(archive), removed)
+
+    subprocess.run(['sh', '-c', f"cd '{target}' && tar xzf '{archive}' && if [ -f .deploy-delete.txt ]; then "
+                                "xargs -d '\\n' -r rm -f -- < .deploy-delete.txt; rm -f .deploy-delete.txt; fi"],
+                   check=True)
+    files = {rel_path for rel_path, _, _, _ in deploy_sync.list_files(str(target), [])}
+    assert files == set(PUBLISH_FILES) | {'Logs/app-20250102.log'}
+    assert not (target / deploy_sync.DELETE_LIST_NAME).exists()
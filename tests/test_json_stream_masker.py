@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""JsonStreamMasker 分块输入：任意块边界下的结果与整体处理、mask_json_recursive 一致，且保持原始格式"""
+
+import json
+import re
+
+import pytest
+
+DOCUMENT = r'''{
+  "Logging": { "LogLevel": { "Default": "Information", "Microsoft.AspNetCore": "Warning" } },
+  "ConnectionStrings": {
+    "DefaultConnection": "Server=db.example.com;Database=rooms;User Id=sa;Password=p@ss\"word\\1;"
+  },
+  "Jwt": {
+    "Secret":   "k9中文-secret-value-\\-\"quoted\"",
+    "Issuer": "VacantRoomWeb",
+    "ExpiresMinutes": 12345.678e-3
+  },
+  "AdminPassword": "hunter2hunter2",
+  "ApiKeys": ["not-masked-in-arrays", {"apiKey": "nested-key-0123456789"}],
+  "Limits": [1, -2.5, 3e10, true, false, null],
+  "Email": {"Address": "a@b.c", "SmtpPassword" : "smtp\/pass", "Token":"t"},
+  "中文键": "值",
+  "Empty": {}, "EmptyList": [ ]
+}
+'''
+
+STRING_TOKEN = re.compile(r'"(?:[^"\\\n]|\\.)*"')
+
+def feed_in_chunks(packager, text, size):
+    masker = packager.JsonStreamMasker()
+    out = [masker.feed(text[i:i + size]) for i in range(0, len(text), size)]
+    out.append(masker.feed('', final=True))
+    return ''.join(out)
+
+def test_whole_document_matches_recursive_masking(packager):
+    output = packager.process_json_content(DOCUMENT)
+    assert output != DOCUMENT
+    assert "hunter2hunter2" not in output and "nested-key-0123456789" not in output
+    assert json.loads(output) == packager.mask_json_recursive(json.loads(DOCUMENT))
+
+def test_every_chunk_size_gives_same_output(packager):
+    expected = packager.process_json_content(DOCUMENT)
+    masked_object = packager.mask_json_recursive(json.loads(DOCUMENT))
+    for size in range(1, len(DOCUMENT) + 1):
+        output = feed_in_chunks(packager, DOCUMENT, size)
+        assert output == expected, f"块大小 {size}"
+        assert json.loads(output) == masked_object, f"块大小 {size}"
+
+def test_formatting_outside_strings_is_preserved(packager):
+    # 去掉所有字符串后，空白、数字和标点与原文逐字符一致
+    output = feed_in_chunks(packager, DOCUMENT, 7)
+    assert STRING_TOKEN.sub('""', output) == STRING_TOKEN.sub('""', DOCUMENT)
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 16])
+def test_comments_split_across_chunks(packager, size):
+    text = ('{\n  // 注释中的 "password": "x"\n  "Password": "secret-value", /* 块注释 "token": "y" */\n'
+            '  "Name": "room"\n}\n')
+    output = feed_in_chunks(packager, text, size)
+    assert output == packager.process_json_content(text)
+    assert '"secret-value"' not in output
+    assert '"password": "x"' in output and '"token": "y"' in output
@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+"""LogIndex 查询结果与逐行扫描整个日志文件的结果一致：ACTION / IP、时间范围、增量追加和截断 / 替换后的重建"""
+
+import re
+import random
+from datetime import datetime
+
+import pytest
+
+from conftest import load_script
+
+DATE = "2025-11-13"
+ACTIONS = ["PAGE_VIEW", "SEARCH", "SECURITY_LOGIN_FAILED", "ADMIN_LOGIN", "API_CALL"]
+LINE = re.compile(r'^\ufeff?\[(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)\.\d{3}\] IP:(.*?) ACTION:(.*?) PATH:')
+
+@pytest.fixture(scope="module")
+def log_digest():
+    return load_script("#log_digest.py", "log_digest")
+
+@pytest.fixture(autouse=True)
+def small_blocks(log_digest, monkeypatch):
+    # 缩小块大小，让几千行日志也分成很多块
+    monkeypatch.setattr(log_digest, 'BLOCK_LINES', 16)
+
+def generate_log(seed, count, start_second=0):
+    """按时间递增生成日志行，夹杂无法解析的续行（如异常堆栈）和 \\r\\n 结尾"""
+    rng = random.Random(seed)
+    second = start_second
+    lines = []
+    for i in range(count):
+        second += rng.choice([0, 0, 1, 3, 17, 60])
+        if rng.random() < 0.05:
+            lines.append(f"   at VacantRoomWeb.Services.RoomService.Load() line {i}")
+            continue
+        h, m, s = second // 3600 % 24, second // 60 % 60, second % 60
+        ip = f"203.0.113.{rng.randrange(40)}"
+        action = rng.choice(ACTIONS)
+        end = "\r" if rng.random() < 0.1 else ""
+        lines.append(f"[{DATE} {h:02d}:{m:02d}:{s:02d}.{rng.randrange(1000):03d}] IP:{ip} ACTION:{action} "
+                     f"PATH:/rooms/{i} DETAILS:空闲教室 {i} UA:Mozilla/5.0{end}")
+    return "\ufeff" + "\n".join(lines) + "\n", second
+
+def brute_force(data: bytes):
+    """逐行扫描：只统计以换行符结尾的完整行"""
+    text = data[:data.rfind(b'\n') + 1].decode('utf-8')
+    rows = []
+    for raw in text.split('\n')[:-1]:
+        line = raw.rstrip('\r')
+        m = LINE.match(line)
+        rows.append((line.lstrip('\ufeff'), m.groups() if m else None))
+    return rows
+
+def assert_matches(log_digest, index, data: bytes):
+    rows = brute_force(data)
+    parsed = [(line, groups) for line, groups in rows if groups]
+    assert index.lines == len(rows)
+    assert index.parsed == len(parsed)
+    assert index.distinct_ips == len({g[1] for _, g in parsed})
+    assert index.first == (parsed[0][1][0] if parsed else None)
+    assert index.last == (parsed[-1][1][0] if parsed else None)
+    assert {a: e[0] for a, e in index.actions.items()} == {
+        a: sum(1 for _, g in parsed if g[2] == a) for a in {g[2] for _, g in parsed}}
+
+    for action in ACTIONS + ["MISSING"]:
+        got = list(log_digest.query_postings([index], 'actions', action, 10 ** 9))
+        assert got == [line for line, g in parsed if g[2] == action], action
+    for ip in sorted({g[1] for _, g in parsed})[:10]:
+        got = list(log_digest.query_postings([index], 'ips', ip, 10 ** 9))
+        assert got == [line for line, g in parsed if g[1] == ip], ip
+
+    files = [(DATE, index.log_path, index.size, index.mtime_ns)]
+    for start, end in [("00:00:00", "23:59:59"), ("01:00:00", "01:30:00"), ("02:10:05", "02:10:05"),
+                       ("00:30:30", "03:45:15"), ("22:00:00", "23:00:00")]:
+        start_dt = datetime.strptime(f"{DATE} {start}", "%Y-%m-%d %H:%M:%S")
+        end_dt = datetime.strptime(f"{DATE} {end}", "%Y-%m-%d %H:%M:%S")
+        got = list(log_digest.query_time_range(files, [index], start_dt, end_dt, 10 ** 9))
+        expected = [line for line, g in parsed if f"{DATE} {start}" <= g[0] <= f"{DATE} {end}"]
+        assert got == expected, (start, end)
+
+def build(log_digest, log_path, index_path):
+    index = log_digest.LogIndex.load(str(log_path), str(index_path))
+    index.update()
+    index.save()
+    return log_digest.LogIndex.load(str(log_path), str(index_path))
+
+def test_index_matches_brute_force(log_digest, tmp_path):
+    text, _ = generate_log(1, 3000)
+    log_path = tmp_path / f"access-{DATE}.log"
+    log_path.write_bytes(text.encode('utf-8'))
+    index = build(log_digest, log_path, tmp_path / "idx" / "a.idx.json")
+    assert_matches(log_digest, index, log_path.read_bytes())
+
+def test_incremental_append(log_digest, tmp_path):
+    text, _ = generate_log(2, 3000)
+    data = text.encode('utf-8')
+    log_path = tmp_path / f"access-{DATE}.log"
+    index_path = tmp_path / "idx" / "a.idx.json"
+
+    # 分几次追加，每次都停在一行中间，未写完的行下次再索引
+    cuts = sorted(random.Random(3).sample(range(1, len(data)), 6)) + [len(data)]
+    written = 0
+    with open(log_path, 'wb') as f:
+        for cut in cuts:
+            f.write(data[written:cut])
+            f.flush()
+            written = cut
+            index = build(log_digest, log_path, index_path)
+            assert_matches(log_digest, index, data[:cut])
+
+    fresh = build(log_digest, log_path, tmp_path / "fresh" / "a.idx.json")
+    assert index.checkpoints == fresh.checkpoints
+    assert index.minutes == fresh.minutes
+    assert index.actions == fresh.actions
+    assert index.ips == fresh.ips
+
+def test_rebuild_after_truncation_and_replacement(log_digest, tmp_path):
+    log_path = tmp_path / f"access-{DATE}.log"
+    index_path = tmp_path / "idx" / "a.idx.json"
+    text, _ = generate_log(4, 2000)
+    log_path.write_bytes(text.encode('utf-8'))
+    build(log_digest, log_path, index_path)
+
+    # 截断为更短的新内容：文件比已索引的偏移短
+    text, _ = generate_log(5, 300)
+    log_path.write_bytes(text.encode('utf-8'))
+    index = build(log_digest, log_path, index_path)
+    assert_matches(log_digest, index, log_path.read_bytes())
+
+    # 替换为更长的新内容：开头内容变化
+    text, _ = generate_log(6, 2500)
+    log_path.write_bytes(text.encode('utf-8'))
+    index = build(log_digest, log_path, index_path)
+    assert_matches(log_digest, index, log_path.read_bytes())
+
+    # 清空
+    log_path.write_bytes(b'')
+    index = build(log_digest, log_path, index_path)
+    assert index.lines == 0 and index.actions == {}
+
+def test_open_indexes_updates_only_changed_files(log_digest, tmp_path):
+    logs = tmp_path / "Logs"
+    logs.mkdir()
+    text, _ = generate_log(7, 500)
+    (logs / f"access-{DATE}.log").write_bytes(text.encode('utf-8'))
+    (logs / "notes.txt").write_text("not a log", encoding='utf-8')
+    index_dir = str(logs / log_digest.INDEX_DIR_NAME)
+
+    files = log_digest.list_log_files(str(logs))
+    assert [f[0] for f in files] == [DATE]
+    stats = {}
+    log_digest.open_indexes(files, index_dir, stats=stats)
+    assert stats == {'updated': 1, 'lines': len(brute_force(text.encode('utf-8')))}
+
+    stats = {}
+    indexes = log_digest.open_indexes(log_digest.list_log_files(str(logs)), index_dir, stats=stats)
+    assert stats == {}
+    assert_matches(log_digest, indexes[0], (logs / f"access-{DATE}.log").read_bytes())
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""MaskingEngine 与逐行原始实现 process_csharp_content_reference 的差分测试"""
+
+import os
+import random
+
+import pytest
+
+from conftest import REPO_DIR
+
+SKIP_DIRS = {'.git', 'bin', 'obj', 'tests', '__pycache__'}
+FUZZ_SEED = 20240601
+FUZZ_LINES = 20000
+LONG_LINE_EVERY = 200
+
+def repo_sources():
+    for root, dirs, files in os.walk(REPO_DIR):
+        dirs[:] = sorted(d for d in dirs if d not in SKIP_DIRS and not d.startswith('.'))
+        for name in sorted(files):
+            if name.endswith(('.cs', '.json')):
+                yield os.path.join(root, name)
+
+def fuzz_lines(keywords, seed=FUZZ_SEED, count=FUZZ_LINES):
+    """关键词出现在行尾、大小写混合、超长行、不含关键词的行"""
+    rng = random.Random(seed)
+    pieces = ['=', ' = ', '"', "'", ' ', 'const', 'string', 'Configuration[', ']', ':', ';', '_', 'x', 'Value',
+              'var', '123', 'abc', '\t', '"value"', "'v'", '()', '.']
+
+    def keyword():
+        word = rng.choice(keywords)
+        return ''.join(c.upper() if rng.random() < 0.5 else c for c in word)
+
+    lines = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:  # 关键词在行尾
+            line = ''.join(rng.choice(pieces) for _ in range(rng.randint(0, 12))) + keyword()
+        elif kind == 1:  # 随机拼接，大小写混合
+            line = ''.join(keyword() if rng.random() < 0.3 else rng.choice(pieces)
+                           for _ in range(rng.randint(1, 30)))
+        elif kind == 2:  # 长行（低于兜底阈值），含长单词和多个赋值；原始实现在长行上很慢，只生成少量超过 500 字符的行
+            parts = []
+            is_long = i % LONG_LINE_EVERY == 2
+            target = rng.randint(500, 4000) if is_long else rng.randint(50, 300)
+            word = 300 if is_long else 20
+            while sum(map(len, parts)) < target:
+                parts.append(rng.choice([keyword() + 'x' * rng.randint(0, word) + ' = "' + 'v' * rng.randint(1, 50) + '"',
+                                         'a' * rng.randint(1, word), rng.choice(pieces)]))
+            line = ''.join(parts)
+        else:  # 不含关键词
+            line = ''.join(rng.choice(['x', 'Value', ' = ', '"abc"', ';', 'var', 'int']) for _ in range(rng.randint(0, 20)))
+        lines.append(line)
+    return lines
+
+@pytest.mark.parametrize("path", list(repo_sources()), ids=lambda p: os.path.relpath(p, REPO_DIR))
+def test_engine_matches_reference_on_repo_files(packager, path):
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        content = f.read()
+    assert packager.verify_masking_engine([content]) == []
+
+def test_engine_matches_reference_on_fuzzed_lines(packager):
+    lines = fuzz_lines(packager.SENSITIVE_KEYWORDS)
+    assert max(map(len, lines)) < packager.MASK_LONG_LINE
+    # 生成的行中要有足够多实际被掩码的，否则差分测试没有意义
+    assert sum(packager.process_csharp_content(line) != line for line in lines) > len(lines) // 20
+    mismatches = packager.verify_masking_engine(lines)
+    assert mismatches == [], mismatches[:3]
+    # 多行一起处理时预过滤按整个文件判断，结果也应一致
+    assert packager.verify_masking_engine(['\n'.join(lines[i:i + 50]) for i in range(0, len(lines), 50)]) == []
+
+def test_long_line_falls_back_to_literal_masking(packager):
+    line = 'var password = "hunter2secret"; ' + 'x' * packager.MASK_LONG_LINE + ' "other-literal"'
+    before = packager.RULE_FALLBACKS['long_line']
+    masked = packager.process_csharp_content(line)
+    assert packager.RULE_FALLBACKS['long_line'] == before + 1
+    assert 'hunter2secret' not in masked
+    assert 'other-literal' not in masked
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""批量打包：某个项目失败时继续打包其他项目，串行和并行两种方式都以非零状态退出"""
+
+import os
+import sys
+import json
+import subprocess
+
+import pytest
+
+from conftest import REPO_DIR
+
+SOURCE = 'namespace Rooms;\npublic class RoomService\n{\n    public int Count { get; set; }\n}\n'
+
+def write_config(tmp_path, extra_options=None):
+    for name in ('good1', 'broken', 'good2'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'RoomService.cs').write_text(SOURCE, encoding='utf-8')
+    projects = [
+        {'name': 'good1', 'base_dir': 'good1', 'output': 'out/#good1_Code.txt'},
+        # 压缩包不支持分卷：combine_code_files 抛出 ValueError
+        {'name': 'broken', 'base_dir': 'broken', 'output': 'out/#broken_Code.txt',
+         'options': {'output_format': 'bundle', 'max_part_bytes': '64'}},
+        # 目录不存在：combine_code_files 返回 None
+        {'name': 'missing', 'base_dir': 'missing', 'output': 'out/#missing_Code.txt'},
+        {'name': 'good2', 'base_dir': 'good2', 'output': 'out/#good2_Code.txt'},
+    ]
+    for project in projects:
+        project.setdefault('options', {}).update(extra_options or {})
+    (tmp_path / 'out').mkdir()
+    config = tmp_path / 'projects.json'
+    config.write_text(json.dumps({'projects': projects}), encoding='utf-8')
+    return config
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_failures_do_not_stop_other_projects(packager, tmp_path, capsys, jobs):
+    config = write_config(tmp_path)
+    projects, settings = packager.load_projects_config(str(config))
+    summaries = packager.package_projects(projects, settings['cache_dir'], jobs, use_cache=False)
+
+    assert [summary is not None for summary in summaries] == [True, False, False, True]
+    assert (tmp_path / 'out' / '#good1_Code.txt').exists()
+    assert (tmp_path / 'out' / '#good2_Code.txt').exists()
+    out = capsys.readouterr().out
+    assert '❌ broken: 打包失败' in out and '❌ missing: 打包失败' in out
+    assert '2/4 个项目打包失败' in out
+
+@pytest.mark.parametrize("jobs", ['1', '2'])
+def test_cli_exits_non_zero_when_a_project_fails(tmp_path, jobs):
+    config = write_config(tmp_path)
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, '#packager.py'), '--config', str(config),
+                             '--no-cache', '-j', jobs],
+                            cwd=tmp_path, stdin=subprocess.DEVNULL, capture_output=True,
+                            text=True, encoding='utf-8')
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert (tmp_path / 'out' / '#good2_Code.txt').exists()
+
+def write_leaky_config(tmp_path, audit=None):
+    # appsettings.json 中的密钥原文出现在不含敏感关键词的变量中，掩码不会处理，审计按已知密钥命中
+    for name in ('leaky', 'clean'):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'RoomService.cs').write_text(SOURCE, encoding='utf-8')
+    (tmp_path / 'leaky' / 'appsettings.json').write_text(
+        '{\n  "Jwt": { "Secret": "jwt-signing-secret-0001" }\n}\n', encoding='utf-8')
+    (tmp_path / 'leaky' / 'Banner.cs').write_text(
+        'class Banner { string text = "jwt-signing-secret-0001"; }\n', encoding='utf-8')
+    options = {'audit': audit} if audit else {}
+    projects = [
+        {'name': 'leaky', 'base_dir': 'leaky', 'output': 'out/#leaky_Code.txt', 'options': options},
+        {'name': 'clean', 'base_dir': 'clean', 'output': 'out/#clean_Code.txt', 'options': options},
+    ]
+    (tmp_path / 'out').mkdir()
+    config = tmp_path / 'projects.json'
+    config.write_text(json.dumps({'projects': projects}), encoding='utf-8')
+    return config
+
+@pytest.mark.parametrize("jobs", [1, 2])
+@pytest.mark.parametrize("audit,leaky_ok", [('warn', True), ('fail', False)])
+def test_audit_fail_marks_leaky_project_failed(packager, tmp_path, capsys, jobs, audit, leaky_ok):
+    config = write_leaky_config(tmp_path, audit)
+    projects, settings = packager.load_projects_config(str(config))
+    summaries = packager.package_projects(projects, settings['cache_dir'], jobs, use_cache=False)
+
+    assert [summary is not None for summary in summaries] == [leaky_ok, True]
+    # 审计失败时同样保留输出文件，便于查看命中位置
+    assert (tmp_path / 'out' / '#leaky_Code.txt').exists()
+    assert (tmp_path / 'out' / '#clean_Code.txt').exists()
+    out = capsys.readouterr().out
+    assert f"{'⚠️ ' if leaky_ok else '❌'} leaky: 3 个文件" in out
+    assert '（泄漏审计: 1 处）' in out
+
+@pytest.mark.parametrize("jobs", ['1', '2'])
+def test_cli_audit_fail_exits_non_zero_in_batch_mode(tmp_path, jobs):
+    config = write_leaky_config(tmp_path)
+    result = subprocess.run([sys.executable, os.path.join(REPO_DIR, '#packager.py'), '--config', str(config),
+                             '--no-cache', '--audit', 'fail', '-j', jobs],
+                            cwd=tmp_path, stdin=subprocess.DEVNULL, capture_output=True,
+                            text=True, encoding='utf-8')
+    assert result.returncode == 1, result.stdout + result.stderr
+    assert '1/2 个项目打包失败' in result.stdout
+
+def test_project_info_change_rewrites_cached_output(packager, tmp_path, capsys):
+    (tmp_path / 'rooms').mkdir()
+    (tmp_path / 'rooms' / 'RoomService.cs').write_text(SOURCE, encoding='utf-8')
+    (tmp_path / 'out').mkdir()
+    config = tmp_path / 'projects.json'
+    output = tmp_path / 'out' / '#rooms_Code.txt'
+
+    def package(title):
+        project = {'name': 'rooms', 'base_dir': 'rooms', 'output': 'out/#rooms_Code.txt', 'title': title}
+        config.write_text(json.dumps({'projects': [project]}), encoding='utf-8')
+        projects, settings = packager.load_projects_config(str(config))
+        return packager.package_projects(projects, settings['cache_dir'])[0]
+
+    assert not package('Rooms').get('skipped')
+    assert package('Rooms').get('skipped')
+    # 只修改头部的项目描述也需要重写输出
+    assert not package('Rooms v2').get('skipped')
+    assert output.read_text(encoding='utf-8').startswith('# Rooms v2\n')
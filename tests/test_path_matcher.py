@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""PathMatcher 与 git check-ignore --no-index 在临时仓库中逐条对比"""
+
+import shutil
+import subprocess
+
+import pytest
+
+pytestmark = pytest.mark.skipif(shutil.which('git') is None, reason="需要 git")
+
+# (用例名, .gitignore 内容, 路径)：路径以 / 结尾的创建为目录，其余创建为文件
+CASES = [
+    ("后出现的规则优先",
+     ["*.log", "!*.log", "debug.log", "keep.txt", "!keep.txt", "keep.txt"],
+     ["a.log", "debug.log", "sub/debug.log", "keep.txt", "sub/keep.txt"]),
+    ("! 重新包含",
+     ["*.cs", "!Program.cs", "!/Services/*.cs", "Services/Secret.cs"],
+     ["Program.cs", "Home.cs", "Services/RoomService.cs", "Services/Secret.cs",
+      "Services/Inner/Deep.cs", "Other/Program.cs"]),
+    ("/ 结尾只匹配目录",
+     ["build/", "Logs/", "cache"],
+     ["build/", "build/out.txt", "Sub/build/", "Sub/build/out.txt", "docs/build",
+      "Logs/", "Logs/a.txt", "logs", "cache", "Sub/cache/", "Sub/cache/x.bin"]),
+    ("被排除目录下无法重新包含",
+     ["bin/", "!bin/keep.txt", "obj/*", "!obj/keep.txt", "packages/", "!packages/"],
+     ["bin/", "bin/keep.txt", "bin/Debug/", "bin/Debug/app.dll", "obj/", "obj/keep.txt",
+      "obj/other.txt", "packages/", "packages/a/b.txt"]),
+    ("开头和中间的 / 锚定到 .gitignore 所在目录",
+     ["/root.txt", "doc/*.md", "/Data/"],
+     ["root.txt", "sub/root.txt", "doc/a.md", "doc/sub/a.md", "sub/doc/a.md", "Data/", "Data/x.db",
+      "sub/Data/", "sub/Data/x.db"]),
+    ("** 与字符类",
+     ["**/temp", "a/**/b.txt", "logs/**", "*.[oa]", "file[!0-9].txt", "?.tmp"],
+     ["temp", "x/y/temp", "a/b.txt", "a/x/y/b.txt", "logs/", "logs/1.txt", "logs/sub/2.txt",
+      "lib.o", "lib.a", "lib.so", "filex.txt", "file1.txt", "a.tmp", "ab.tmp"]),
+    ("注释、转义与结尾空格",
+     ["# comment", "\\#hash.txt", "\\!bang.txt", "trailing.txt   ", "space\\ .txt"],
+     ["# comment", "#hash.txt", "!bang.txt", "trailing.txt", "space .txt", "space.txt"]),
+]
+
+def make_repo(root, gitignore, paths):
+    subprocess.run(['git', 'init', '-q', str(root)], check=True)
+    (root / '.gitignore').write_text('\n'.join(gitignore) + '\n', encoding='utf-8')
+    for path in paths:
+        target = root / path
+        if path.endswith('/'):
+            target.mkdir(parents=True, exist_ok=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_text('', encoding='utf-8')
+
+def git_ignored(root, paths) -> set:
+    """git check-ignore 只输出被排除的路径（! 规则命中的不输出）"""
+    result = subprocess.run(
+        ['git', '-c', 'core.ignorecase=false', 'check-ignore', '--no-index', '--stdin', '-z'],
+        cwd=root, input='\0'.join(paths) + '\0', capture_output=True, text=True)
+    assert result.returncode in (0, 1), result.stderr
+    return {p for p in result.stdout.split('\0') if p}
+
+def walker_ignored(matcher, path, is_dir) -> bool:
+    """与打包脚本遍历一致：任一上级目录被排除时不会进入，其中的文件视为排除"""
+    parts = path.split('/')
+    for i in range(1, len(parts)):
+        if matcher.is_ignored('/'.join(parts[:i]), True):
+            return True
+    return matcher.is_ignored(path, is_dir)
+
+@pytest.mark.parametrize("name,gitignore,paths", CASES, ids=[c[0] for c in CASES])
+def test_matches_git_check_ignore(path_matcher, tmp_path, name, gitignore, paths):
+    root = tmp_path / "repo"
+    make_repo(root, gitignore, paths)
+    matcher = path_matcher.load_project_matcher(str(root), patterns=[], ignore_case=False)
+
+    rel_paths = [p.rstrip('/') for p in paths]
+    expected = git_ignored(root, rel_paths)
+    for path in paths:
+        rel_path = path.rstrip('/')
+        assert walker_ignored(matcher, rel_path, path.endswith('/')) == (rel_path in expected), path
+
+def test_nested_gitignore_matches_git(path_matcher, tmp_path):
+    # 扫描目录为仓库子目录时，根目录和子目录的 .gitignore 都生效，子目录的优先
+    root = tmp_path / "repo"
+    paths = ["Web/a.log", "Web/keep.log", "Web/Sub/keep.log", "Web/build/", "Web/build/x.cs",
+             "Web/Program.cs", "Web/local.cs"]
+    make_repo(root, ["*.log", "/Web/local.cs", "build/"], paths)
+    (root / 'Web' / '.gitignore').write_text("!keep.log\n/Sub/keep.log\n", encoding='utf-8')
+    matcher = path_matcher.load_project_matcher(str(root / 'Web'), patterns=[], ignore_case=False)
+
+    expected = git_ignored(root, [p.rstrip('/') for p in paths])
+    for path in paths:
+        rel_path = path.rstrip('/')
+        got = walker_ignored(matcher, rel_path[len('Web/'):], path.endswith('/'))
+        assert got == (rel_path in expected), path
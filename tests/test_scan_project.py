@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""扫描脚本命令行：部署目录中的 .dll、Logs/ 等文件默认照常列出和对比"""
+
+import os
+import sys
+
+PUBLISH_FILES = {
+    'VacantRoomWeb.dll': b'MZ' + b'\0' * 100,
+    'VacantRoomWeb.pdb': b'\0' * 50,
+    'VacantRoomWeb.deps.json': b'{}',
+    'appsettings.json': b'{}',
+    'Logs/access-2025-11-13.log': b'[2025-11-13 10:00:00.000] IP:1.2.3.4 ACTION:PAGE_VIEW PATH:/\n',
+    'wwwroot/app.css': b'body{}',
+    'obj/project.assets.json': b'{}',
+}
+
+def make_publish(root):
+    for path, content in PUBLISH_FILES.items():
+        target = root / path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(content)
+
+def run_cli(scan_project, monkeypatch, capsys, cwd, *argv):
+    monkeypatch.chdir(cwd)
+    monkeypatch.setattr(sys, 'argv', ['#scan_project.py', *argv])
+    scan_project.main()
+    return capsys.readouterr().out
+
+def test_default_rules_list_and_diff_deploy_files(scan_project, tmp_path, monkeypatch, capsys):
+    root = tmp_path / "publish"
+    make_publish(root)
+    snapshot = str(tmp_path / "scan.json")
+
+    out = run_cli(scan_project, monkeypatch, capsys, root, '--save-snapshot', '--snapshot', snapshot)
+    for name in ('VacantRoomWeb.dll', 'VacantRoomWeb.pdb', 'VacantRoomWeb.deps.json',
+                 'Logs', 'access-2025-11-13.log', 'app.css'):
+        assert name in out, name
+    # 只跳过 SCAN_SKIP_RULES 中的目录
+    assert 'project.assets.json' not in out
+
+    (root / 'VacantRoomWeb.dll').write_bytes(b'MZ' + b'\1' * 200)
+    (root / 'Logs' / 'access-2025-11-14.log').write_bytes(b'\n')
+    os.remove(root / 'VacantRoomWeb.pdb')
+    out = run_cli(scan_project, monkeypatch, capsys, root, '--diff', '--snapshot', snapshot)
+    assert '± VacantRoomWeb.dll' in out
+    assert '+ Logs/access-2025-11-14.log' in out
+    assert '- VacantRoomWeb.pdb' in out
+    assert '新增: 1  删除: 1  大小变化: 1' in out
+
+def test_source_rules_are_opt_in(scan_project, tmp_path, monkeypatch, capsys):
+    root = tmp_path / "publish"
+    make_publish(root)
+
+    out = run_cli(scan_project, monkeypatch, capsys, root, '--source-rules')
+    assert 'VacantRoomWeb.dll' not in out
+    assert 'access-2025-11-13.log' not in out
+    assert 'app.css' in out and 'appsettings.json' in out
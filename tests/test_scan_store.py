@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""ScanStore 的目录 / 扩展名汇总和最大的 N 个文件、目录与普通字典逐项计算的结果一致"""
+
+import os
+import random
+from collections import defaultdict
+
+import pytest
+
+EXTENSIONS = ['.cs', '.razor', '.json', '.CSS', '.js', '.min.js', '']
+
+def generate_tree(root, seed=20240601, files=400):
+    """随机生成多层目录，文件大小各不相同（最大的 N 个没有并列），含空目录和无扩展名文件"""
+    rng = random.Random(seed)
+    dirs = ['']
+    for i in range(60):
+        parent = rng.choice(dirs)
+        if parent.count('/') < 5:
+            dirs.append(f"{parent}/d{i}" if parent else f"d{i}")
+    for rel_dir in dirs:
+        os.makedirs(os.path.join(root, rel_dir), exist_ok=True)
+    sizes = rng.sample(range(0, 20000), files)
+    for i, size in enumerate(sizes):
+        rel_dir = rng.choice(dirs)
+        name = f"f{i}{rng.choice(EXTENSIONS)}"
+        with open(os.path.join(root, rel_dir, name), 'wb') as f:
+            f.write(b'x' * size)
+
+def plain_rollups(root):
+    """不经过 ScanStore，直接用 os.walk 和字典计算"""
+    dirs = {}
+    extensions = defaultdict(lambda: [0, 0])
+    files = {}
+    for current, dir_names, file_names in os.walk(root):
+        rel_dir = os.path.relpath(current, root).replace(os.sep, '/')
+        if rel_dir != '.':
+            dirs[rel_dir] = [0, 0]
+        for name in file_names:
+            rel_path = name if rel_dir == '.' else f"{rel_dir}/{name}"
+            size = os.path.getsize(os.path.join(current, name))
+            files[rel_path] = size
+            ext = extensions[os.path.splitext(name)[1].lower() or '(无扩展名)']
+            ext[0] += 1
+            ext[1] += size
+    for rel_path, size in files.items():
+        parts = rel_path.split('/')[:-1]
+        for i in range(1, len(parts) + 1):
+            entry = dirs['/'.join(parts[:i])]
+            entry[0] += 1
+            entry[1] += size
+    return dirs, {ext: tuple(v) for ext, v in extensions.items()}, files
+
+def assert_descending(rows, key):
+    values = [key(row) for row in rows]
+    assert values == sorted(values, reverse=True)
+
+@pytest.mark.parametrize("use_numpy", [False, True], ids=["python", "numpy"])
+def test_store_matches_plain_dicts(scan_project, path_matcher, tmp_path, monkeypatch, use_numpy):
+    if use_numpy and scan_project.np is None:
+        pytest.skip("未安装 numpy")
+    if not use_numpy:
+        monkeypatch.setattr(scan_project, 'np', None)
+    root = str(tmp_path / "tree")
+    generate_tree(root)
+    dirs, extensions, files = plain_rollups(root)
+
+    store = scan_project.scan_to_store(root, max_depth=10, workers=4, ignore=path_matcher.compile_rules([]))
+    assert len(store) == len(dirs) + len(files)
+
+    for max_depth in (1, 2, 3, 10):
+        rows = store.directory_rollups(max_depth)
+        assert_descending(rows, lambda row: row[2])
+        assert {path: (count, size) for path, count, size in rows} == {
+            path: tuple(v) for path, v in dirs.items() if path.count('/') < max_depth}
+
+    rows = store.extension_rollups()
+    assert_descending(rows, lambda row: row[2])
+    assert {ext: (count, size) for ext, count, size in rows} == extensions
+
+    for n in (1, 5, 25, len(files) + 10):
+        expected = sorted(files.items(), key=lambda item: item[1], reverse=True)[:n]
+        assert store.top_files(n) == expected
+
+        top = store.top_dirs(n)
+        assert [size for _, size in top] == sorted((v[1] for v in dirs.values()), reverse=True)[:n]
+        assert all(dirs[path][1] == size for path, size in top)